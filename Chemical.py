@@ -3,17 +3,28 @@ import pandas as pd
 import json
 from datetime import datetime
 import base64
-from io import BytesIO
-from reportlab.lib.pagesizes import letter, A4
-from reportlab.platypus import SimpleDocTemplate, Table, TableStyle, Paragraph, Spacer, Image
-from reportlab.lib.styles import getSampleStyleSheet, ParagraphStyle
-from reportlab.lib import colors
+from io import BytesIO, TextIOWrapper
 import os
-from reportlab.pdfgen import canvas
-from reportlab.lib.utils import ImageReader
+from report_engine import Report, Text, Spacer, DataTable, Signature, Theme, get_report_queue
 import tempfile
 import csv
 import zipfile
+import threading
+import queue
+import gzip
+import hashlib
+import atexit
+from contextlib import contextmanager
+import sqlite3
+
+# Parquet export/import needs pyarrow; everything else works without it
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
+except ImportError:
+    PARQUET_AVAILABLE = False
 
 # Page configuration with updated settings
 st.set_page_config(
@@ -264,57 +275,939 @@ st.markdown(
     unsafe_allow_html=True
 )
 
-# Data persistence functions
-def save_data():
-    """Save all session state data to JSON files"""
+# Data persistence configuration
+DATA_FILE = 'green_data.json'
+JOURNAL_FILE = 'green_data.journal'
+JOURNAL_COMPACT_THRESHOLD = 500  # Journal records replayed before folding them into the snapshot
+
+# List collections are keyed by record id, dict collections by their own keys
+ID_COLLECTIONS = ('chemicals', 'vendor_ledger', 'vendor_payments')
+KEYED_COLLECTIONS = ('packaging_materials', 'product_details', 'sequences')
+DATA_COLLECTIONS = ID_COLLECTIONS + KEYED_COLLECTIONS + ('production_history', 'settings')
+
+DEFAULT_SETTINGS = {
+    'company_name': "HMD Solutions",
+    'default_batch_size': 500,
+    'low_stock_threshold': 5.0,
+    'packaging_low_stock': 10
+}
+
+def empty_data():
+    """Return an empty data set with default settings"""
+    return {
+        'chemicals': [],
+        'packaging_materials': {},
+        'vendor_ledger': [],
+        'vendor_payments': [],
+        'production_history': [],
+        'product_details': {},
+        'sequences': {},
+        'settings': dict(DEFAULT_SETTINGS)
+    }
+
+def replay_changes(data, changes):
+    """Apply journal change records to a data set in order"""
+    # Index list collections by id so each record applies in O(1)
+    indexed = {name: {record['id']: record for record in data[name]} for name in ID_COLLECTIONS}
+
+    for change in changes:
+        op = change['op']
+        collection = change['collection']
+        target = indexed.get(collection, data.get(collection))
+
+        if op == 'replace':
+            if collection in ID_COLLECTIONS:
+                indexed[collection] = {record['id']: record for record in change['value']}
+            else:
+                data[collection] = change['value']
+        elif op == 'append':
+            data[collection].append(change['value'])
+        elif op == 'upsert':
+            target[change['key']] = change['value']
+        elif op == 'delete':
+            target.pop(change['key'], None)
+
+    for name in ID_COLLECTIONS:
+        data[name] = list(indexed[name].values())
+    return data
+
+def file_version(path):
+    """Return a cheap change marker for a file: (mtime, size), or None if missing"""
     try:
-        data = {
-            'chemicals': st.session_state.chemicals,
-            'packaging_materials': st.session_state.packaging_materials,
-            'vendor_ledger': st.session_state.vendor_ledger,
-            'vendor_payments': st.session_state.vendor_payments,
-            'production_history': st.session_state.production_history,
-            'product_details': st.session_state.product_details,
-            'settings': st.session_state.settings
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return info.st_mtime_ns, info.st_size
+
+class JsonFileStorage:
+    """Storage backend that rewrites the whole data file on every save"""
+
+    def __init__(self, path=DATA_FILE):
+        self.path = path
+        self.lock = threading.Lock()
+        self.seq = 0  # No journal, so every save is a full rewrite
+
+    def load(self):
+        data = empty_data()
+        if os.path.exists(self.path):
+            with open(self.path, 'r') as f:
+                data.update(json.load(f))
+        data.pop('journal_seq', None)
+        return data
+
+    def version(self):
+        return file_version(self.path)
+
+    def save(self, data, changes):
+        self.compact(data)
+
+    def compact(self, data):
+        with self.lock:
+            with open(self.path, 'w') as f:
+                json.dump(data, f, indent=4)
+
+class JournalStorage:
+    """Storage backend with a snapshot file and an append-only change journal
+
+    Every save appends one JSON line per mutation to the journal, so its cost
+    depends on the size of the change rather than the size of the data. Once
+    the journal grows past ``compact_threshold`` records it is folded into a
+    new snapshot. Loading replays the journal tail on top of the snapshot.
+    """
+
+    def __init__(self, snapshot_path=DATA_FILE, journal_path=JOURNAL_FILE,
+                 compact_threshold=JOURNAL_COMPACT_THRESHOLD):
+        self.snapshot_path = snapshot_path
+        self.journal_path = journal_path
+        self.compact_threshold = compact_threshold
+        self.lock = threading.RLock()
+        self.seq = 0
+        self.journal_records = 0
+
+    def load(self):
+        with self.lock:
+            data = empty_data()
+            snapshot_seq = 0
+            if os.path.exists(self.snapshot_path):
+                with open(self.snapshot_path, 'r') as f:
+                    data.update(json.load(f))
+                snapshot_seq = data.pop('journal_seq', 0)
+
+            changes = self._read_journal()
+            # Records already folded into the snapshot are skipped, so a crash
+            # between writing the snapshot and truncating the journal is safe
+            pending = [change for change in changes if change['seq'] > snapshot_seq]
+            replay_changes(data, pending)
+
+            self.seq = max([snapshot_seq] + [change['seq'] for change in changes])
+            self.journal_records = len(pending)
+            return data
+
+    def version(self):
+        return file_version(self.snapshot_path), file_version(self.journal_path)
+
+    def _read_journal(self):
+        """Read journal records, dropping a torn tail left by an interrupted write"""
+        changes = []
+        if not os.path.exists(self.journal_path):
+            return changes
+
+        valid_bytes = 0
+        with open(self.journal_path, 'rb') as f:
+            for line in f:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    changes.append(json.loads(line))
+                except ValueError:
+                    break
+                valid_bytes += len(line)
+
+        if valid_bytes < os.path.getsize(self.journal_path):
+            with open(self.journal_path, 'r+b') as f:
+                f.truncate(valid_bytes)
+        return changes
+
+    def save(self, data, changes):
+        if not changes:
+            return
+        with self.lock:
+            lines = []
+            for change in changes:
+                self.seq += 1
+                change['seq'] = self.seq
+                lines.append(json.dumps(change, separators=(',', ':')))
+
+            with open(self.journal_path, 'a') as f:
+                f.write('\n'.join(lines) + '\n')
+                f.flush()
+                os.fsync(f.fileno())
+            self.journal_records += len(changes)
+
+        if self.journal_records >= self.compact_threshold:
+            self.compact(data)
+
+    def compact(self, data):
+        """Write a full snapshot and truncate the journal"""
+        with self.lock:
+            snapshot = dict(data, journal_seq=self.seq)
+            temp_path = f"{self.snapshot_path}.tmp"
+            with open(temp_path, 'w') as f:
+                json.dump(snapshot, f, separators=(',', ':'))
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.snapshot_path)
+
+            open(self.journal_path, 'w').close()
+            self.journal_records = 0
+
+# SQLite storage configuration
+SQLITE_DB_FILE = 'hmd_chemicals.db'
+
+# Table layout per collection: (key column, record columns). Record fields not
+# listed here are kept in each table's ``extra`` JSON column.
+SQLITE_TABLES = {
+    'chemicals': ('id', ('id', 'name', 'stock', 'rate', 'original_unit')),
+    'packaging_materials': ('type', ('type', 'name', 'stock', 'rate')),
+    'vendor_ledger': ('id', ('id', 'date', 'vendor_name', 'vendor_type', 'item_name',
+                             'quantity', 'rate', 'total_amount', 'notes')),
+    'vendor_payments': ('id', ('id', 'date', 'vendor_name', 'amount', 'method', 'notes')),
+    'production_history': ('id', ('date', 'product', 'batch_size', 'status', 'type')),
+    'product_details': ('product_name', ('product_name', 'name', 'description', 'web_link',
+                                         'category', 'composition', 'image_uploaded')),
+    'sequences': ('collection', ('collection', 'next_id'))
+}
+SQLITE_JSON_COLUMNS = ('composition',)
+
+SQLITE_SCHEMA = """
+    CREATE TABLE IF NOT EXISTS chemicals (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL,
+        stock REAL DEFAULT 0,
+        rate REAL DEFAULT 0,
+        original_unit TEXT,
+        extra TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_chemicals_name ON chemicals (name COLLATE NOCASE);
+
+    CREATE TABLE IF NOT EXISTS packaging_materials (
+        type TEXT PRIMARY KEY,
+        name TEXT,
+        stock REAL DEFAULT 0,
+        rate REAL DEFAULT 0,
+        extra TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS vendor_ledger (
+        id INTEGER PRIMARY KEY,
+        date TEXT,
+        vendor_name TEXT,
+        vendor_type TEXT,
+        item_name TEXT,
+        quantity REAL,
+        rate REAL,
+        total_amount REAL,
+        notes TEXT,
+        extra TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_vendor_ledger_vendor ON vendor_ledger (vendor_name, date);
+    CREATE INDEX IF NOT EXISTS idx_vendor_ledger_type ON vendor_ledger (vendor_type, date);
+    CREATE INDEX IF NOT EXISTS idx_vendor_ledger_date ON vendor_ledger (date);
+
+    CREATE TABLE IF NOT EXISTS vendor_payments (
+        id INTEGER PRIMARY KEY,
+        date TEXT,
+        vendor_name TEXT,
+        amount REAL,
+        method TEXT,
+        notes TEXT,
+        extra TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_vendor_payments_vendor ON vendor_payments (vendor_name, date);
+    CREATE INDEX IF NOT EXISTS idx_vendor_payments_date ON vendor_payments (date);
+
+    CREATE TABLE IF NOT EXISTS production_history (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        date TEXT,
+        product TEXT,
+        batch_size INTEGER,
+        status TEXT,
+        type TEXT,
+        extra TEXT
+    );
+    CREATE INDEX IF NOT EXISTS idx_production_history_date ON production_history (date);
+
+    CREATE TABLE IF NOT EXISTS product_details (
+        product_name TEXT PRIMARY KEY,
+        name TEXT,
+        description TEXT,
+        web_link TEXT,
+        category TEXT,
+        composition TEXT,
+        image_uploaded INTEGER,
+        extra TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS sequences (
+        collection TEXT PRIMARY KEY,
+        next_id INTEGER NOT NULL,
+        extra TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS settings (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+class SqliteStorage:
+    """Storage backend keeping every collection in indexed SQLite tables
+
+    Each save applies the pending change records as row-level statements in a
+    single transaction, so its cost depends on the size of the change. The
+    change sequence is kept in the ``meta`` table for backups.
+    """
+
+    def __init__(self, path=SQLITE_DB_FILE):
+        self.path = path
+        self.lock = threading.RLock()
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SQLITE_SCHEMA)
+        self.seq = int(self.get_meta('journal_seq') or 0)
+
+    def get_meta(self, key):
+        with self.lock:
+            row = self.conn.execute("SELECT value FROM meta WHERE key = ?", (key,)).fetchone()
+            return row[0] if row else None
+
+    def set_meta(self, key, value):
+        with self.lock, self.conn:
+            self._write_meta(key, value)
+
+    def _write_meta(self, key, value):
+        self.conn.execute(
+            "INSERT INTO meta (key, value) VALUES (?, ?) "
+            "ON CONFLICT(key) DO UPDATE SET value = excluded.value",
+            (key, str(value))
+        )
+
+    def to_row(self, collection, key, record):
+        """Convert a record to column values in table order"""
+        key_column, columns = SQLITE_TABLES[collection]
+        row = []
+        for column in columns:
+            value = key if column == key_column and collection in KEYED_COLLECTIONS else record.get(column)
+            if column in SQLITE_JSON_COLUMNS and value is not None:
+                value = json.dumps(value)
+            row.append(value)
+        extra = {field: value for field, value in record.items() if field not in columns}
+        row.append(json.dumps(extra) if extra else None)
+        return row
+
+    def to_record(self, collection, row):
+        """Convert a table row back to (key, record)"""
+        key_column, columns = SQLITE_TABLES[collection]
+        record = dict(zip(columns, row[:-1]))
+        for column in SQLITE_JSON_COLUMNS:
+            if record.get(column) is not None:
+                record[column] = json.loads(record[column])
+        if row[-1]:
+            record.update(json.loads(row[-1]))
+        key = record.pop(key_column) if collection in KEYED_COLLECTIONS else record.get(key_column)
+        return key, record
+
+    def select(self, collection, where='', params=()):
+        """Return records of a collection matching an optional WHERE clause"""
+        key_column, columns = SQLITE_TABLES[collection]
+        with self.lock:
+            rows = self.conn.execute(
+                f"SELECT {', '.join(columns)}, extra FROM {collection} {where} ORDER BY rowid",
+                params
+            ).fetchall()
+        return [self.to_record(collection, row) for row in rows]
+
+    def load(self):
+        with self.lock:
+            data = empty_data()
+            for collection in SQLITE_TABLES:
+                records = self.select(collection)
+                if collection in KEYED_COLLECTIONS:
+                    data[collection] = dict(records)
+                else:
+                    data[collection] = [record for _, record in records]
+            for key, value in self.conn.execute("SELECT key, value FROM settings"):
+                data['settings'][key] = json.loads(value)
+            return data
+
+    def version(self):
+        return file_version(self.path), file_version(f"{self.path}-wal")
+
+    def _upsert(self, collection, key, record):
+        key_column, columns = SQLITE_TABLES[collection]
+        names = columns + ('extra',)
+        updates = ', '.join(f"{name} = excluded.{name}" for name in names if name != key_column)
+        self.conn.execute(
+            f"INSERT INTO {collection} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))}) "
+            f"ON CONFLICT({key_column}) DO UPDATE SET {updates}",
+            self.to_row(collection, key, record)
+        )
+
+    def _insert_all(self, collection, value):
+        key_column, columns = SQLITE_TABLES[collection]
+        names = columns + ('extra',)
+        items = value.items() if collection in KEYED_COLLECTIONS else ((None, record) for record in value)
+        self.conn.executemany(
+            f"INSERT INTO {collection} ({', '.join(names)}) VALUES ({', '.join('?' * len(names))})",
+            [self.to_row(collection, key, record) for key, record in items]
+        )
+
+    def _replace(self, collection, value):
+        if collection == 'settings':
+            self.conn.execute("DELETE FROM settings")
+            self.conn.executemany(
+                "INSERT INTO settings (key, value) VALUES (?, ?)",
+                [(key, json.dumps(item)) for key, item in value.items()]
+            )
+        else:
+            self.conn.execute(f"DELETE FROM {collection}")
+            self._insert_all(collection, value)
+
+    def _apply(self, change):
+        op = change['op']
+        collection = change['collection']
+        if op == 'replace':
+            self._replace(collection, change['value'])
+        elif op == 'append':
+            self._insert_all(collection, [change['value']])
+        elif op == 'upsert':
+            self._upsert(collection, change['key'], change['value'])
+        elif op == 'delete':
+            key_column = SQLITE_TABLES[collection][0]
+            self.conn.execute(f"DELETE FROM {collection} WHERE {key_column} = ?", (change['key'],))
+
+    def save(self, data, changes):
+        if not changes:
+            return
+        with self.lock, self.conn:
+            for change in changes:
+                self.seq += 1
+                change['seq'] = self.seq
+                self._apply(change)
+            self._write_meta('journal_seq', self.seq)
+
+    def compact(self, data):
+        """Rewrite every table from a full data set"""
+        with self.lock, self.conn:
+            for collection in SQLITE_TABLES:
+                self._replace(collection, data[collection])
+            self._replace('settings', data['settings'])
+            self._write_meta('journal_seq', self.seq)
+
+def migrate_json_to_sqlite(storage, snapshot_path=DATA_FILE, journal_path=JOURNAL_FILE):
+    """Import the JSON snapshot and journal into SQLite once; return True if data was moved"""
+    if storage.get_meta('migrated_from') is not None:
+        return False
+
+    migrated = os.path.exists(snapshot_path) or os.path.exists(journal_path)
+    if migrated:
+        storage.compact(JournalStorage(snapshot_path, journal_path).load())
+    storage.set_meta('migrated_from', snapshot_path if migrated else '')
+    return migrated
+
+STORAGE_BACKENDS = {
+    'json': JsonFileStorage,
+    'journal': JournalStorage,
+    'sqlite': SqliteStorage
+}
+STORAGE_BACKEND = 'sqlite'
+
+@st.cache_resource
+def get_storage():
+    """Return the process-wide storage backend"""
+    storage = STORAGE_BACKENDS[STORAGE_BACKEND]()
+    if isinstance(storage, SqliteStorage):
+        migrate_json_to_sqlite(storage)
+    return storage
+
+class ChemicalRepository:
+    """Indexed read queries over the SQLite tables"""
+
+    def __init__(self, storage):
+        self.storage = storage
+
+    def _column(self, sql, params=()):
+        with self.storage.lock:
+            return [row[0] for row in self.storage.conn.execute(sql, params)]
+
+    def vendor_types(self):
+        return self._column("SELECT DISTINCT vendor_type FROM vendor_ledger ORDER BY vendor_type")
+
+    def vendor_transactions(self, vendor_type=None, vendor_name=None):
+        if vendor_type:
+            records = self.storage.select('vendor_ledger', "WHERE vendor_type = ?", (vendor_type,))
+        elif vendor_name:
+            records = self.storage.select('vendor_ledger', "WHERE vendor_name = ?", (vendor_name,))
+        else:
+            records = self.storage.select('vendor_ledger')
+        return [record for _, record in records]
+
+    def vendor_payments(self, vendor_type=None, vendor_name=None):
+        if vendor_type:
+            records = self.storage.select(
+                'vendor_payments',
+                "WHERE vendor_name IN (SELECT vendor_name FROM vendor_ledger WHERE vendor_type = ?)",
+                (vendor_type,)
+            )
+        elif vendor_name:
+            records = self.storage.select('vendor_payments', "WHERE vendor_name = ?", (vendor_name,))
+        else:
+            records = self.storage.select('vendor_payments')
+        return [record for _, record in records]
+
+def get_repository():
+    """Return the query repository when data lives in SQLite, otherwise None"""
+    storage = get_storage()
+    return ChemicalRepository(storage) if isinstance(storage, SqliteStorage) else None
+
+class DataStore:
+    """Process-wide in-memory data set shared by every session and rerun
+
+    The data is loaded once through the storage backend. Each rerun only
+    compares the backend's on-disk version marker and reloads when the files
+    were changed by someone else, e.g. another process or a manual edit.
+    """
+
+    def __init__(self, storage):
+        self.storage = storage
+        self.lock = threading.RLock()
+        self.data = None
+        self.version = None
+        self.catalog = None
+        self.vendor_totals = None
+        self.id_synced = {}
+
+    def get(self):
+        """Return the shared data set, reloading it only if the on-disk version changed"""
+        with self.lock:
+            version = self.storage.version()
+            if self.data is None or version != self.version:
+                self.data = self.storage.load()
+                self.version = version
+            return self.data
+
+    def commit(self, data):
+        """Adopt the saved collections and the on-disk version our own write produced"""
+        with self.lock:
+            self.data = data
+            self.version = self.storage.version()
+
+    def discard(self):
+        """Forget the in-memory data set, e.g. after a failed import edited it, so the next get() reads disk"""
+        with self.lock:
+            self.data = None
+
+@st.cache_resource
+def get_data_store():
+    """Return the process-wide data store"""
+    return DataStore(get_storage())
+
+class ChemicalCatalog:
+    """Name and id index over a chemicals list
+
+    The index holds the same record objects as the list, so lookups return
+    records that can be edited in place. Adds, renames and removals go through
+    the catalog to keep the list and the index in step.
+    """
+
+    def __init__(self, chemicals):
+        self.chemicals = chemicals
+        self.by_id = {}
+        for chem in chemicals:
+            self.by_id.setdefault(chem['id'], chem)
+        self._index_names()
+
+    def _index_names(self):
+        # The first record wins on duplicate names, matching a linear scan
+        self.by_name = {}
+        self.by_folded_name = {}
+        for chem in self.chemicals:
+            self.by_name.setdefault(chem['name'], chem)
+            self.by_folded_name.setdefault(str(chem['name']).lower(), chem)
+
+    def get(self, chemical_id):
+        return self.by_id.get(chemical_id)
+
+    def find(self, name):
+        return self.by_name.get(name)
+
+    def exists(self, name, ignore_case=False):
+        if ignore_case:
+            return str(name).lower() in self.by_folded_name
+        return name in self.by_name
+
+    def add(self, chemical):
+        self.chemicals.append(chemical)
+        self.by_id.setdefault(chemical['id'], chemical)
+        self.by_name.setdefault(chemical['name'], chemical)
+        self.by_folded_name.setdefault(str(chemical['name']).lower(), chemical)
+
+    def rename(self, chemical, name):
+        chemical['name'] = name
+        self._index_names()
+
+    def remove(self, chemical_id):
+        chemical = self.by_id.pop(chemical_id, None)
+        if chemical is not None:
+            self.chemicals.remove(chemical)
+            self._index_names()
+        return chemical
+
+class VendorAggregates:
+    """Running per-vendor totals over the vendor ledger and payments
+
+    Totals are adjusted as transactions and payments are added, edited and
+    removed, so a balance is read in O(1) instead of summing both lists.
+    ``check`` rebuilds the totals from scratch and reports any drift.
+    """
+
+    def __init__(self, ledger, payments):
+        self.ledger = ledger
+        self.payments = payments
+        self.vendors = self._build()
+
+    def _build(self):
+        vendors = {}
+        for transaction in self.ledger:
+            self._apply(vendors, transaction, 'purchases', 'total_amount', 1)
+        for payment in self.payments:
+            self._apply(vendors, payment, 'payments', 'amount', 1)
+        return vendors
+
+    @staticmethod
+    def _apply(vendors, record, total, amount_field, sign):
+        vendor = vendors.setdefault(record['vendor_name'], {
+            'purchases': 0.0,
+            'payments': 0.0,
+            'records': {'purchases': 0, 'payments': 0},
+            'dates': {}
+        })
+        vendor['records'][total] += sign
+        # Reset an emptied total so float residue never shows as a balance
+        vendor[total] = vendor[total] + sign * record[amount_field] if vendor['records'][total] else 0.0
+        dates = vendor['dates']
+        dates[record['date']] = dates.get(record['date'], 0) + sign
+        if not dates[record['date']]:
+            del dates[record['date']]
+        if not vendor['records']['purchases'] and not vendor['records']['payments']:
+            del vendors[record['vendor_name']]
+
+    def add_transaction(self, transaction):
+        self._apply(self.vendors, transaction, 'purchases', 'total_amount', 1)
+
+    def remove_transaction(self, transaction):
+        self._apply(self.vendors, transaction, 'purchases', 'total_amount', -1)
+
+    def add_payment(self, payment):
+        self._apply(self.vendors, payment, 'payments', 'amount', 1)
+
+    def remove_payment(self, payment):
+        self._apply(self.vendors, payment, 'payments', 'amount', -1)
+
+    def summary(self, vendor_name):
+        """Return purchases, payments, balance and last activity date for a vendor"""
+        vendor = self.vendors.get(vendor_name)
+        if vendor is None:
+            return {'purchases': 0.0, 'payments': 0.0, 'balance': 0.0, 'last_activity': None}
+        return {
+            'purchases': vendor['purchases'],
+            'payments': vendor['payments'],
+            'balance': vendor['purchases'] - vendor['payments'],
+            'last_activity': max(vendor['dates']) if vendor['dates'] else None
         }
-        
-        with open('green_data.json', 'w') as f:
-            json.dump(data, f, indent=4)
-        
-        # Also create backup with timestamp
-        backup_filename = f"backup/green_data_backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json"
-        os.makedirs('backup', exist_ok=True)
-        with open(backup_filename, 'w') as f:
-            json.dump(data, f, indent=4)
-            
+
+    def vendor_names(self):
+        """Return the sorted names of vendors with ledger transactions"""
+        return sorted(name for name, vendor in self.vendors.items() if vendor['records']['purchases'])
+
+    def check(self):
+        """Rebuild the totals from scratch and return the vendors whose running totals drifted"""
+        rebuilt = self._build()
+        drifted = []
+        for name in set(self.vendors) | set(rebuilt):
+            current = self.vendors.get(name)
+            expected = rebuilt.get(name)
+            if (current is None or expected is None
+                    or abs(current['purchases'] - expected['purchases']) > 0.005
+                    or abs(current['payments'] - expected['payments']) > 0.005
+                    or current['records'] != expected['records']
+                    or current['dates'] != expected['dates']):
+                drifted.append(name)
+        self.vendors = rebuilt
+        return sorted(drifted)
+
+# Backup configuration
+BACKUP_DIR = 'backup'
+BACKUP_FULL_INTERVAL = 3600  # Seconds between full snapshots; saves in between write deltas
+BACKUP_RETENTION = {'hourly': 24, 'daily': 7, 'weekly': 4}  # Full snapshots kept per tier
+
+class BackupManager:
+    """Writes backups on a background thread with tiered retention
+
+    Every save hands its change records to the worker, which writes them as a
+    gzip-compressed delta against the latest full snapshot. A full snapshot is
+    taken at most once per ``full_interval`` (or when forced by a wholesale
+    change) and is skipped if its content hash matches the previous one. Full
+    snapshots are thinned to the newest one per hour, day and week according
+    to ``retention``; deltas older than the newest full snapshot are removed.
+    """
+
+    FULL_PREFIX = 'green_data_full_'
+    DELTA_PREFIX = 'green_data_delta_'
+    LEGACY_PREFIX = 'green_data_backup_'
+
+    def __init__(self, storage, backup_dir=BACKUP_DIR, full_interval=BACKUP_FULL_INTERVAL,
+                 retention=BACKUP_RETENTION):
+        self.storage = storage
+        self.backup_dir = backup_dir
+        self.full_interval = full_interval
+        self.retention = retention
+        os.makedirs(backup_dir, exist_ok=True)
+
+        fulls = self._list_backups()[0]
+        self.last_full_time = fulls[-1][0].timestamp() if fulls else 0
+        self.last_full_hash = self._hash_from_name(fulls[-1][1]) if fulls else None
+
+        self.lock = threading.Lock()
+        self.queue = queue.Queue()
+        self.worker = threading.Thread(target=self._run, name='backup-worker', daemon=True)
+        self.worker.start()
+        atexit.register(self.queue.join)
+
+    def submit(self, changes, data, full=False):
+        """Queue a backup of a save without blocking the caller on disk writes
+
+        data is the data set as just saved. When a full snapshot is due it is
+        serialized here, on the caller's thread while it still matches the
+        store; the worker only writes files.
+        """
+        snapshot = None
+        with self.lock:
+            now = datetime.now().timestamp()
+            if full or now - self.last_full_time >= self.full_interval:
+                self.last_full_time = now
+                try:
+                    snapshot = json.dumps(dict(data, journal_seq=self.storage.seq), sort_keys=True,
+                                          separators=(',', ':'))
+                except (TypeError, ValueError) as e:
+                    print(f"Backup error: {e}")
+        if snapshot is not None:
+            changes = []  # The snapshot already contains them; replaying them would apply them twice
+        if changes or snapshot is not None:
+            self.queue.put((list(changes), snapshot))
+
+    def _run(self):
+        while True:
+            changes, snapshot = self.queue.get()
+            jobs = 1
+            # Fold everything queued meanwhile into one write; a newer snapshot
+            # already contains every change queued before it
+            while not self.queue.empty():
+                more_changes, more_snapshot = self.queue.get()
+                if more_snapshot is not None:
+                    changes, snapshot = [], more_snapshot
+                else:
+                    changes.extend(more_changes)
+                jobs += 1
+            try:
+                self._write(changes, snapshot)
+            except Exception as e:
+                print(f"Backup error: {e}")
+            finally:
+                for _ in range(jobs):
+                    self.queue.task_done()
+
+    def _write(self, changes, snapshot):
+        now = datetime.now()
+        if snapshot is not None:
+            self._write_full(now, snapshot)
+        if changes:
+            path = os.path.join(self.backup_dir, f"{self.DELTA_PREFIX}{now.strftime('%Y%m%d_%H%M%S_%f')}.jsonl.gz")
+            with gzip.open(path, 'wt') as f:
+                for change in changes:
+                    f.write(json.dumps(change, separators=(',', ':')) + '\n')
+
+    def _write_full(self, now, snapshot):
+        content_hash = hashlib.sha256(snapshot.encode()).hexdigest()[:16]
+        if content_hash != self.last_full_hash:
+            # Microseconds, like deltas, so a delta written earlier in the same second sorts before it
+            path = os.path.join(self.backup_dir,
+                                f"{self.FULL_PREFIX}{now.strftime('%Y%m%d_%H%M%S_%f')}_{content_hash}.json.gz")
+            with gzip.open(path, 'wt') as f:
+                f.write(snapshot)
+            self.last_full_hash = content_hash
+        self._prune()
+
+    def _hash_from_name(self, name):
+        if name.startswith(self.FULL_PREFIX):
+            return name.split('_')[-1].split('.')[0]
+        return None
+
+    def _list_backups(self):
+        """Return (full, delta) lists of (timestamp, file name), oldest first"""
+        fulls, deltas = [], []
+        # Legacy whole-file backups count as full snapshots for retention
+        # Full snapshots written before they carried microseconds are stamped to the second
+        patterns = (
+            (self.FULL_PREFIX, fulls, ('%Y%m%d_%H%M%S_%f', '%Y%m%d_%H%M%S')),
+            (self.LEGACY_PREFIX, fulls, ('%Y%m%d_%H%M%S',)),
+            (self.DELTA_PREFIX, deltas, ('%Y%m%d_%H%M%S_%f',))
+        )
+        for name in os.listdir(self.backup_dir):
+            for prefix, target, stamp_formats in patterns:
+                if not name.startswith(prefix):
+                    continue
+                stamp_text = name[len(prefix):].split('.')[0]
+                if prefix == self.FULL_PREFIX:
+                    stamp_text = stamp_text.rsplit('_', 1)[0]
+                for stamp_format in stamp_formats:
+                    try:
+                        target.append((datetime.strptime(stamp_text, stamp_format), name))
+                        break
+                    except ValueError:
+                        pass
+        return sorted(fulls), sorted(deltas)
+
+    def _prune(self):
+        fulls, deltas = self._list_backups()
+        if not fulls:
+            return
+
+        keep = {fulls[-1][1]}
+        tiers = {
+            'hourly': lambda stamp: stamp.strftime('%Y%m%d%H'),
+            'daily': lambda stamp: stamp.strftime('%Y%m%d'),
+            'weekly': lambda stamp: stamp.strftime('%G%V')
+        }
+        for tier, bucket_of in tiers.items():
+            buckets = {}
+            for stamp, name in reversed(fulls):
+                bucket = bucket_of(stamp)
+                if bucket not in buckets and len(buckets) < self.retention.get(tier, 0):
+                    buckets[bucket] = name
+            keep.update(buckets.values())
+
+        newest_full = fulls[-1][0]
+        stale = [name for _, name in fulls if name not in keep]
+        stale += [name for stamp, name in deltas if stamp < newest_full]
+        for name in stale:
+            os.remove(os.path.join(self.backup_dir, name))
+
+    def restore(self):
+        """Rebuild the latest backed-up data set from the newest full snapshot and its deltas"""
+        self.queue.join()
+        fulls, deltas = self._list_backups()
+        if not fulls:
+            return None
+
+        newest_full, name = fulls[-1]
+        opener = gzip.open if name.endswith('.gz') else open
+        with opener(os.path.join(self.backup_dir, name), 'rt') as f:
+            data = empty_data()
+            data.update(json.load(f))
+        full_seq = data.pop('journal_seq', 0)
+
+        changes = []
+        for stamp, delta_name in deltas:
+            if stamp >= newest_full:
+                with gzip.open(os.path.join(self.backup_dir, delta_name), 'rt') as f:
+                    changes.extend(json.loads(line) for line in f)
+        # Skip changes the full snapshot already contains
+        changes = [change for change in changes if change.get('seq', full_seq + 1) > full_seq]
+        return replay_changes(data, changes)
+
+@st.cache_resource
+def get_backup_manager():
+    """Return the process-wide backup manager"""
+    return BackupManager(get_storage())
+
+def record_change(op, collection, key=None, value=None):
+    """Queue a single mutation to be persisted by the next save_data() call
+
+    op is one of 'upsert', 'delete', 'append' or 'replace'. For list
+    collections the key is the record id, for dict collections the dict key.
+    """
+    st.session_state.pending_changes.append({
+        'op': op,
+        'collection': collection,
+        'key': key,
+        'value': value
+    })
+
+@contextmanager
+def editing_data():
+    """Hold the data store lock while shared collections are edited and saved
+
+    Session state is bound to the store's collections, which every session
+    shares, so an edit and the save that persists it must not interleave with
+    another session's. The lock is reentrant, so helpers can nest.
+    """
+    with get_data_store().lock:
+        yield
+
+def current_data():
+    """Collect all persisted collections from session state"""
+    return {name: st.session_state[name] for name in DATA_COLLECTIONS}
+
+# Data persistence functions
+def save_data(compact=False, full_backup=False):
+    """Persist queued changes, or a full snapshot when compact is set
+
+    full_backup asks the backup manager for a full snapshot rather than a
+    delta, e.g. after a bulk import.
+    """
+    try:
+        data = current_data()
+        changes = st.session_state.pending_changes
+        storage = get_storage()
+        store = get_data_store()
+        with store.lock:
+            if compact:
+                storage.compact(data)
+            else:
+                storage.save(data, changes)
+            store.commit(data)
+            # Hand the change set to the backup worker, which writes it off the request path
+            get_backup_manager().submit(changes, data, full=compact or full_backup)
+        st.session_state.pending_changes = []
+
     except Exception as e:
         st.error(f"Error saving data: {str(e)}")
 
+def discard_unsaved_changes():
+    """Drop queued changes and rebind session state to the data as last saved, e.g. after a failed import"""
+    st.session_state.pending_changes = []
+    get_data_store().discard()
+    load_data()
+
 def load_data():
-    """Load all data from JSON files"""
+    """Bind session state to the shared data store, reading disk only when it changed"""
     try:
-        if os.path.exists('green_data.json'):
-            with open('green_data.json', 'r') as f:
-                data = json.load(f)
-                
-            st.session_state.chemicals = data.get('chemicals', [])
-            st.session_state.packaging_materials = data.get('packaging_materials', {})
-            st.session_state.vendor_ledger = data.get('vendor_ledger', [])
-            st.session_state.vendor_payments = data.get('vendor_payments', [])
-            st.session_state.production_history = data.get('production_history', [])
-            st.session_state.product_details = data.get('product_details', {})
-            st.session_state.settings = data.get('settings', {
-                'company_name': "HMD Solutions",
-                'default_batch_size': 500,
-                'low_stock_threshold': 5.0,
-                'packaging_low_stock': 10
-            })
+        data = get_data_store().get()
+        for name in DATA_COLLECTIONS:
+            st.session_state[name] = data[name]
     except Exception as e:
         st.error(f"Error loading data: {str(e)}")
 
-def auto_save():
+def auto_save(compact=False):
     """Auto-save data with user feedback"""
-    save_data()
+    save_data(compact)
     st.toast("💾 Data saved successfully!", icon="✅")
 
 # Initialize session state for data persistence
@@ -336,13 +1229,17 @@ if 'production_history' not in st.session_state:
 if 'product_details' not in st.session_state:
     st.session_state.product_details = {}
 
+if 'sequences' not in st.session_state:
+    st.session_state.sequences = {}
+
 if 'settings' not in st.session_state:
-    st.session_state.settings = {
-        'company_name': "HMD Solutions",
-        'default_batch_size': 500,
-        'low_stock_threshold': 5.0,
-        'packaging_low_stock': 10
-    }
+    st.session_state.settings = dict(DEFAULT_SETTINGS)
+
+if 'pending_changes' not in st.session_state:
+    st.session_state.pending_changes = []
+
+if 'report_jobs' not in st.session_state:
+    st.session_state.report_jobs = {}
 
 if 'editing_chemical' not in st.session_state:
     st.session_state.editing_chemical = None
@@ -356,7 +1253,7 @@ if 'editing_payment' not in st.session_state:
 if 'current_product_details' not in st.session_state:
     st.session_state.current_product_details = {}
 
-# Load data on startup
+# Bind to the shared data store (re-reads disk only if the data files changed)
 load_data()
 
 # Cache product formulas for better performance
@@ -472,23 +1369,37 @@ def show_alert(message, type="info"):
     else:
         st.info(message)
 
+def reserve_ids(collection, count=1):
+    """Reserve a contiguous block of ids for an id-keyed collection and return the first one
+
+    Each collection keeps a persisted next_id, so allocation is O(1) and ids
+    are never reused. When the collection's list is replaced (load, import or
+    clear), the sequence is moved past the largest existing id once.
+    """
+    store = get_data_store()
+    with store.lock:
+        records = st.session_state[collection]
+        next_id = st.session_state.sequences.get(collection, {}).get('next_id', 1)
+        if store.id_synced.get(collection) is not records:
+            next_id = max([next_id] + [int(record['id']) + 1 for record in records])
+            store.id_synced[collection] = records
+
+        sequence = {'next_id': next_id + count}
+        st.session_state.sequences[collection] = sequence
+        record_change('upsert', 'sequences', collection, sequence)
+        return next_id
+
 def get_next_chemical_id():
     """Get next chemical ID"""
-    if not st.session_state.chemicals:
-        return 1
-    return max(chem['id'] for chem in st.session_state.chemicals) + 1
+    return reserve_ids('chemicals')
 
 def get_next_vendor_id():
     """Get next vendor transaction ID"""
-    if not st.session_state.vendor_ledger:
-        return 1
-    return max(vendor['id'] for vendor in st.session_state.vendor_ledger) + 1
+    return reserve_ids('vendor_ledger')
 
 def get_next_payment_id():
     """Get next payment ID"""
-    if not st.session_state.vendor_payments:
-        return 1
-    return max(payment['id'] for payment in st.session_state.vendor_payments) + 1
+    return reserve_ids('vendor_payments')
 
 def update_dashboard():
     """Update dashboard statistics"""
@@ -500,19 +1411,115 @@ def update_dashboard():
 
     return total_chemicals, low_stock_count, out_of_stock_count, total_packaging
 
+# Inventory API: chemical lookups and changes go through the shared catalog
+def get_chemical_catalog():
+    """Return the catalog for the session's chemicals list, rebuilding it if the list was replaced"""
+    store = get_data_store()
+    with store.lock:
+        if store.catalog is None or store.catalog.chemicals is not st.session_state.chemicals:
+            store.catalog = ChemicalCatalog(st.session_state.chemicals)
+        return store.catalog
+
+def get_chemical(chemical_id):
+    """Return the chemical with this id, or None"""
+    return get_chemical_catalog().get(chemical_id)
+
+def find_chemical(name):
+    """Return the chemical with this exact name, or None"""
+    return get_chemical_catalog().find(name)
+
+def chemical_exists(name, ignore_case=False):
+    """Check whether a chemical with this name is in inventory"""
+    return get_chemical_catalog().exists(name, ignore_case)
+
+def add_chemical(chemical):
+    """Add a new chemical record to inventory"""
+    with editing_data():
+        get_chemical_catalog().add(chemical)
+
+def rename_chemical(chemical, name):
+    """Rename a chemical record in place"""
+    with editing_data():
+        get_chemical_catalog().rename(chemical, name)
+
+def remove_chemical(chemical_id):
+    """Remove a chemical from inventory and return its record"""
+    with editing_data():
+        return get_chemical_catalog().remove(chemical_id)
+
+# Vendor API: ledger and payment changes keep the running vendor totals in step
+def get_vendor_aggregates():
+    """Return the vendor totals for the session's ledger and payments, rebuilding them if either list was replaced"""
+    store = get_data_store()
+    with store.lock:
+        totals = store.vendor_totals
+        if (totals is None or totals.ledger is not st.session_state.vendor_ledger
+                or totals.payments is not st.session_state.vendor_payments):
+            store.vendor_totals = VendorAggregates(st.session_state.vendor_ledger, st.session_state.vendor_payments)
+        return store.vendor_totals
+
+def add_vendor_transaction(transaction):
+    """Add a transaction to the vendor ledger"""
+    with editing_data():
+        aggregates = get_vendor_aggregates()
+        st.session_state.vendor_ledger.append(transaction)
+        aggregates.add_transaction(transaction)
+
+def update_vendor_transaction(transaction, changes):
+    """Apply field changes to a vendor ledger transaction in place"""
+    with editing_data():
+        aggregates = get_vendor_aggregates()
+        aggregates.remove_transaction(transaction)
+        transaction.update(changes)
+        aggregates.add_transaction(transaction)
+
+def remove_vendor_transaction(transaction):
+    """Remove a transaction from the vendor ledger"""
+    with editing_data():
+        aggregates = get_vendor_aggregates()
+        st.session_state.vendor_ledger.remove(transaction)
+        aggregates.remove_transaction(transaction)
+
+def add_vendor_payment(payment):
+    """Add a vendor payment"""
+    with editing_data():
+        aggregates = get_vendor_aggregates()
+        st.session_state.vendor_payments.append(payment)
+        aggregates.add_payment(payment)
+
+def update_vendor_payment(payment, changes):
+    """Apply field changes to a vendor payment in place"""
+    with editing_data():
+        aggregates = get_vendor_aggregates()
+        aggregates.remove_payment(payment)
+        payment.update(changes)
+        aggregates.add_payment(payment)
+
+def remove_vendor_payment(payment):
+    """Remove a vendor payment"""
+    with editing_data():
+        aggregates = get_vendor_aggregates()
+        st.session_state.vendor_payments.remove(payment)
+        aggregates.remove_payment(payment)
+
+def check_vendor_aggregates():
+    """Rebuild the vendor totals from the ledger and payments; return vendors that had drifted"""
+    return get_vendor_aggregates().check()
+
+def get_vendor_names():
+    """Return the sorted names of vendors in the ledger"""
+    return get_vendor_aggregates().vendor_names()
+
+def get_vendor_types():
+    """Return the sorted vendor types in the ledger"""
+    repository = get_repository()
+    if repository:
+        return repository.vendor_types()
+    return sorted(set(v['vendor_type'] for v in st.session_state.vendor_ledger))
+
 def calculate_vendor_balance(vendor_name):
     """Calculate vendor balance (total purchases - total payments)"""
-    total_purchases = sum(
-        ledger['total_amount']
-        for ledger in st.session_state.vendor_ledger
-        if ledger['vendor_name'] == vendor_name
-    )
-    total_payments = sum(
-        payment['amount']
-        for payment in st.session_state.vendor_payments
-        if payment['vendor_name'] == vendor_name
-    )
-    return total_purchases - total_payments
+    return get_vendor_aggregates().summary(vendor_name)['balance']
 
 def convert_grams_to_kg(amount_in_grams):
     """Convert grams to kilograms"""
@@ -522,51 +1529,76 @@ def convert_kg_to_grams(amount_in_kg):
     """Convert kilograms to grams"""
     return amount_in_kg * 1000.0
 
-# PDF creation functions with professional watermark and signature
-def add_watermark(canvas, doc):
-    """Add professional watermark to PDF pages"""
-    try:
-        if os.path.exists("logo.png"):
-            # Set watermark with very low opacity for professional look
-            canvas.saveState()
-            canvas.setFillAlpha(0.03)  # Reduced opacity for professional look
-            # Center the watermark
-            watermark = ImageReader("logo.png")
-            img_width, img_height = watermark.getSize()
-            aspect = img_height / float(img_width)
-
-            # Adjust size to cover most of the page but not too prominent
-            display_width = 500
-            display_height = display_width * aspect
-
-            x = (doc.pagesize[0] - display_width) / 2
-            y = (doc.pagesize[1] - display_height) / 2
-
-            canvas.drawImage("logo.png", x, y, width=display_width, height=display_height)
-            canvas.restoreState()
-    except Exception as e:
-        print(f"Watermark error: {e}")
-
-@st.cache_data(ttl=300)
-def create_vendor_ledger_pdf(vendor_type=None, vendor_name=None):
-    """Create professional PDF for vendor ledger with detailed transaction history and summary"""
-    buffer = BytesIO()
+def render_report_job(name, label, file_name, key):
+    """Show a queued report's progress, or its download button once it is ready"""
+    job = st.session_state.report_jobs.get(name)
+    if job is None:
+        return
+    if not job.done:
+        st.info(f"⏳ Generating PDF in the background... {job.pages} page(s) rendered")
+        if st.button("🔄 Check Report", use_container_width=True, key=f"check_{key}"):
+            st.rerun()
+    elif job.error:
+        show_alert(f"Error generating PDF: {job.error}", "error")
+    else:
+        st.download_button(
+            label=label,
+            data=job.read(),
+            file_name=file_name,
+            mime="application/pdf",
+            use_container_width=True,
+            key=key
+        )
 
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=40, bottomMargin=40)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=20,
-        textColor=colors.HexColor('#1E90FF'),
-        alignment=1
-    )
+# PDF reports: templates laid out by the shared report engine with the company theme
+REPORT_THEME = Theme(
+    'chemical',
+    text={
+        'title': {'bold': True, 'size': 16, 'leading': 22, 'align': 'C', 'color': '#1E90FF', 'space_after': 20},
+        'body': {'size': 10, 'leading': 12},
+        'heading': {'bold': True, 'size': 14, 'leading': 18, 'space_before': 12, 'space_after': 6},
+        'signature': {'size': 10, 'leading': 12, 'align': 'C', 'space_before': 5},
+    },
+    tables={
+        'primary': {'header_fill': '#1E90FF', 'header_color': '#F5F5F5', 'header_size': 9, 'header_padding': 8,
+                    'size': 8, 'fill': '#f8f9fa', 'grid': 0.5},
+        'secondary': {'header_fill': '#0047AB', 'header_color': '#F5F5F5', 'header_size': 9, 'header_padding': 8,
+                      'size': 8, 'fill': '#ecf0f1', 'grid': 0.5},
+        'summary': {'header_fill': '#1E90FF', 'header_color': '#F5F5F5', 'align': 'L', 'fill': '#bdc3c7', 'grid': 0.5},
+        'summary_secondary': {'header_fill': '#0047AB', 'header_color': '#F5F5F5', 'align': 'L', 'fill': '#bdc3c7',
+                              'grid': 0.5},
+        'production': {'header_fill': '#1E90FF', 'header_color': '#F5F5F5', 'fill': '#f8f9fa', 'grid': 0.5},
+        'costs': {'header_fill': '#0047AB', 'header_color': '#F5F5F5', 'align': 'L'},
+    },
+    margins=(40, 40)
+)
 
-    # Filter data based on vendor type or vendor name
-    if vendor_type:
+def signature_blocks():
+    """Return the accountant signature that closes the reports"""
+    return [
+        Spacer(25),
+        Signature(),
+        Text("Accountant Signature<br/><b>HMD Solutions</b>", 'signature')
+    ]
+
+def summary_table(rows, widths, style):
+    """Return a two-column summary table; its first row is drawn in the header band"""
+    (label, value), *rest = rows
+    return DataTable([(label, widths[0]), (value, widths[1])], [(row, None) for row in rest], style)
+
+def vendor_ledger_report_inputs(vendor_type=None, vendor_name=None):
+    """Return the title, transactions and payments a vendor ledger report reads"""
+    repository = get_repository()
+    if repository:
+        filtered_data = repository.vendor_transactions(vendor_type, vendor_name)
+        filtered_payments = repository.vendor_payments(vendor_type, vendor_name)
+        if vendor_type:
+            title_text = f"HMD Solutions - {vendor_type.upper()} VENDOR LEDGER REPORT"
+        elif vendor_name:
+            title_text = f"HMD Solutions - {vendor_name.upper()} LEDGER REPORT"
+        else:
+            title_text = "HMD Solutions - COMPLETE VENDOR LEDGER REPORT"
+    elif vendor_type:
         filtered_data = [v for v in st.session_state.vendor_ledger if v['vendor_type'] == vendor_type]
         title_text = f"HMD Solutions - {vendor_type.upper()} VENDOR LEDGER REPORT"
         filtered_payments = [p for p in st.session_state.vendor_payments
@@ -581,406 +1613,316 @@ def create_vendor_ledger_pdf(vendor_type=None, vendor_name=None):
         filtered_data = st.session_state.vendor_ledger
         title_text = "HMD Solutions - COMPLETE VENDOR LEDGER REPORT"
         filtered_payments = st.session_state.vendor_payments
-
-    # Title Section
-    title = Paragraph(title_text, title_style)
-    elements.append(title)
-
-    # Company Info
-    company_info = Paragraph(
-        f"<b>Company:</b> HMD Solutions | <b>Report Date:</b> {datetime.now().strftime('%Y-%m-%d %H:%M')}",
-        styles['Normal']
+    return {'title': title_text, 'transactions': filtered_data, 'payments': filtered_payments}
+
+def vendor_ledger_report(vendor_type=None, vendor_name=None):
+    """Describe the vendor ledger report as (name, params, inputs, template, theme) for the report cache and queue"""
+    inputs = vendor_ledger_report_inputs(vendor_type, vendor_name)
+    return (
+        'vendor_ledger',
+        {'vendor_type': vendor_type, 'vendor_name': vendor_name},
+        inputs,
+        lambda: vendor_ledger_template(inputs, vendor_name),
+        REPORT_THEME
     )
-    elements.append(company_info)
-    elements.append(Spacer(1, 15))
+
+def vendor_ledger_template(inputs, vendor_name=None):
+    """Professional vendor ledger report with detailed transaction history and summary"""
+    filtered_data = inputs['transactions']
+    filtered_payments = inputs['payments']
+    # Dated by its latest entry rather than the clock, since the report cache serves it until the entries change
+    entry_dates = [str(entry['date']) for entry in filtered_data + filtered_payments if entry.get('date')]
+    as_of = max(entry_dates) if entry_dates else "No entries"
+    blocks = [
+        Text(inputs['title'], 'title'),
+        Text(f"<b>Company:</b> HMD Solutions | <b>Ledger as of:</b> {as_of}"),
+        Spacer(15)
+    ]
 
     # Vendor Transactions Section
     if filtered_data:
-        elements.append(Paragraph("<b>VENDOR TRANSACTIONS</b>", styles['Heading2']))
-
-        # Prepare data for table
-        data = [['Date', 'Vendor', 'Type', 'Item', 'Qty', 'Rate', 'Amount']]
-
-        for vendor in filtered_data:
-            data.append([
-                vendor['date'],
-                vendor['vendor_name'][:15],
-                vendor['vendor_type'].title(),
-                vendor['item_name'][:20],
-                f"{vendor['quantity']:.2f}",
-                f"Rs. {vendor['rate']:.2f}",
-                f"Rs. {vendor['total_amount']:.2f}"
-            ])
-
-        # Create table
-        table = Table(data, repeatRows=1)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1E90FF')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        elements.append(table)
-
-        # Add transaction totals
-        elements.append(Spacer(1, 10))
         total_purchases = sum(vendor['total_amount'] for vendor in filtered_data)
-        total_text = Paragraph(f"<b>Total Purchases: Rs. {total_purchases:,.2f}</b>", styles['Normal'])
-        elements.append(total_text)
+        blocks += [
+            Text("<b>VENDOR TRANSACTIONS</b>", 'heading'),
+            DataTable(
+                [('Date', None), ('Vendor', None), ('Type', None), ('Item', None), ('Qty', None), ('Rate', None),
+                 ('Amount', None)],
+                (([vendor['date'], vendor['vendor_name'][:15], vendor['vendor_type'].title(),
+                   vendor['item_name'][:20], f"{vendor['quantity']:.2f}", f"Rs. {vendor['rate']:.2f}",
+                   f"Rs. {vendor['total_amount']:.2f}"], None)
+                 for vendor in filtered_data),
+                'primary'
+            ),
+            Spacer(10),
+            Text(f"<b>Total Purchases: Rs. {total_purchases:,.2f}</b>")
+        ]
 
     # Payment History Section
     if filtered_payments:
-        elements.append(Spacer(1, 15))
-        elements.append(Paragraph("<b>PAYMENT HISTORY</b>", styles['Heading2']))
-
-        payment_data = [['Date', 'Vendor', 'Method', 'Amount', 'Notes']]
-
-        for payment in filtered_payments:
-            payment_data.append([
-                payment['date'],
-                payment['vendor_name'][:15],
-                payment['method'],
-                f"Rs. {payment['amount']:.2f}",
-                payment['notes'][:25] if payment['notes'] else ""
-            ])
-
-        # Create payment table
-        payment_table = Table(payment_data, repeatRows=1)
-        payment_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0047AB')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#ecf0f1')),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        elements.append(payment_table)
-
-        # Add payment totals
-        elements.append(Spacer(1, 10))
         total_payments = sum(payment['amount'] for payment in filtered_payments)
-        payment_text = Paragraph(f"<b>Total Payments: Rs. {total_payments:,.2f}</b>", styles['Normal'])
-        elements.append(payment_text)
+        blocks += [
+            Spacer(15),
+            Text("<b>PAYMENT HISTORY</b>", 'heading'),
+            DataTable(
+                [('Date', None), ('Vendor', None), ('Method', None), ('Amount', None), ('Notes', None)],
+                (([payment['date'], payment['vendor_name'][:15], payment['method'], f"Rs. {payment['amount']:.2f}",
+                   payment['notes'][:25] if payment['notes'] else ""], None)
+                 for payment in filtered_payments),
+                'secondary'
+            ),
+            Spacer(10),
+            Text(f"<b>Total Payments: Rs. {total_payments:,.2f}</b>")
+        ]
 
     # Summary Section
-    elements.append(Spacer(1, 15))
-    elements.append(Paragraph("<b>FINANCIAL SUMMARY</b>", styles['Heading2']))
-
+    total_debit = sum(v['total_amount'] for v in filtered_data)
+    total_credit = sum(p['amount'] for p in filtered_payments)
+    balance = total_debit - total_credit
     if vendor_name:
-        # For specific vendor
-        total_debit = sum(v['total_amount'] for v in filtered_data)
-        total_credit = sum(p['amount'] for p in filtered_payments)
-        balance = total_debit - total_credit
-
         summary_data = [
             ["Total Debit (Purchases)", f"Rs. {total_debit:,.2f}"],
             ["Total Credit (Payments)", f"Rs. {total_credit:,.2f}"],
             ["Outstanding Balance", f"Rs. {balance:,.2f}"]
         ]
     else:
-        # For all vendors
-        total_debit = sum(v['total_amount'] for v in filtered_data)
-        total_credit = sum(p['amount'] for p in filtered_payments)
-        balance = total_debit - total_credit
-
         summary_data = [
             ["Total Debit (All Purchases)", f"Rs. {total_debit:,.2f}"],
             ["Total Credit (All Payments)", f"Rs. {total_credit:,.2f}"],
             ["Net Outstanding Balance", f"Rs. {balance:,.2f}"]
         ]
-
-    summary_table = Table(summary_data, colWidths=[200, 100])
-    summary_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1E90FF')),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('FONTSIZE', (0, 0), (-1, -1), 10),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#bdc3c7')),
-        ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-    ]))
-    elements.append(summary_table)
-
-    # Add signature section
-    elements.append(Spacer(1, 25))
-
-    # Signature with smaller image and text above
-    try:
-        if os.path.exists("Asim Siganture.jpg"):
-            signature_img = Image("Asim Siganture.jpg", width=120, height=40)  # Smaller signature
-            elements.append(signature_img)
-    except:
-        pass
-
-    signature_text = Paragraph("Accountant Signature<br/><b>HMD Solutions</b>",
-                               ParagraphStyle(
-                                   'SignatureStyle',
-                                   parent=styles['Normal'],
-                                   fontSize=10,
-                                   spaceBefore=5,
-                                   alignment=1
-                               ))
-    elements.append(signature_text)
-
-    doc.build(elements, onFirstPage=add_watermark, onLaterPages=add_watermark)
-    buffer.seek(0)
-    return buffer
-
-@st.cache_data(ttl=300)
-def create_stock_pdf():
-    """Create PDF for chemical stock with professional watermark and signature"""
-    buffer = BytesIO()
-
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=40, bottomMargin=40)
-    elements = []
-
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=20,
-        textColor=colors.HexColor('#1E90FF'),
-        alignment=1
-    )
-
-    # Title Section
-    title = Paragraph("HMD Solutions - CHEMICAL STOCK REPORT", title_style)
-    elements.append(title)
-    elements.append(Spacer(1, 15))
-
-    # Add chemical stock data
-    if st.session_state.chemicals:
-        data = [['ID', 'Chemical Name', 'Stock (KG)', 'Rate', 'Status']]
-
-        for chem in st.session_state.chemicals:
-            status = "Adequate"
-            if chem['stock'] < st.session_state.settings['low_stock_threshold']:
-                status = "Low Stock"
-            if chem['stock'] <= 0:
-                status = "Out of Stock"
-
-            data.append([
-                str(chem['id']),
-                chem['name'][:20],
-                f"{chem['stock']:.2f}",
-                f"Rs. {chem['rate']:.2f}",
-                status
-            ])
-
-        # Create table
-        table = Table(data, repeatRows=1)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1E90FF')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 9),
-            ('BOTTOMPADDING', (0, 0), (-1, 0), 8),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
-            ('FONTNAME', (0, 1), (-1, -1), 'Helvetica'),
-            ('FONTSIZE', (0, 1), (-1, -1), 8),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        elements.append(table)
-
-        # Add summary
-        total_chemicals = len(st.session_state.chemicals)
-        low_stock = len([c for c in st.session_state.chemicals if
-                         0 < c['stock'] < st.session_state.settings['low_stock_threshold']])
-        out_of_stock = len([c for c in st.session_state.chemicals if c['stock'] <= 0])
-
-        elements.append(Spacer(1, 15))
-        summary_data = [
-            ["Total Chemicals", str(total_chemicals)],
-            ["Low Stock Items", str(low_stock)],
-            ["Out of Stock", str(out_of_stock)]
+    blocks += [
+        Spacer(15),
+        Text("<b>FINANCIAL SUMMARY</b>", 'heading'),
+        summary_table(summary_data, (200, 100), 'summary')
+    ]
+    return Report(blocks + signature_blocks(), watermark=True)
+
+def stock_report():
+    """Describe the chemical stock report as (name, params, inputs, template, theme) for the report cache and queue"""
+    inputs = {
+        'chemicals': st.session_state.chemicals,
+        'low_stock_threshold': st.session_state.settings['low_stock_threshold']
+    }
+    return 'stock', {}, inputs, lambda: stock_template(inputs), REPORT_THEME
+
+def stock_template(inputs):
+    """Chemical stock report with watermark and signature"""
+    chemicals = inputs['chemicals']
+    low_stock_threshold = inputs['low_stock_threshold']
+    blocks = [
+        Text("HMD Solutions - CHEMICAL STOCK REPORT", 'title'),
+        Spacer(15)
+    ]
+
+    if chemicals:
+        def stock_rows():
+            for chem in chemicals:
+                status = "Adequate"
+                if chem['stock'] < low_stock_threshold:
+                    status = "Low Stock"
+                if chem['stock'] <= 0:
+                    status = "Out of Stock"
+                yield [str(chem['id']), chem['name'][:20], f"{chem['stock']:.2f}", f"Rs. {chem['rate']:.2f}",
+                       status], None
+
+        low_stock = len([c for c in chemicals if 0 < c['stock'] < low_stock_threshold])
+        out_of_stock = len([c for c in chemicals if c['stock'] <= 0])
+        blocks += [
+            DataTable([('ID', None), ('Chemical Name', None), ('Stock (KG)', None), ('Rate', None), ('Status', None)],
+                      stock_rows(), 'primary'),
+            Spacer(15),
+            summary_table([
+                ["Total Chemicals", str(len(chemicals))],
+                ["Low Stock Items", str(low_stock)],
+                ["Out of Stock", str(out_of_stock)]
+            ], (150, 80), 'summary_secondary')
         ]
-
-        summary_table = Table(summary_data, colWidths=[150, 80])
-        summary_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0047AB')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, -1), 10),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#bdc3c7')),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        elements.append(summary_table)
-
     else:
-        no_data = Paragraph("No chemical data available", styles['Heading2'])
-        elements.append(no_data)
-
-    # Add signature section
-    elements.append(Spacer(1, 25))
+        blocks.append(Text("No chemical data available", 'heading'))
+
+    return Report(blocks + signature_blocks(), watermark=True)
+
+def production_details_report(product_name, production_data):
+    """Describe a product's production details report as (name, params, inputs, template, theme) for the report queue"""
+    # The date is an input, so a cached report never shows an earlier day
+    inputs = {'production': production_data, 'date': datetime.now().strftime('%Y-%m-%d')}
+    return (
+        'production_details',
+        {'product': product_name},
+        inputs,
+        lambda: production_details_template(product_name, production_data, inputs['date']),
+        REPORT_THEME
+    )
 
-    # Signature with smaller image and text above
-    try:
-        if os.path.exists("Asim Siganture.jpg"):
-            signature_img = Image("Asim Siganture.jpg", width=120, height=40)
-            elements.append(signature_img)
-    except:
-        pass
-
-    signature_text = Paragraph("Accountant Signature<br/><b>HMD Solutions</b>",
-                               ParagraphStyle(
-                                   'SignatureStyle',
-                                   parent=styles['Normal'],
-                                   fontSize=10,
-                                   spaceBefore=5,
-                                   alignment=1
-                               ))
-    elements.append(signature_text)
-
-    doc.build(elements, onFirstPage=add_watermark, onLaterPages=add_watermark)
-    buffer.seek(0)
-    return buffer
+def production_details_template(product_name, production_data, report_date):
+    """Production details report: chemical requirements and cost breakdown"""
+    blocks = [
+        Text(f"HMD Solutions - {product_name} PRODUCTION DETAILS", 'title'),
+        Text(f"<b>Product Name:</b> {product_name}"),
+        Text(f"<b>Report Date:</b> {report_date}"),
+        Spacer(15)
+    ]
 
-# PDF creation functions for production details
-def create_production_details_pdf(product_name, production_data):
-    """Create PDF for product production details"""
-    buffer = BytesIO()
-    
-    doc = SimpleDocTemplate(buffer, pagesize=A4, topMargin=40, bottomMargin=40)
-    elements = []
-    
-    styles = getSampleStyleSheet()
-    title_style = ParagraphStyle(
-        'CustomTitle',
-        parent=styles['Heading1'],
-        fontSize=16,
-        spaceAfter=20,
-        textColor=colors.HexColor('#1E90FF'),
-        alignment=1
-    )
-    
-    # Title Section
-    title = Paragraph(f"HMD Solutions - {product_name} PRODUCTION DETAILS", title_style)
-    elements.append(title)
-    
-    # Product Information
-    elements.append(Paragraph(f"<b>Product Name:</b> {product_name}", styles['Normal']))
-    elements.append(Paragraph(f"<b>Report Date:</b> {datetime.now().strftime('%Y-%m-%d %H:%M')}", styles['Normal']))
-    elements.append(Spacer(1, 15))
-    
-    # Production Details Table
     if production_data:
-        data = [['Chemical Name', 'Amount Required (KG)', 'Stock Available (KG)', 'Status']]
-        
-        for item in production_data.get('chemical_requirements', []):
-            status = "✅ Adequate" if item.get('stock_adequate', False) else "⚠️ Low Stock"
-            data.append([
-                item['chemical_name'],
-                f"{item['amount_required_kg']:.3f}",
-                f"{item['stock_available']:.3f}",
-                status
-            ])
-        
-        table = Table(data, repeatRows=1)
-        table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#1E90FF')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-            ('FONTSIZE', (0, 0), (-1, 0), 10),
-            ('BACKGROUND', (0, 1), (-1, -1), colors.HexColor('#f8f9fa')),
-            ('GRID', (0, 0), (-1, -1), 0.5, colors.grey),
-        ]))
-        elements.append(table)
-    
-    # Cost Breakdown
+        blocks.append(DataTable(
+            [('Chemical Name', None), ('Amount Required (KG)', None), ('Stock Available (KG)', None), ('Status', None)],
+            (([item['chemical_name'], f"{item['amount_required_kg']:.3f}", f"{item['stock_available']:.3f}",
+               "✅ Adequate" if item.get('stock_adequate', False) else "⚠️ Low Stock"], None)
+             for item in production_data.get('chemical_requirements', [])),
+            'production'
+        ))
+
     if production_data.get('cost_breakdown'):
-        elements.append(Spacer(1, 15))
-        elements.append(Paragraph("<b>COST BREAKDOWN</b>", styles['Heading2']))
-        
-        cost_data = [['Cost Item', 'Amount']]
-        for cost_item, amount in production_data['cost_breakdown'].items():
-            cost_data.append([cost_item, amount])
-        
-        cost_table = Table(cost_data, colWidths=[300, 100])
-        cost_table.setStyle(TableStyle([
-            ('BACKGROUND', (0, 0), (-1, 0), colors.HexColor('#0047AB')),
-            ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-            ('ALIGN', (0, 0), (-1, -1), 'LEFT'),
-            ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ]))
-        elements.append(cost_table)
-    
-    doc.build(elements)
-    buffer.seek(0)
-    return buffer
+        blocks += [
+            Spacer(15),
+            Text("<b>COST BREAKDOWN</b>", 'heading'),
+            DataTable([('Cost Item', 300), ('Amount', 100)],
+                      (([cost_item, amount], None) for cost_item, amount in production_data['cost_breakdown'].items()),
+                      'costs')
+        ]
+
+    return Report(blocks)
 
 # CSV Export/Import Functions
-def export_to_csv():
-    """Export all data to separate CSV files in a zip"""
-    buffer = BytesIO()
-    with zipfile.ZipFile(buffer, 'w') as zip_file:
-        # Chemicals CSV
-        if st.session_state.chemicals:
-            chem_df = pd.DataFrame(st.session_state.chemicals)
-            chem_csv = chem_df.to_csv(index=False)
-            zip_file.writestr('chemicals.csv', chem_csv)
+EXPORT_SPOOL_SIZE = 8 * 1024 * 1024  # Bytes an export ZIP keeps in memory before spilling to disk
+
+def export_columns(records):
+    """Return every field used by a list of records, in first-seen order"""
+    columns = {}
+    for record in records:
+        columns.update(dict.fromkeys(record))
+    return list(columns)
+
+def export_tables(data):
+    """Yield (file name, header, row iterator) for each non-empty collection of a data set"""
+    for name, filename in (('chemicals', 'chemicals.csv'), ('vendor_ledger', 'vendor_ledger.csv'),
+                           ('vendor_payments', 'vendor_payments.csv'), ('production_history', 'production_history.csv')):
+        records = data[name]
+        if records:
+            columns = export_columns(records)
+            yield filename, columns, ([record.get(column) for column in columns] for record in records)
+
+    if data['packaging_materials']:
+        yield 'packaging.csv', ['Type', 'Name', 'Stock', 'Rate'], (
+            [p_type, material['name'], material['stock'], material['rate']]
+            for p_type, material in data['packaging_materials'].items()
+        )
 
-        # Packaging materials CSV
-        if st.session_state.packaging_materials:
-            pack_data = []
-            for p_type, material in st.session_state.packaging_materials.items():
-                pack_data.append({
-                    'Type': p_type,
-                    'Name': material['name'],
-                    'Stock': material['stock'],
-                    'Rate': material['rate']
-                })
-            pack_df = pd.DataFrame(pack_data)
-            pack_csv = pack_df.to_csv(index=False)
-            zip_file.writestr('packaging.csv', pack_csv)
+    if data['product_details']:
+        yield 'product_details.csv', ['Product Name', 'Description', 'Web Link', 'Category'], (
+            [product_name, details.get('description', ''), details.get('web_link', ''), details.get('category', '')]
+            for product_name, details in data['product_details'].items()
+        )
 
-        # Vendor ledger CSV
-        if st.session_state.vendor_ledger:
-            vendor_df = pd.DataFrame(st.session_state.vendor_ledger)
-            vendor_csv = vendor_df.to_csv(index=False)
-            zip_file.writestr('vendor_ledger.csv', vendor_csv)
+def export_to_csv(data=None):
+    """Export all data to separate CSV files in a compressed zip
 
-        # Vendor payments CSV
-        if st.session_state.vendor_payments:
-            payments_df = pd.DataFrame(st.session_state.vendor_payments)
-            payments_csv = payments_df.to_csv(index=False)
-            zip_file.writestr('vendor_payments.csv', payments_csv)
+    Rows are written one at a time straight into the archive, which lives in a
+    spooled temporary file, so memory use stays flat as the data grows.
+    Returns the file positioned at the start.
+    """
+    data = data or current_data()
+    spool = tempfile.SpooledTemporaryFile(max_size=EXPORT_SPOOL_SIZE)
+    with zipfile.ZipFile(spool, 'w', compression=zipfile.ZIP_DEFLATED) as zip_file:
+        for filename, columns, rows in export_tables(data):
+            with zip_file.open(filename, 'w', force_zip64=True) as member:
+                with TextIOWrapper(member, encoding='utf-8', newline='') as f:
+                    writer = csv.writer(f, lineterminator='\n')
+                    writer.writerow(columns)
+                    writer.writerows(rows)
+    spool.seek(0)
+    return spool
+
+class ExportJob:
+    """Build a CSV export on a background thread so the page stays responsive"""
+
+    def __init__(self, data):
+        # Copy the records, not just the collections, while no session is editing them:
+        # records are edited in place, so a shallow copy would still change midway
+        with editing_data():
+            snapshot = {
+                name: ([dict(record) for record in value] if isinstance(value, list)
+                       else {key: dict(record) if isinstance(record, dict) else record
+                             for key, record in value.items()})
+                for name, value in data.items()
+            }
+        self.started = datetime.now()
+        self.file = None
+        self.data = None
+        self.error = None
+        self.thread = threading.Thread(target=self._run, args=(snapshot,), name='csv-export', daemon=True)
+        self.thread.start()
+
+    def _run(self, data):
+        try:
+            self.file = export_to_csv(data)
+        except Exception as e:
+            self.error = str(e)
+
+    @property
+    def done(self):
+        return not self.thread.is_alive()
+
+    def read(self):
+        """Return the finished archive's bytes, read from the spool once and kept for later reruns"""
+        if self.data is None:
+            with self.file:
+                self.file.seek(0)
+                self.data = self.file.read()
+        return self.data
+
+# Typed Parquet layouts for the vendor collections (pyarrow type names)
+PARQUET_COLUMNS = {
+    'vendor_ledger': {'id': 'int64', 'date': 'date32', 'vendor_name': 'string', 'vendor_type': 'string',
+                      'item_name': 'string', 'quantity': 'float64', 'rate': 'float64', 'total_amount': 'float64',
+                      'notes': 'string'},
+    'vendor_payments': {'id': 'int64', 'date': 'date32', 'vendor_name': 'string', 'amount': 'float64',
+                        'method': 'string', 'notes': 'string'}
+}
+PARQUET_ROW_GROUP_SIZE = 10000  # Rows per row group; date-sorted groups let readers skip by date
+
+def export_parquet(collection, records):
+    """Write vendor records to Parquet sorted by date, with typed dates and amounts; return the file's bytes"""
+    schema = pa.schema([(column, getattr(pa, type_name)()) for column, type_name in PARQUET_COLUMNS[collection].items()])
+    records = sorted(records, key=lambda record: str(record.get('date') or ''))
+    sink = BytesIO()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        for start in range(0, len(records), PARQUET_ROW_GROUP_SIZE):
+            batch = records[start:start + PARQUET_ROW_GROUP_SIZE]
+            arrays = []
+            for field in schema:
+                values = [record.get(field.name) for record in batch]
+                if field.type == pa.date32():
+                    # Malformed dates become nulls rather than failing the export
+                    values = pc.strptime(pa.array(values, pa.string()), format='%Y-%m-%d', unit='s', error_is_null=True)
+                    arrays.append(values.cast(pa.date32()))
+                else:
+                    arrays.append(pa.array(values, field.type, from_pandas=True))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    return sink.getvalue()
 
-        # Production history CSV
-        if st.session_state.production_history:
-            production_df = pd.DataFrame(st.session_state.production_history)
-            production_csv = production_df.to_csv(index=False)
-            zip_file.writestr('production_history.csv', production_csv)
-
-        # Product details CSV
-        if st.session_state.product_details:
-            product_data = []
-            for product_name, details in st.session_state.product_details.items():
-                product_data.append({
-                    'Product Name': product_name,
-                    'Description': details.get('description', ''),
-                    'Web Link': details.get('web_link', ''),
-                    'Category': details.get('category', '')
-                })
-            product_df = pd.DataFrame(product_data)
-            product_csv = product_df.to_csv(index=False)
-            zip_file.writestr('product_details.csv', product_csv)
+def merge_parquet(source, collection, start_date=None, end_date=None, dry_run=False):
+    """Merge a vendor Parquet file into the store, optionally only rows in a date range
 
-    buffer.seek(0)
-    return buffer
+    The date range is pushed down to the reader, which skips row groups whose
+    date statistics fall outside it. Returns a merge report like merge_csv_zip().
+    """
+    filters = []
+    if start_date:
+        filters.append(('date', '>=', start_date))
+    if end_date:
+        filters.append(('date', '<=', end_date))
+    table = pq.read_table(source, filters=filters or None)
+    with editing_data():
+        merger = ImportMerger(collection, dry_run)
+        for batch in table.to_batches(max_chunksize=CSV_IMPORT_CHUNK_SIZE):
+            for record in batch.to_pylist():
+                record = {field: value.isoformat() if hasattr(value, 'isoformat') else value
+                          for field, value in record.items() if value is not None}
+                merger.merge(None, record)
+            if not dry_run:
+                save_data()
+        return {collection: {**merger.counts, 'preview': merger.preview}}
 
 def create_sample_csv():
     """Create sample CSV files for import template"""
@@ -1036,60 +1978,314 @@ def create_sample_csv():
     buffer.seek(0)
     return buffer
 
-def import_from_csv(uploaded_zip):
-    """Import data from CSV zip file"""
-    try:
-        with zipfile.ZipFile(uploaded_zip) as z:
-            imported_data = {}
-
-            # Read each CSV file if it exists
-            if 'chemicals.csv' in z.namelist():
-                with z.open('chemicals.csv') as f:
-                    chem_df = pd.read_csv(f)
-                    imported_data['chemicals'] = chem_df.to_dict('records')
-
-            if 'packaging.csv' in z.namelist():
-                with z.open('packaging.csv') as f:
-                    pack_df = pd.read_csv(f)
-                    packaging_materials = {}
-                    for _, row in pack_df.iterrows():
-                        packaging_materials[row['Type']] = {
-                            'name': row['Name'],
-                            'stock': row['Stock'],
-                            'rate': row['Rate']
-                        }
-                    imported_data['packaging_materials'] = packaging_materials
-
-            if 'vendor_ledger.csv' in z.namelist():
-                with z.open('vendor_ledger.csv') as f:
-                    vendor_df = pd.read_csv(f)
-                    imported_data['vendor_ledger'] = vendor_df.to_dict('records')
-
-            if 'vendor_payments.csv' in z.namelist():
-                with z.open('vendor_payments.csv') as f:
-                    payments_df = pd.read_csv(f)
-                    imported_data['vendor_payments'] = payments_df.to_dict('records')
-
-            if 'production_history.csv' in z.namelist():
-                with z.open('production_history.csv') as f:
-                    production_df = pd.read_csv(f)
-                    imported_data['production_history'] = production_df.to_dict('records')
-
-            if 'product_details.csv' in z.namelist():
-                with z.open('product_details.csv') as f:
-                    product_df = pd.read_csv(f)
-                    product_details = {}
-                    for _, row in product_df.iterrows():
-                        product_details[row['Product Name']] = {
-                            'description': row['Description'],
-                            'web_link': row['Web Link'],
-                            'category': row['Category']
-                        }
-                    imported_data['product_details'] = product_details
+# CSV members of an import ZIP: target collection and the columns each file
+# must have, with their types. Other columns are carried over as-is.
+CSV_IMPORT_FILES = {
+    'chemicals.csv': ('chemicals', {'id': 'int', 'name': 'str', 'stock': 'float', 'rate': 'float'}),
+    'packaging.csv': ('packaging_materials', {'Type': 'str', 'Name': 'str', 'Stock': 'float', 'Rate': 'float'}),
+    'vendor_ledger.csv': ('vendor_ledger', {'id': 'int', 'date': 'str', 'vendor_name': 'str', 'vendor_type': 'str',
+                                            'item_name': 'str', 'quantity': 'float', 'rate': 'float',
+                                            'total_amount': 'float'}),
+    'vendor_payments.csv': ('vendor_payments', {'id': 'int', 'date': 'str', 'vendor_name': 'str', 'amount': 'float'}),
+    'production_history.csv': ('production_history', {}),
+    'product_details.csv': ('product_details', {'Product Name': 'str', 'Description': 'str', 'Web Link': 'str',
+                                                'Category': 'str'})
+}
+CSV_IMPORT_CHUNK_SIZE = 2000  # Rows parsed per step
+
+def read_csv_chunks(z, member):
+    """Yield a ZIP member's rows as DataFrame chunks without reading the whole file"""
+    with z.open(member) as f:
+        for chunk in pd.read_csv(f, chunksize=CSV_IMPORT_CHUNK_SIZE):
+            yield chunk
+
+def coerce_csv_chunk(member, chunk):
+    """Convert a chunk's typed columns in place, raising ValueError on the first bad value"""
+    for column, kind in CSV_IMPORT_FILES[member][1].items():
+        if kind == 'str':
+            continue
+        values = pd.to_numeric(chunk[column], errors='coerce')
+        bad = values.isna() & chunk[column].notna()
+        if kind == 'int':
+            bad |= values.notna() & (values % 1 != 0)
+        if bad.any():
+            row = chunk.index[bad][0] + 2  # Header is line 1
+            raise ValueError(f"{member} line {row}: {column} must be a {'whole number' if kind == 'int' else 'number'}")
+        chunk[column] = values.astype('Int64') if kind == 'int' else values.astype(float)
+
+def validate_csv_zip(z):
+    """Check every known member's columns and types before anything is written; return the members to import"""
+    members = [member for member in CSV_IMPORT_FILES if member in z.namelist()]
+    for member in members:
+        with z.open(member) as f:
+            header = pd.read_csv(f, nrows=0).columns
+        missing = [column for column in CSV_IMPORT_FILES[member][1] if column not in header]
+        if missing:
+            raise ValueError(f"{member} is missing column(s): {', '.join(missing)}")
+    for member in members:
+        for chunk in read_csv_chunks(z, member):
+            coerce_csv_chunk(member, chunk)
+    return members
+
+def csv_chunk_records(member, chunk):
+    """Turn a coerced chunk into (key, record) pairs for its collection; blank cells are left out"""
+    rows = [
+        {column: (value.item() if hasattr(value, 'item') else value)
+         for column, value in row.items() if not pd.isna(value)}
+        for row in chunk.to_dict('records')
+    ]
+    if member == 'packaging.csv':
+        return [(row['Type'], {'name': row['Name'], 'stock': row['Stock'], 'rate': row['Rate']}) for row in rows]
+    if member == 'product_details.csv':
+        return [(row['Product Name'], {'description': row.get('Description', ''), 'web_link': row.get('Web Link', ''),
+                                       'category': row.get('Category', '')}) for row in rows]
+    if member == 'production_history.csv':
+        return [(None, row) for row in rows]
+    return [(row['id'], row) for row in rows]
+
+# Fields that identify the same record across imports. Dict collections are
+# matched on their own keys; production history only skips exact repeats.
+IMPORT_NATURAL_KEYS = {
+    'chemicals': ('name',),
+    'vendor_ledger': ('vendor_name', 'date', 'item_name'),
+    'vendor_payments': ('vendor_name', 'date', 'amount'),
+    'production_history': ('date', 'product', 'batch_size', 'status', 'type')
+}
+IMPORT_PREVIEW_ROWS = 50  # Changed rows listed per collection in a merge preview
+
+def fold_key_value(value):
+    """Normalise a natural key value so case and surrounding spaces do not matter"""
+    return value.strip().casefold() if isinstance(value, str) else value
+
+class ImportMerger:
+    """Upsert incoming records into one collection by natural key
+
+    New records are added with fresh ids and matched records only get the
+    fields that differ, so re-importing unchanged data writes nothing. With
+    dry_run set nothing is touched and only the counts and preview are built.
+    """
 
-            return imported_data
-    except Exception as e:
-        raise Exception(f"Error importing CSV files: {str(e)}")
+    def __init__(self, collection, dry_run=False):
+        self.collection = collection
+        self.dry_run = dry_run
+        self.counts = {'added': 0, 'updated': 0, 'unchanged': 0}
+        self.preview = []
+        current = st.session_state[collection]
+        items = current.items() if collection in KEYED_COLLECTIONS else ((None, record) for record in current)
+        self.index = {}
+        for key, record in items:
+            self.index.setdefault(self.natural_key(key, record), (key, record))
+
+    def natural_key(self, key, record):
+        if self.collection in KEYED_COLLECTIONS:
+            return fold_key_value(key)
+        return tuple(fold_key_value(record.get(field)) for field in IMPORT_NATURAL_KEYS[self.collection])
+
+    def merge(self, key, record):
+        """Add or update one incoming record and return 'added', 'updated' or 'unchanged'"""
+        natural_key = self.natural_key(key, record)
+        match = self.index.get(natural_key)
+        if match is None:
+            action = 'added'
+            if not self.dry_run:
+                key = self._add(key, record)
+            self.index[natural_key] = (key, record)
+            self._note(action, {field: value for field, value in record.items() if field != 'id'})
+        else:
+            key, current = match
+            fixed = set(IMPORT_NATURAL_KEYS.get(self.collection, ())) | {'id'}
+            changes = {field: value for field, value in record.items()
+                       if field not in fixed and current.get(field) != value}
+            if not changes:
+                action = 'unchanged'
+            else:
+                action = 'updated'
+                if self.dry_run:
+                    # Later rows with the same key compare against the planned result
+                    self.index[natural_key] = (key, {**current, **changes})
+                else:
+                    self._update(key, current, changes)
+                if self.collection in KEYED_COLLECTIONS:
+                    identity = {'key': key}
+                else:
+                    identity = {field: current.get(field) for field in IMPORT_NATURAL_KEYS[self.collection]}
+                self._note(action, identity, {field: f"{current.get(field)} → {value}" for field, value in changes.items()})
+        self.counts[action] += 1
+        return action
+
+    def _note(self, action, record, changes=None):
+        if len(self.preview) < IMPORT_PREVIEW_ROWS:
+            self.preview.append({'action': action, **record, **(changes or {})})
+
+    def _add(self, key, record):
+        collection = self.collection
+        if collection in KEYED_COLLECTIONS:
+            st.session_state[collection][key] = record
+            record_change('upsert', collection, key, record)
+            return key
+        if collection == 'production_history':
+            st.session_state.production_history.append(record)
+            record_change('append', collection, value=record)
+            return None
+
+        record['id'] = reserve_ids(collection)
+        if collection == 'chemicals':
+            add_chemical(record)
+        elif collection == 'vendor_ledger':
+            add_vendor_transaction(record)
+        else:
+            add_vendor_payment(record)
+        record_change('upsert', collection, record['id'], record)
+        return record['id']
+
+    def _update(self, key, current, changes):
+        if self.collection == 'vendor_ledger':
+            update_vendor_transaction(current, changes)
+        elif self.collection == 'vendor_payments':
+            update_vendor_payment(current, changes)
+        else:
+            current.update(changes)
+        record_change('upsert', self.collection, key if self.collection in KEYED_COLLECTIONS else current['id'], current)
+
+def merge_import_data(data, dry_run=False):
+    """Upsert a full data set (as exported to JSON) into the store; return counts and previews per collection"""
+    with editing_data():
+        report = {}
+        for collection in ID_COLLECTIONS + ('packaging_materials', 'product_details', 'production_history'):
+            incoming = data.get(collection)
+            if not incoming:
+                continue
+            merger = ImportMerger(collection, dry_run)
+            items = incoming.items() if collection in KEYED_COLLECTIONS else ((None, record) for record in incoming)
+            for key, record in items:
+                merger.merge(key, dict(record))
+            report[collection] = {**merger.counts, 'preview': merger.preview}
+
+        settings = {**st.session_state.settings, **data.get('settings', {})}
+        if settings != st.session_state.settings:
+            report['settings'] = {'added': 0, 'updated': 1, 'unchanged': 0, 'preview': []}
+            if not dry_run:
+                st.session_state.settings = settings
+                record_change('replace', 'settings', value=settings)
+        if not dry_run:
+            save_data()
+        return report
+
+def merge_csv_zip(uploaded_zip, dry_run=False, progress=None):
+    """Upsert the CSV files of a ZIP into the store chunk by chunk; return counts and previews per collection
+
+    Nothing is saved until every file has merged, then all of it is saved at
+    once. If any row fails, the edits made so far are dropped and the data is
+    reloaded as last saved.
+    """
+    with editing_data():
+        try:
+            with zipfile.ZipFile(uploaded_zip) as z:
+                report = {}
+                for member in validate_csv_zip(z):
+                    collection = CSV_IMPORT_FILES[member][0]
+                    merger = ImportMerger(collection, dry_run)
+                    rows = 0
+                    for chunk in read_csv_chunks(z, member):
+                        coerce_csv_chunk(member, chunk)
+                        for key, record in csv_chunk_records(member, chunk):
+                            merger.merge(key, record)
+                        rows += len(chunk)
+                        if progress:
+                            progress(member, rows)
+                    report[collection] = {**merger.counts, 'preview': merger.preview}
+        except Exception as e:
+            if not dry_run:
+                discard_unsaved_changes()
+            raise Exception(f"Error importing CSV files: {str(e)}")
+
+        if not dry_run:
+            save_data(full_backup=True)
+        return report
+
+def render_merge_report(report):
+    """Show per-collection counts and the previewed changes of a merge import"""
+    if not report:
+        st.info("The file contains no records to import.")
+        return
+    st.dataframe(pd.DataFrame([
+        {'Collection': collection, 'Added': counts['added'], 'Updated': counts['updated'], 'Unchanged': counts['unchanged']}
+        for collection, counts in report.items()
+    ]), hide_index=True, use_container_width=True)
+    for collection, counts in report.items():
+        if counts['preview']:
+            with st.expander(f"{collection}: first {len(counts['preview'])} change(s)"):
+                st.dataframe(pd.DataFrame(counts['preview']).astype(str), hide_index=True, use_container_width=True)
+
+def import_from_csv(uploaded_zip, progress=None):
+    """Stream CSV files from a ZIP into the store, replacing each collection the ZIP contains
+
+    Columns and types are validated for every file first. Rows are then read
+    one chunk at a time, so pandas holds a single chunk rather than the whole
+    file, and each chunk goes straight into the collection and the pending
+    change set. progress(member, rows) is called after each chunk. Everything
+    is saved at once at the end, so a bad row leaves the store untouched.
+    Returns the number of rows imported per collection.
+    """
+    with editing_data():
+        try:
+            with zipfile.ZipFile(uploaded_zip) as z:
+                members = validate_csv_zip(z)
+                imported = {}
+
+                for member in members:
+                    collection = CSV_IMPORT_FILES[member][0]
+                    target = {} if collection in KEYED_COLLECTIONS else []
+                    st.session_state[collection] = target
+                    record_change('replace', collection, value=type(target)())
+
+                    imported[collection] = 0
+                    for chunk in read_csv_chunks(z, member):
+                        coerce_csv_chunk(member, chunk)
+                        for key, record in csv_chunk_records(member, chunk):
+                            if collection in KEYED_COLLECTIONS:
+                                target[key] = record
+                                record_change('upsert', collection, key, record)
+                            elif key is None:
+                                target.append(record)
+                                record_change('append', collection, value=record)
+                            else:
+                                target.append(record)
+                                record_change('upsert', collection, key, record)
+                        imported[collection] += len(chunk)
+                        if progress:
+                            progress(member, imported[collection])
+        except Exception as e:
+            discard_unsaved_changes()
+            raise Exception(f"Error importing CSV files: {str(e)}")
+
+        save_data(full_backup=True)
+        return imported
+
+def render_json_import(data, label, key):
+    """Import a JSON backup either by replacing every collection or by merging it into the current data"""
+    mode = st.radio("Import mode", ["Replace all data", "Merge (add new, update changed)"], key=f"{key}_mode")
+    if mode == "Replace all data":
+        if st.button(label, type="primary", use_container_width=True, key=key):
+            st.session_state.chemicals = data.get('chemicals', [])
+            st.session_state.packaging_materials = data.get('packaging_materials', {})
+            st.session_state.vendor_ledger = data.get('vendor_ledger', [])
+            st.session_state.vendor_payments = data.get('vendor_payments', [])
+            st.session_state.production_history = data.get('production_history', [])
+            st.session_state.product_details = data.get('product_details', {})
+            st.session_state.settings = data.get('settings', st.session_state.settings)
+            auto_save(compact=True)
+            show_alert("Data imported successfully!", "success")
+            st.rerun()
+        return
+
+    if st.button("🔍 Preview Changes", use_container_width=True, key=f"{key}_preview"):
+        render_merge_report(merge_import_data(data, dry_run=True))
+    if st.button(label, type="primary", use_container_width=True, key=key):
+        report = merge_import_data(data)
+        st.toast("💾 Data saved successfully!", icon="✅")
+        show_alert("Data merged successfully!", "success")
+        render_merge_report(report)
 
 # Product Details Management Functions
 def manage_product_details():
@@ -1147,8 +2343,10 @@ def manage_product_details():
                 'image_uploaded': product_image is not None
             }
             
-            st.session_state.product_details[product_name] = product_data
-            auto_save()
+            with editing_data():
+                st.session_state.product_details[product_name] = product_data
+                record_change('upsert', 'product_details', product_name, product_data)
+                auto_save()
             show_alert(f"Product details for '{product_name}' saved successfully!", "success")
     
     # Product List and Management
@@ -1174,25 +2372,28 @@ def manage_product_details():
                             st.write(f"  - {comp['name']}: {amount_display:.3f} {unit}")
                 
                 with col2:
-                    # Download PDF button
-                    production_data = {
-                        'chemical_requirements': [],
-                        'cost_breakdown': {}
-                    }
-                    pdf_buffer = create_production_details_pdf(product_name, production_data)
-                    
-                    st.download_button(
+                    # PDF rendered in the background, only for the product asked for
+                    job_name = f"product_{product_name}"
+                    if st.button("📄 Generate PDF", key=f"generate_{product_name}"):
+                        production_data = {
+                            'chemical_requirements': [],
+                            'cost_breakdown': {}
+                        }
+                        st.session_state.report_jobs[job_name] = get_report_queue().submit(
+                            *production_details_report(product_name, production_data))
+                    render_report_job(
+                        job_name,
                         label="📄 Download PDF",
-                        data=pdf_buffer,
                         file_name=f"HMD Solutions_{product_name}_Details_{datetime.now().strftime('%Y%m%d')}.pdf",
-                        mime="application/pdf",
                         key=f"download_{product_name}"
                     )
                     
                     # Delete button
                     if st.button("🗑️ Delete", key=f"delete_{product_name}"):
-                        del st.session_state.product_details[product_name]
-                        auto_save()
+                        with editing_data():
+                            del st.session_state.product_details[product_name]
+                            record_change('delete', 'product_details', product_name)
+                            auto_save()
                         show_alert(f"Product '{product_name}' deleted successfully!", "success")
                         st.rerun()
     else:
@@ -1232,7 +2433,7 @@ def enhanced_production_management():
             # Check for missing chemicals
             missing_chemicals = []
             for item in formula:
-                if not any(chem['name'] == item['chemical_name'] for chem in st.session_state.chemicals):
+                if not chemical_exists(item['chemical_name']):
                     missing_chemicals.append(item['chemical_name'])
 
             if missing_chemicals:
@@ -1246,8 +2447,7 @@ def enhanced_production_management():
                 chemical_requirements = []
 
                 for item in formula:
-                    chemical = next(
-                        chem for chem in st.session_state.chemicals if chem['name'] == item['chemical_name'])
+                    chemical = find_chemical(item['chemical_name'])
                     
                     # Handle both grams and kg - convert to kg for calculations
                     amount_in_formula = item[f'amount_per_{base_batch_size}']
@@ -1321,68 +2521,75 @@ def enhanced_production_management():
                     }
                 }
 
-                # Download PDF button
-                pdf_buffer = create_production_details_pdf(product_select, production_data)
-                st.download_button(
-                    label="📄 Download Production Report PDF",
-                    data=pdf_buffer,
-                    file_name=f"HMD Solutions_{product_select}_Production_{datetime.now().strftime('%Y%m%d')}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True,
-                    key="download_production_pdf"
-                )
+                # Production report PDF, rendered in the background and offered below
+                st.session_state.report_jobs['production'] = get_report_queue().submit(
+                    *production_details_report(product_select, production_data))
 
                 # Update stock after production
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.button("🔄 Update Stock After Production", type="primary", use_container_width=True,
                                  key="update_stock"):
-                        # Update chemical stock
-                        for item in formula:
-                            chemical = next(
-                                chem for chem in st.session_state.chemicals if chem['name'] == item['chemical_name'])
-                            amount_in_formula = item[f'amount_per_{base_batch_size}']
-                            if amount_in_formula < 1:  # Likely in grams
-                                required_kg = convert_grams_to_kg(amount_in_formula) * batch_size
+                        with editing_data():
+                            # Update chemical stock
+                            for item in formula:
+                                chemical = find_chemical(item['chemical_name'])
+                                amount_in_formula = item[f'amount_per_{base_batch_size}']
+                                if amount_in_formula < 1:  # Likely in grams
+                                    required_kg = convert_grams_to_kg(amount_in_formula) * batch_size
+                                else:
+                                    required_kg = (amount_in_formula / base_batch_size) * batch_size
+                                chemical['stock'] = max(0, chemical['stock'] - required_kg)
+                                record_change('upsert', 'chemicals', chemical['id'], chemical)
+
+                            # Update packaging stock
+                            packaging_type = PRODUCT_PACKAGING[product_select]['type']
+                            packaging_size = PRODUCT_PACKAGING[product_select]['size']
+
+                            if packaging_type == 'can':
+                                packaging_required = (batch_size + packaging_size - 1) // packaging_size
                             else:
-                                required_kg = (amount_in_formula / base_batch_size) * batch_size
-                            chemical['stock'] = max(0, chemical['stock'] - required_kg)
-
-                        # Update packaging stock
-                        packaging_type = PRODUCT_PACKAGING[product_select]['type']
-                        packaging_size = PRODUCT_PACKAGING[product_select]['size']
+                                packaging_required = batch_size / packaging_size
 
-                        if packaging_type == 'can':
-                            packaging_required = (batch_size + packaging_size - 1) // packaging_size
-                        else:
-                            packaging_required = batch_size / packaging_size
-
-                        if packaging_type in st.session_state.packaging_materials:
-                            st.session_state.packaging_materials[packaging_type]['stock'] = max(
-                                0, st.session_state.packaging_materials[packaging_type]['stock'] - packaging_required
-                            )
-
-                        # Update cartons if using bottles
-                        if packaging_type == 'bottle':
-                            cartons_required = (packaging_required + 11) // 12
-                            if 'carton' in st.session_state.packaging_materials:
-                                st.session_state.packaging_materials['carton']['stock'] = max(
-                                    0, st.session_state.packaging_materials['carton']['stock'] - cartons_required
+                            if packaging_type in st.session_state.packaging_materials:
+                                st.session_state.packaging_materials[packaging_type]['stock'] = max(
+                                    0, st.session_state.packaging_materials[packaging_type]['stock'] - packaging_required
                                 )
+                                record_change('upsert', 'packaging_materials', packaging_type,
+                                              st.session_state.packaging_materials[packaging_type])
+
+                            # Update cartons if using bottles
+                            if packaging_type == 'bottle':
+                                cartons_required = (packaging_required + 11) // 12
+                                if 'carton' in st.session_state.packaging_materials:
+                                    st.session_state.packaging_materials['carton']['stock'] = max(
+                                        0, st.session_state.packaging_materials['carton']['stock'] - cartons_required
+                                    )
+                                    record_change('upsert', 'packaging_materials', 'carton',
+                                                  st.session_state.packaging_materials['carton'])
+
+                            # Add to production history
+                            production_record = {
+                                'date': datetime.now().strftime("%Y-%m-%d"),
+                                'product': product_select,
+                                'batch_size': batch_size,
+                                'status': 'Completed',
+                                'type': 'Template'
+                            }
+                            st.session_state.production_history.append(production_record)
+                            record_change('append', 'production_history', value=production_record)
 
-                        # Add to production history
-                        production_record = {
-                            'date': datetime.now().strftime("%Y-%m-%d"),
-                            'product': product_select,
-                            'batch_size': batch_size,
-                            'status': 'Completed',
-                            'type': 'Template'
-                        }
-                        st.session_state.production_history.append(production_record)
-
-                        auto_save()
+                            auto_save()
                         show_alert("Stock updated after production successfully!", "success")
                         st.rerun()
+
+        # Outside the calculation, so checking on the report keeps it on screen
+        render_report_job(
+            'production',
+            label="📄 Download Production Report PDF",
+            file_name=f"HMD Solutions_{product_select}_Production_{datetime.now().strftime('%Y%m%d')}.pdf",
+            key="download_production_pdf"
+        )
     
     # Custom Production Template
     with st.expander("🎨 Custom Production Template", expanded=False):
@@ -1464,8 +2671,7 @@ def main():
             total_chems = len(st.session_state.chemicals)
             low_stock = len([c for c in st.session_state.chemicals if
                              0 < c['stock'] < st.session_state.settings['low_stock_threshold']])
-            total_vendors = len(set([v['vendor_name'] for v in
-                                     st.session_state.vendor_ledger])) if st.session_state.vendor_ledger else 0
+            total_vendors = len(get_vendor_names())
 
             st.metric("Chemicals", total_chems)
             st.metric("Low Stock", low_stock)
@@ -1474,7 +2680,7 @@ def main():
         # Auto-save button with GREEN theme
         st.markdown("---")
         if st.button("💾 Save Data", use_container_width=True, key="save_data_btn"):
-            auto_save()
+            auto_save(compact=True)
 
     # Dashboard
     if choice == "Dashboard":
@@ -1628,26 +2834,28 @@ def main():
 
             if st.button("Add Chemical", type="primary", key="add_chem_btn2"):
                 if new_chemical_name:
-                    if any(chem['name'].lower() == new_chemical_name.lower() for chem in st.session_state.chemicals):
-                        show_alert("Chemical already exists!", "warning")
-                    else:
-                        # Convert to kg for storage
-                        if stock_unit == "g":
-                            initial_stock_kg = convert_grams_to_kg(initial_stock)
+                    with editing_data():
+                        if chemical_exists(new_chemical_name, ignore_case=True):
+                            show_alert("Chemical already exists!", "warning")
                         else:
-                            initial_stock_kg = initial_stock
+                            # Convert to kg for storage
+                            if stock_unit == "g":
+                                initial_stock_kg = convert_grams_to_kg(initial_stock)
+                            else:
+                                initial_stock_kg = initial_stock
                             
-                        new_chemical = {
-                            'id': get_next_chemical_id(),
-                            'name': new_chemical_name,
-                            'stock': initial_stock_kg,
-                            'rate': chemical_rate,
-                            'original_unit': stock_unit
-                        }
-                        st.session_state.chemicals.append(new_chemical)
-                        auto_save()
-                        show_alert(f"Chemical '{new_chemical_name}' added successfully!", "success")
-                        st.rerun()
+                            new_chemical = {
+                                'id': get_next_chemical_id(),
+                                'name': new_chemical_name,
+                                'stock': initial_stock_kg,
+                                'rate': chemical_rate,
+                                'original_unit': stock_unit
+                            }
+                            add_chemical(new_chemical)
+                            record_change('upsert', 'chemicals', new_chemical['id'], new_chemical)
+                            auto_save()
+                            show_alert(f"Chemical '{new_chemical_name}' added successfully!", "success")
+                            st.rerun()
                 else:
                     show_alert("Please enter a chemical name", "error")
 
@@ -1666,17 +2874,19 @@ def main():
                     new_rate = st.number_input("New Rate (Optional)", min_value=0.0, step=0.1, key="new_rate")
 
                 if st.button("Add Stock", key="add_stock_btn"):
-                    chemical = next(chem for chem in st.session_state.chemicals if chem['name'] == selected_chemical)
-                    # Convert to kg for storage
-                    if add_unit == "g":
-                        stock_to_add_kg = convert_grams_to_kg(stock_to_add)
-                    else:
-                        stock_to_add_kg = stock_to_add
+                    with editing_data():
+                        chemical = find_chemical(selected_chemical)
+                        # Convert to kg for storage
+                        if add_unit == "g":
+                            stock_to_add_kg = convert_grams_to_kg(stock_to_add)
+                        else:
+                            stock_to_add_kg = stock_to_add
                         
-                    chemical['stock'] += stock_to_add_kg
-                    if new_rate > 0:
-                        chemical['rate'] = new_rate
-                    auto_save()
+                        chemical['stock'] += stock_to_add_kg
+                        if new_rate > 0:
+                            chemical['rate'] = new_rate
+                        record_change('upsert', 'chemicals', chemical['id'], chemical)
+                        auto_save()
                     show_alert(f"Added {stock_to_add} {add_unit} to {selected_chemical}", "success")
                     st.rerun()
             else:
@@ -1692,7 +2902,7 @@ def main():
 
                 if chemical_to_edit:
                     chemical_id = int(chemical_to_edit.split(" - ")[0])
-                    chemical = next((chem for chem in st.session_state.chemicals if chem['id'] == chemical_id), None)
+                    chemical = get_chemical(chemical_id)
 
                     if chemical:
                         col1, col2, col3 = st.columns(3)
@@ -1710,16 +2920,20 @@ def main():
                             delete_chemical = st.button("🗑️ Delete Chemical", type="secondary", use_container_width=True)
 
                         if update_chemical:
-                            chemical['name'] = edit_name
-                            chemical['stock'] = edit_stock
-                            chemical['rate'] = edit_rate
-                            auto_save()
+                            with editing_data():
+                                rename_chemical(chemical, edit_name)
+                                chemical['stock'] = edit_stock
+                                chemical['rate'] = edit_rate
+                                record_change('upsert', 'chemicals', chemical['id'], chemical)
+                                auto_save()
                             show_alert("Chemical updated successfully!", "success")
                             st.rerun()
 
                         if delete_chemical:
-                            st.session_state.chemicals = [chem for chem in st.session_state.chemicals if chem['id'] != chemical_id]
-                            auto_save()
+                            with editing_data():
+                                remove_chemical(chemical_id)
+                                record_change('delete', 'chemicals', chemical_id)
+                                auto_save()
                             show_alert("Chemical deleted successfully!", "success")
                             st.rerun()
 
@@ -1749,16 +2963,13 @@ def main():
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.button("📄 Generate Stock Report PDF", use_container_width=True, key="gen_stock_pdf"):
-                        with st.spinner("Generating PDF..."):
-                            pdf_buffer = create_stock_pdf()
-                            st.download_button(
-                                label="⬇️ Download Stock PDF",
-                                data=pdf_buffer,
-                                file_name=f"HMD Solutions_Chemical_Stock_Report_{datetime.now().strftime('%Y%m%d')}.pdf",
-                                mime="application/pdf",
-                                use_container_width=True,
-                                key="download_stock_pdf"
-                            )
+                        st.session_state.report_jobs['stock'] = get_report_queue().submit(*stock_report())
+                    render_report_job(
+                        'stock',
+                        label="⬇️ Download Stock PDF",
+                        file_name=f"HMD Solutions_Chemical_Stock_Report_{datetime.now().strftime('%Y%m%d')}.pdf",
+                        key="download_stock_pdf"
+                    )
             else:
                 st.info("No chemicals added yet.")
 
@@ -1796,18 +3007,21 @@ def main():
                         "box": "Boxes (1KG)"
                     }
 
-                    if packaging_type not in st.session_state.packaging_materials:
-                        st.session_state.packaging_materials[packaging_type] = {
-                            'name': packaging_names[packaging_type],
-                            'stock': 0,
-                            'rate': 0
-                        }
+                    with editing_data():
+                        if packaging_type not in st.session_state.packaging_materials:
+                            st.session_state.packaging_materials[packaging_type] = {
+                                'name': packaging_names[packaging_type],
+                                'stock': 0,
+                                'rate': 0
+                            }
 
-                    st.session_state.packaging_materials[packaging_type]['stock'] += packaging_quantity
-                    if packaging_rate > 0:
-                        st.session_state.packaging_materials[packaging_type]['rate'] = packaging_rate
+                        st.session_state.packaging_materials[packaging_type]['stock'] += packaging_quantity
+                        if packaging_rate > 0:
+                            st.session_state.packaging_materials[packaging_type]['rate'] = packaging_rate
+                        record_change('upsert', 'packaging_materials', packaging_type,
+                                      st.session_state.packaging_materials[packaging_type])
 
-                    auto_save()
+                        auto_save()
                     show_alert(f"Added {packaging_quantity} units to {packaging_names[packaging_type]}", "success")
                     st.rerun()
                 else:
@@ -1837,16 +3051,20 @@ def main():
                         delete_packaging = st.button("🗑️ Delete Packaging", type="secondary", use_container_width=True)
 
                     if update_packaging:
-                        material['name'] = edit_pack_name
-                        material['stock'] = edit_pack_stock
-                        material['rate'] = edit_pack_rate
-                        auto_save()
+                        with editing_data():
+                            material['name'] = edit_pack_name
+                            material['stock'] = edit_pack_stock
+                            material['rate'] = edit_pack_rate
+                            record_change('upsert', 'packaging_materials', selected_packaging, material)
+                            auto_save()
                         show_alert("Packaging material updated successfully!", "success")
                         st.rerun()
 
                     if delete_packaging:
-                        del st.session_state.packaging_materials[selected_packaging]
-                        auto_save()
+                        with editing_data():
+                            del st.session_state.packaging_materials[selected_packaging]
+                            record_change('delete', 'packaging_materials', selected_packaging)
+                            auto_save()
                         show_alert("Packaging material deleted successfully!", "success")
                         st.rerun()
 
@@ -1910,43 +3128,48 @@ def main():
             if vendor_name and vendor_type and item_name and item_quantity > 0 and item_rate > 0:
                 total_amount = item_quantity * item_rate
 
-                # Add to vendor ledger
-                vendor_transaction = {
-                    'id': get_next_vendor_id(),
-                    'date': transaction_date.strftime("%Y-%m-%d"),
-                    'vendor_name': vendor_name,
-                    'vendor_type': vendor_type,
-                    'item_name': item_name,
-                    'quantity': item_quantity,
-                    'rate': item_rate,
-                    'total_amount': total_amount,
-                    'notes': transaction_notes
-                }
-                st.session_state.vendor_ledger.append(vendor_transaction)
-
-                # Update stock if applicable
-                if vendor_type == "chemical":
-                    chemical = next((chem for chem in st.session_state.chemicals if chem['name'] == item_name), None)
-                    if chemical:
-                        chemical['stock'] += item_quantity
-                        chemical['rate'] = item_rate
-                elif vendor_type in ["bottle", "carton", "can", "box"]:
-                    if vendor_type not in st.session_state.packaging_materials:
-                        packaging_names = {
-                            "bottle": "Bottles (1L)",
-                            "carton": "Cartons (12 bottles)",
-                            "can": "Cans (25L)",
-                            "box": "Boxes (1KG)"
-                        }
-                        st.session_state.packaging_materials[vendor_type] = {
-                            'name': packaging_names[vendor_type],
-                            'stock': 0,
-                            'rate': 0
-                        }
-                    st.session_state.packaging_materials[vendor_type]['stock'] += item_quantity
-                    st.session_state.packaging_materials[vendor_type]['rate'] = item_rate
+                with editing_data():
+                    # Add to vendor ledger
+                    vendor_transaction = {
+                        'id': get_next_vendor_id(),
+                        'date': transaction_date.strftime("%Y-%m-%d"),
+                        'vendor_name': vendor_name,
+                        'vendor_type': vendor_type,
+                        'item_name': item_name,
+                        'quantity': item_quantity,
+                        'rate': item_rate,
+                        'total_amount': total_amount,
+                        'notes': transaction_notes
+                    }
+                    add_vendor_transaction(vendor_transaction)
+                    record_change('upsert', 'vendor_ledger', vendor_transaction['id'], vendor_transaction)
+
+                    # Update stock if applicable
+                    if vendor_type == "chemical":
+                        chemical = find_chemical(item_name)
+                        if chemical:
+                            chemical['stock'] += item_quantity
+                            chemical['rate'] = item_rate
+                            record_change('upsert', 'chemicals', chemical['id'], chemical)
+                    elif vendor_type in ["bottle", "carton", "can", "box"]:
+                        if vendor_type not in st.session_state.packaging_materials:
+                            packaging_names = {
+                                "bottle": "Bottles (1L)",
+                                "carton": "Cartons (12 bottles)",
+                                "can": "Cans (25L)",
+                                "box": "Boxes (1KG)"
+                            }
+                            st.session_state.packaging_materials[vendor_type] = {
+                                'name': packaging_names[vendor_type],
+                                'stock': 0,
+                                'rate': 0
+                            }
+                        st.session_state.packaging_materials[vendor_type]['stock'] += item_quantity
+                        st.session_state.packaging_materials[vendor_type]['rate'] = item_rate
+                        record_change('upsert', 'packaging_materials', vendor_type,
+                                      st.session_state.packaging_materials[vendor_type])
 
-                auto_save()
+                    auto_save()
                 show_alert(f"Vendor transaction added successfully! Total amount: Rs. {total_amount:,.2f}", "success")
                 st.rerun()
             else:
@@ -1990,21 +3213,27 @@ def main():
                             delete_vendor = st.form_submit_button("🗑️ Delete Transaction", type="secondary", use_container_width=True)
 
                         if update_vendor:
-                            vendor['vendor_name'] = edit_vendor_name
-                            vendor['vendor_type'] = edit_vendor_type
-                            vendor['item_name'] = edit_item_name
-                            vendor['quantity'] = edit_quantity
-                            vendor['rate'] = edit_rate
-                            vendor['total_amount'] = edit_quantity * edit_rate
-                            vendor['date'] = edit_date.strftime("%Y-%m-%d")
-                            vendor['notes'] = edit_notes
-                            auto_save()
+                            with editing_data():
+                                update_vendor_transaction(vendor, {
+                                    'vendor_name': edit_vendor_name,
+                                    'vendor_type': edit_vendor_type,
+                                    'item_name': edit_item_name,
+                                    'quantity': edit_quantity,
+                                    'rate': edit_rate,
+                                    'total_amount': edit_quantity * edit_rate,
+                                    'date': edit_date.strftime("%Y-%m-%d"),
+                                    'notes': edit_notes
+                                })
+                                record_change('upsert', 'vendor_ledger', vendor['id'], vendor)
+                                auto_save()
                             show_alert("Vendor transaction updated successfully!", "success")
                             st.rerun()
 
                         if delete_vendor:
-                            st.session_state.vendor_ledger = [v for v in st.session_state.vendor_ledger if v['id'] != vendor_id]
-                            auto_save()
+                            with editing_data():
+                                remove_vendor_transaction(vendor)
+                                record_change('delete', 'vendor_ledger', vendor_id)
+                                auto_save()
                             show_alert("Vendor transaction deleted successfully!", "success")
                             st.rerun()
 
@@ -2039,22 +3268,19 @@ def main():
             st.markdown('</div>', unsafe_allow_html=True)
 
             # Get unique vendor types
-            vendor_types = sorted(set([v['vendor_type'] for v in st.session_state.vendor_ledger]))
+            vendor_types = get_vendor_types()
 
             col1, col2 = st.columns(2)
 
             with col1:
                 if st.button("📄 All Vendors PDF Report", use_container_width=True, key="all_vendors_pdf"):
-                    with st.spinner("🔄 Generating professional PDF report..."):
-                        pdf_buffer = create_vendor_ledger_pdf()
-                        st.download_button(
-                            label="⬇️ Download Complete Vendor Ledger PDF",
-                            data=pdf_buffer,
-                            file_name=f"HMD Solutions_Complete_Vendor_Ledger_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
-                            mime="application/pdf",
-                            use_container_width=True,
-                            key="download_complete_vendor_pdf"
-                        )
+                    st.session_state.report_jobs['vendor_ledger'] = get_report_queue().submit(*vendor_ledger_report())
+                render_report_job(
+                    'vendor_ledger',
+                    label="⬇️ Download Complete Vendor Ledger PDF",
+                    file_name=f"HMD Solutions_Complete_Vendor_Ledger_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
+                    key="download_complete_vendor_pdf"
+                )
 
             with col2:
                 if st.button("🔄 Refresh Data", use_container_width=True, key="refresh_vendor"):
@@ -2069,34 +3295,27 @@ def main():
                     with cols[col_idx]:
                         if st.button(f"📄 {vendor_type.title()} Vendor PDF", use_container_width=True,
                                      key=f"{vendor_type}_pdf"):
-                            with st.spinner(f"🔄 Generating {vendor_type} vendor PDF..."):
-                                pdf_buffer = create_vendor_ledger_pdf(vendor_type=vendor_type)
-                                st.download_button(
-                                    label=f"⬇️ Download {vendor_type.title()} Vendor PDF",
-                                    data=pdf_buffer,
-                                    file_name=f"HMD Solutions_{vendor_type.title()}_Vendor_Ledger_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
-                                    mime="application/pdf",
-                                    use_container_width=True,
-                                    key=f"download_{vendor_type}_pdf"
-                                )
+                            st.session_state.report_jobs[f"vendor_ledger_{vendor_type}"] = get_report_queue().submit(
+                                *vendor_ledger_report(vendor_type=vendor_type))
+                        render_report_job(
+                            f"vendor_ledger_{vendor_type}",
+                            label=f"⬇️ Download {vendor_type.title()} Vendor PDF",
+                            file_name=f"HMD Solutions_{vendor_type.title()}_Vendor_Ledger_{datetime.now().strftime('%Y%m%d_%H%M')}.pdf",
+                            key=f"download_{vendor_type}_pdf"
+                        )
 
             # Vendor summary
             st.markdown('<div class="section-header">', unsafe_allow_html=True)
             st.subheader("📊 Vendor Summary")
             st.markdown('</div>', unsafe_allow_html=True)
 
-            vendor_summary = {}
-            for transaction in st.session_state.vendor_ledger:
-                vendor = transaction['vendor_name']
-                if vendor not in vendor_summary:
-                    vendor_summary[vendor] = 0
-                vendor_summary[vendor] += transaction['total_amount']
-
-            for vendor, total in vendor_summary.items():
-                balance = calculate_vendor_balance(vendor)
+            aggregates = get_vendor_aggregates()
+            for vendor in aggregates.vendor_names():
+                summary = aggregates.summary(vendor)
+                balance = summary['balance']
                 st.metric(
                     label=f"{vendor}",
-                    value=f"Rs. {total:,.2f}",
+                    value=f"Rs. {summary['purchases']:,.2f}",
                     delta=f"Balance: Rs. {balance:,.2f}",
                     delta_color="inverse" if balance > 0 else "normal"
                 )
@@ -2116,8 +3335,7 @@ def main():
             col1, col2 = st.columns(2)
             with col1:
                 # Get unique vendor names
-                vendor_names = sorted(set([v['vendor_name'] for v in
-                                           st.session_state.vendor_ledger])) if st.session_state.vendor_ledger else []
+                vendor_names = get_vendor_names()
                 selected_vendor = st.selectbox("Select Vendor", [""] + vendor_names, key="payment_vendor")
 
                 payment_amount = st.number_input("Payment Amount (Rs.)", min_value=0.0, step=100.0, value=0.0,
@@ -2135,17 +3353,19 @@ def main():
 
         if add_payment:
             if selected_vendor and payment_amount > 0:
-                # Add to vendor payments
-                payment_record = {
-                    'id': get_next_payment_id(),
-                    'date': payment_date.strftime("%Y-%m-%d"),
-                    'vendor_name': selected_vendor,
-                    'amount': payment_amount,
-                    'method': payment_method,
-                    'notes': payment_notes
-                }
-                st.session_state.vendor_payments.append(payment_record)
-                auto_save()
+                with editing_data():
+                    # Add to vendor payments
+                    payment_record = {
+                        'id': get_next_payment_id(),
+                        'date': payment_date.strftime("%Y-%m-%d"),
+                        'vendor_name': selected_vendor,
+                        'amount': payment_amount,
+                        'method': payment_method,
+                        'notes': payment_notes
+                    }
+                    add_vendor_payment(payment_record)
+                    record_change('upsert', 'vendor_payments', payment_record['id'], payment_record)
+                    auto_save()
                 show_alert(f"Payment of Rs. {payment_amount:,.2f} added successfully for {selected_vendor}!", "success")
                 st.rerun()
             else:
@@ -2187,18 +3407,24 @@ def main():
                             delete_payment = st.form_submit_button("🗑️ Delete Payment", type="secondary", use_container_width=True)
 
                         if update_payment:
-                            payment['vendor_name'] = edit_vendor
-                            payment['amount'] = edit_amount
-                            payment['date'] = edit_date.strftime("%Y-%m-%d")
-                            payment['method'] = edit_method
-                            payment['notes'] = edit_notes
-                            auto_save()
+                            with editing_data():
+                                update_vendor_payment(payment, {
+                                    'vendor_name': edit_vendor,
+                                    'amount': edit_amount,
+                                    'date': edit_date.strftime("%Y-%m-%d"),
+                                    'method': edit_method,
+                                    'notes': edit_notes
+                                })
+                                record_change('upsert', 'vendor_payments', payment['id'], payment)
+                                auto_save()
                             show_alert("Payment updated successfully!", "success")
                             st.rerun()
 
                         if delete_payment:
-                            st.session_state.vendor_payments = [p for p in st.session_state.vendor_payments if p['id'] != payment_id]
-                            auto_save()
+                            with editing_data():
+                                remove_vendor_payment(payment)
+                                record_change('delete', 'vendor_payments', payment_id)
+                                auto_save()
                             show_alert("Payment deleted successfully!", "success")
                             st.rerun()
 
@@ -2208,20 +3434,18 @@ def main():
         st.markdown('</div>', unsafe_allow_html=True)
 
         if st.session_state.vendor_ledger:
-            # Calculate balances for all vendors
-            vendor_balances = {}
-            for vendor in set([v['vendor_name'] for v in st.session_state.vendor_ledger]):
-                vendor_balances[vendor] = calculate_vendor_balance(vendor)
-
-            # Display vendor balances
-            for vendor, balance in vendor_balances.items():
+            # Display vendor balances from the running totals
+            aggregates = get_vendor_aggregates()
+            for vendor in aggregates.vendor_names():
+                summary = aggregates.summary(vendor)
+                balance = summary['balance']
                 balance_color = "🔴" if balance > 0 else "🟢"
                 st.markdown(f"""
                 <div class="vendor-card">
                     <div style="display: flex; justify-content: space-between; align-items: center;">
                         <div>
                             <b>{vendor}</b><br>
-                            <small>Outstanding Balance</small>
+                            <small>Outstanding Balance | Last activity: {summary['last_activity']}</small>
                         </div>
                         <div style="text-align: right;">
                             <b style="color: {'#e74c3c' if balance > 0 else '#27ae60'}; font-size: 1.2em;">
@@ -2233,6 +3457,13 @@ def main():
                     </div>
                 </div>
                 """, unsafe_allow_html=True)
+
+            if st.button("🔍 Verify Balances", key="verify_vendor_balances"):
+                drifted = check_vendor_aggregates()
+                if drifted:
+                    show_alert(f"Rebuilt balances for: {', '.join(drifted)}", "warning")
+                else:
+                    show_alert("All vendor balances are consistent.", "success")
         else:
             st.info("No vendor transactions available.")
 
@@ -2288,22 +3519,19 @@ def main():
                     df = pd.DataFrame(chemical_data)
                     st.subheader("Chemical Stock Report")
                     st.dataframe(df, use_container_width=True)
-
-                    # PDF Download for chemical report
-                    if st.button("📄 Download Chemical Report PDF", use_container_width=True, key="dl_chem_pdf"):
-                        with st.spinner("Generating PDF..."):
-                            pdf_buffer = create_stock_pdf()
-                            st.download_button(
-                                label="⬇️ Download Chemical Report",
-                                data=pdf_buffer,
-                                file_name=f"HMD Solutions_Chemical_Report_{datetime.now().strftime('%Y%m%d')}.pdf",
-                                mime="application/pdf",
-                                use_container_width=True,
-                                key="dl_chem_report"
-                            )
                 else:
                     st.info("No chemicals available for report.")
 
+            # PDF of the chemical report, rendered in the background
+            if st.button("📄 Chemical Report PDF", use_container_width=True, key="dl_chem_pdf"):
+                st.session_state.report_jobs['chemical_report'] = get_report_queue().submit(*stock_report())
+            render_report_job(
+                'chemical_report',
+                label="⬇️ Download Chemical Report",
+                file_name=f"HMD Solutions_Chemical_Report_{datetime.now().strftime('%Y%m%d')}.pdf",
+                key="dl_chem_report"
+            )
+
             if st.button("📦 Packaging Stock Report", use_container_width=True, key="pack_report"):
                 if st.session_state.packaging_materials:
                     packaging_data = []
@@ -2344,22 +3572,19 @@ def main():
                     df = pd.DataFrame(vendor_data)
                     st.subheader("Vendor Ledger Report")
                     st.dataframe(df, use_container_width=True)
-
-                    # PDF Download for vendor report
-                    if st.button("📄 Download Vendor Report PDF", use_container_width=True, key="dl_vendor_pdf"):
-                        with st.spinner("Generating PDF..."):
-                            pdf_buffer = create_vendor_ledger_pdf()
-                            st.download_button(
-                                label="⬇️ Download Vendor Report",
-                                data=pdf_buffer,
-                                file_name=f"HMD Solutions_Vendor_Report_{datetime.now().strftime('%Y%m%d')}.pdf",
-                                mime="application/pdf",
-                                use_container_width=True,
-                                key="dl_vendor_report"
-                            )
                 else:
                     st.info("No vendor transactions available for report.")
 
+            # PDF of the full vendor ledger, rendered in the background
+            if st.button("📄 Vendor Report PDF", use_container_width=True, key="dl_vendor_pdf"):
+                st.session_state.report_jobs['vendor_report'] = get_report_queue().submit(*vendor_ledger_report())
+            render_report_job(
+                'vendor_report',
+                label="⬇️ Download Vendor Report",
+                file_name=f"HMD Solutions_Vendor_Report_{datetime.now().strftime('%Y%m%d')}.pdf",
+                key="dl_vendor_report"
+            )
+
             if st.button("⚠️ Low Stock Alert Report", use_container_width=True, key="low_stock_report"):
                 low_stock_chemicals = [chem for chem in st.session_state.chemicals if
                                        0 < chem['stock'] < st.session_state.settings['low_stock_threshold']]
@@ -2434,6 +3659,7 @@ def main():
                 'low_stock_threshold': float(low_stock_threshold),
                 'packaging_low_stock': int(packaging_low_stock)
             }
+            record_change('replace', 'settings', value=st.session_state.settings)
             auto_save()
             show_alert("Settings saved successfully!", "success")
             st.rerun()
@@ -2469,17 +3695,7 @@ def main():
             if uploaded_file is not None:
                 try:
                     data = json.load(uploaded_file)
-                    if st.button("Import Data", type="primary", use_container_width=True, key="import_btn"):
-                        st.session_state.chemicals = data.get('chemicals', [])
-                        st.session_state.packaging_materials = data.get('packaging_materials', {})
-                        st.session_state.vendor_ledger = data.get('vendor_ledger', [])
-                        st.session_state.vendor_payments = data.get('vendor_payments', [])
-                        st.session_state.production_history = data.get('production_history', [])
-                        st.session_state.product_details = data.get('product_details', {})
-                        st.session_state.settings = data.get('settings', st.session_state.settings)
-                        auto_save()
-                        show_alert("Data imported successfully!", "success")
-                        st.rerun()
+                    render_json_import(data, "Import Data", "import_btn")
                 except Exception as e:
                     show_alert(f"Error importing data: {str(e)}", "error")
 
@@ -2494,7 +3710,7 @@ def main():
                         st.session_state.vendor_payments = []
                         st.session_state.production_history = []
                         st.session_state.product_details = {}
-                        auto_save()
+                        auto_save(compact=True)
                         show_alert("All data cleared successfully!", "success")
                         st.rerun()
 
@@ -2511,12 +3727,21 @@ def main():
 
             # Export to CSV
             if st.button("📊 Export to CSV", use_container_width=True, key="export_csv"):
-                with st.spinner("Exporting data to CSV..."):
-                    csv_buffer = export_to_csv()
+                st.session_state.csv_export = ExportJob(current_data())
+
+            export_job = st.session_state.get('csv_export')
+            if export_job is not None:
+                if not export_job.done:
+                    st.info("⏳ Exporting data to CSV in the background...")
+                    if st.button("🔄 Check Export", use_container_width=True, key="check_csv_export"):
+                        st.rerun()
+                elif export_job.error:
+                    show_alert(f"Error exporting data: {export_job.error}", "error")
+                else:
                     st.download_button(
                         label="⬇️ Download CSV Files (ZIP)",
-                        data=csv_buffer,
-                        file_name=f"HMD Solutions_Data_Export_{datetime.now().strftime('%Y%m%d_%H%M')}.zip",
+                        data=export_job.read(),
+                        file_name=f"HMD Solutions_Data_Export_{export_job.started.strftime('%Y%m%d_%H%M')}.zip",
                         mime="application/zip",
                         use_container_width=True,
                         key="download_csv"
@@ -2552,31 +3777,72 @@ def main():
                         for file in file_list:
                             st.write(f"- {file}")
 
-                    if st.button("🚀 Import Data", type="primary", use_container_width=True, key="import_data_btn"):
-                        with st.spinner("Importing data..."):
-                            imported_data = import_from_csv(uploaded_file)
-
-                            # Update session state with imported data
-                            if 'chemicals' in imported_data:
-                                st.session_state.chemicals = imported_data['chemicals']
-                            if 'packaging_materials' in imported_data:
-                                st.session_state.packaging_materials = imported_data['packaging_materials']
-                            if 'vendor_ledger' in imported_data:
-                                st.session_state.vendor_ledger = imported_data['vendor_ledger']
-                            if 'vendor_payments' in imported_data:
-                                st.session_state.vendor_payments = imported_data['vendor_payments']
-                            if 'production_history' in imported_data:
-                                st.session_state.production_history = imported_data['production_history']
-                            if 'product_details' in imported_data:
-                                st.session_state.product_details = imported_data['product_details']
+                    merge = st.radio("Import mode", ["Replace collections in the ZIP", "Merge (add new, update changed)"],
+                                     key="import_zip_mode") != "Replace collections in the ZIP"
+                    if merge and st.button("🔍 Preview Changes", use_container_width=True, key="import_zip_preview"):
+                        render_merge_report(merge_csv_zip(uploaded_file, dry_run=True))
 
-                            auto_save()
-                            show_alert("Data imported successfully!", "success")
-                            st.rerun()
+                    if st.button("🚀 Import Data", type="primary", use_container_width=True, key="import_data_btn"):
+                        progress_bar = st.progress(0.0, text="Validating files...")
+                        show_progress = lambda member, rows: progress_bar.progress(
+                            (list(CSV_IMPORT_FILES).index(member) + 1) / len(CSV_IMPORT_FILES),
+                            text=f"Imported {rows} rows from {member}"
+                        )
+                        if merge:
+                            report = merge_csv_zip(uploaded_file, progress=show_progress)
+                        else:
+                            imported_data = import_from_csv(uploaded_file, progress=show_progress)
+                        progress_bar.empty()
+                        st.toast("💾 Data saved successfully!", icon="✅")
+                        if merge:
+                            show_alert("Data merged successfully!", "success")
+                            render_merge_report(report)
+                        else:
+                            show_alert("Data imported successfully! " + ", ".join(
+                                f"{collection}: {rows}" for collection, rows in imported_data.items()), "success")
 
                 except Exception as e:
                     show_alert(f"Error reading ZIP file: {str(e)}", "error")
 
+        # Parquet for the vendor ledger and payments
+        st.subheader("📦 Parquet (Vendor Ledger & Payments)")
+        if not PARQUET_AVAILABLE:
+            st.info("Install pyarrow to export and import Parquet files.")
+        else:
+            parquet_collection = st.selectbox("Collection", list(PARQUET_COLUMNS), key="parquet_collection",
+                                              format_func=lambda name: name.replace('_', ' ').title())
+            col1, col2 = st.columns(2)
+
+            with col1:
+                if st.button("📦 Export Parquet", use_container_width=True, key="export_parquet"):
+                    st.download_button(
+                        label="⬇️ Download Parquet File",
+                        data=export_parquet(parquet_collection, st.session_state[parquet_collection]),
+                        file_name=f"HMD Solutions_{parquet_collection}_{datetime.now().strftime('%Y%m%d')}.parquet",
+                        mime="application/octet-stream",
+                        use_container_width=True,
+                        key="download_parquet"
+                    )
+
+            with col2:
+                uploaded_parquet = st.file_uploader("Merge Parquet File", type=['parquet'], key="import_parquet")
+                if uploaded_parquet is not None:
+                    start_date = end_date = None
+                    if st.checkbox("Only rows in a date range", key="parquet_date_range"):
+                        start_date = st.date_input("From", key="parquet_start")
+                        end_date = st.date_input("To", key="parquet_end")
+                    try:
+                        if st.button("🔍 Preview Changes", use_container_width=True, key="parquet_preview"):
+                            render_merge_report(merge_parquet(uploaded_parquet, parquet_collection, start_date, end_date,
+                                                              dry_run=True))
+                        if st.button("📥 Merge Parquet", type="primary", use_container_width=True, key="parquet_merge"):
+                            report = merge_parquet(uploaded_parquet, parquet_collection, start_date, end_date)
+                            st.toast("💾 Data saved successfully!", icon="✅")
+                            show_alert("Data merged successfully!", "success")
+                            render_merge_report(report)
+                    except Exception as e:
+                        show_alert(f"Error reading Parquet file: {str(e)}", "error")
+
         # Data Management
         st.markdown('<div class="section-header">', unsafe_allow_html=True)
         st.subheader("🗃️ Data Management")
@@ -2612,17 +3878,7 @@ def main():
             if uploaded_json is not None:
                 try:
                     data = json.load(uploaded_json)
-                    if st.button("Import JSON Data", type="primary", use_container_width=True, key="import_json_btn"):
-                        st.session_state.chemicals = data.get('chemicals', [])
-                        st.session_state.packaging_materials = data.get('packaging_materials', {})
-                        st.session_state.vendor_ledger = data.get('vendor_ledger', [])
-                        st.session_state.vendor_payments = data.get('vendor_payments', [])
-                        st.session_state.production_history = data.get('production_history', [])
-                        st.session_state.product_details = data.get('product_details', {})
-                        st.session_state.settings = data.get('settings', st.session_state.settings)
-                        auto_save()
-                        show_alert("Data imported successfully!", "success")
-                        st.rerun()
+                    render_json_import(data, "Import JSON Data", "import_json_btn")
                 except Exception as e:
                     show_alert(f"Error importing data: {str(e)}", "error")
 
@@ -2638,7 +3894,7 @@ def main():
                         st.session_state.vendor_payments = []
                         st.session_state.production_history = []
                         st.session_state.product_details = {}
-                        auto_save()
+                        auto_save(compact=True)
                         show_alert("All data cleared successfully!", "success")
                         st.rerun()
 
@@ -7,8 +7,11 @@ import io
 import base64
 import tempfile
 import os
+import re
 import sqlite3
 import uuid
+import threading
+from contextlib import contextmanager
 from PIL import Image
 
 # Try to import plotly with fallback
@@ -20,13 +23,20 @@ except ImportError:
     PLOTLY_AVAILABLE = False
     st.warning("Plotly not available. Using alternative visualizations.")
 
-# Try to import fpdf with fallback
+# PDF reports go through the shared report engine, whose FPDF backend is optional
+from report_engine import (Report, Text, Spacer, DataTable, Theme, get_report_queue,
+                           FPDF_AVAILABLE)
+if not FPDF_AVAILABLE:
+    st.warning("FPDF not available. PDF generation disabled.")
+
+# Parquet export/import needs pyarrow; the rest of the app works without it
 try:
-    from fpdf import FPDF
-    FPDF_AVAILABLE = True
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.parquet as pq
+    PARQUET_AVAILABLE = True
 except ImportError:
-    FPDF_AVAILABLE = False
-    st.warning("FPDF not available. PDF generation disabled.")
+    PARQUET_AVAILABLE = False
 
 # Set page configuration
 st.set_page_config(
@@ -200,10 +210,91 @@ st.markdown("""
 </style>
 """, unsafe_allow_html=True)
 
-# Database setup for persistent storage
-def init_database():
-    conn = sqlite3.connect('hmd_solutions.db', check_same_thread=False)
-    c = conn.cursor()
+# Database connection management
+DB_PATH = 'hmd_solutions.db'
+DB_PRAGMAS = {
+    'journal_mode': 'WAL',
+    'synchronous': 'NORMAL',
+    'cache_size': -16000,  # 16 MB page cache per connection
+    'mmap_size': 268435456,  # 256 MB memory-mapped I/O
+    'temp_store': 'MEMORY'
+}
+
+class ConnectionManager:
+    def __init__(self, path=DB_PATH, pragmas=DB_PRAGMAS):
+        self.path = path
+        self.pragmas = pragmas
+        self.lock = threading.Lock()
+        self.connections = {}
+        self.idle = []
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, check_same_thread=False, timeout=10)
+        for name, value in self.pragmas.items():
+            conn.execute(f'PRAGMA {name} = {value}')
+        return conn
+
+    def _reclaim(self):
+        # Hand connections of finished script threads back to the idle pool
+        for thread in [t for t in self.connections if not t.is_alive()]:
+            conn = self.connections.pop(thread)
+            if conn.in_transaction:
+                conn.rollback()
+            self.idle.append(conn)
+
+    def get_connection(self):
+        thread = threading.current_thread()
+        with self.lock:
+            conn = self.connections.get(thread)
+            if conn is None:
+                self._reclaim()
+                conn = self.idle.pop() if self.idle else self._connect()
+                self.connections[thread] = conn
+            return conn
+
+@st.cache_resource
+def get_connection_manager():
+    # Schema migrations and the search index check run here, once per process, before any query
+    manager = ConnectionManager()
+    conn = manager.get_connection()
+    migrate_database(conn)
+    sync_search_index(conn.cursor())
+    conn.commit()
+    return manager
+
+def get_db_connection():
+    return get_connection_manager().get_connection()
+
+@contextmanager
+def db_transaction():
+    conn = get_db_connection()
+    try:
+        yield conn
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+
+# Database schema migrations, applied in order and tracked in PRAGMA user_version
+def migrate_database(conn):
+    version = conn.execute('PRAGMA user_version').fetchone()[0]
+    if version >= len(SCHEMA_MIGRATIONS):
+        return version
+
+    # Take the write lock first so concurrent processes migrate one at a time
+    conn.execute('BEGIN IMMEDIATE')
+    try:
+        version = conn.execute('PRAGMA user_version').fetchone()[0]
+        for number in range(version, len(SCHEMA_MIGRATIONS)):
+            SCHEMA_MIGRATIONS[number](conn.cursor())
+            conn.execute(f'PRAGMA user_version = {number + 1}')
+        conn.commit()
+    except Exception:
+        conn.rollback()
+        raise
+    return len(SCHEMA_MIGRATIONS)
+
+def migration_001_base_schema(c):
 
     # Create employees table with all columns
     c.execute('''
@@ -274,38 +365,618 @@ def init_database():
         c.execute("SELECT category FROM transactions LIMIT 1")
     except sqlite3.OperationalError:
         c.execute("ALTER TABLE transactions ADD COLUMN category TEXT DEFAULT ''")
-        st.info("Updated transactions table with category column")
+        print("Updated transactions table with category column")
 
     # Check if category column exists in expenses table and add if missing
     try:
         c.execute("SELECT category FROM expenses LIMIT 1")
     except sqlite3.OperationalError:
         c.execute("ALTER TABLE expenses ADD COLUMN category TEXT DEFAULT ''")
-        st.info("Updated expenses table with category column")
+        print("Updated expenses table with category column")
 
     # Check if status column exists in expenses table and add if missing
     try:
         c.execute("SELECT status FROM expenses LIMIT 1")
     except sqlite3.OperationalError:
         c.execute("ALTER TABLE expenses ADD COLUMN status TEXT DEFAULT 'Pending'")
-        st.info("Updated expenses table with status column")
+        print("Updated expenses table with status column")
+
+def migration_002_secondary_indexes(c):
+    # Employee ledger: per-employee listing by date and per-type balance sums
+    c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_employee_date ON transactions (employee_id, date)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_employee_type ON transactions (employee_id, type, amount)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date ON transactions (date)')
+    # Expenses: filtered by type and date range, newest first
+    c.execute('CREATE INDEX IF NOT EXISTS idx_expenses_type_date ON expenses (type, date)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_expenses_date ON expenses (date)')
+
+def migration_003_expense_monthly_rollup(c):
+    # Per-month totals kept in step with expenses by triggers, so every writer
+    # (add/update/delete, imports, reset) updates it incrementally
+    c.execute('''
+        CREATE TABLE IF NOT EXISTS expense_monthly_rollup (
+            month TEXT NOT NULL,
+            type TEXT NOT NULL,
+            category TEXT NOT NULL DEFAULT '',
+            status TEXT NOT NULL DEFAULT '',
+            total REAL NOT NULL DEFAULT 0,
+            count INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (month, type, category, status)
+        )
+    ''')
+    add_row = '''
+        INSERT INTO expense_monthly_rollup (month, type, category, status, total, count)
+        VALUES (substr(NEW.date, 1, 7), NEW.type, COALESCE(NEW.category, ''), COALESCE(NEW.status, ''), NEW.amount, 1)
+        ON CONFLICT (month, type, category, status)
+        DO UPDATE SET total = total + excluded.total, count = count + 1;
+    '''
+    remove_row = '''
+        UPDATE expense_monthly_rollup SET total = total - OLD.amount, count = count - 1
+        WHERE month = substr(OLD.date, 1, 7) AND type = OLD.type
+          AND category = COALESCE(OLD.category, '') AND status = COALESCE(OLD.status, '');
+        DELETE FROM expense_monthly_rollup
+        WHERE month = substr(OLD.date, 1, 7) AND type = OLD.type
+          AND category = COALESCE(OLD.category, '') AND status = COALESCE(OLD.status, '') AND count <= 0;
+    '''
+    c.execute(f'CREATE TRIGGER IF NOT EXISTS expenses_rollup_insert AFTER INSERT ON expenses BEGIN {add_row} END')
+    c.execute(f'CREATE TRIGGER IF NOT EXISTS expenses_rollup_delete AFTER DELETE ON expenses BEGIN {remove_row} END')
+    c.execute(f'''
+        CREATE TRIGGER IF NOT EXISTS expenses_rollup_update
+        AFTER UPDATE OF date, type, category, status, amount ON expenses
+        BEGIN {remove_row} {add_row} END
+    ''')
 
-    conn.commit()
-    conn.close()
+    # Backfill from the existing history
+    c.execute('DELETE FROM expense_monthly_rollup')
+    c.execute('''
+        INSERT INTO expense_monthly_rollup (month, type, category, status, total, count)
+        SELECT substr(date, 1, 7), type, COALESCE(category, ''), COALESCE(status, ''), SUM(amount), COUNT(*)
+        FROM expenses
+        GROUP BY 1, 2, 3, 4
+    ''')
 
-def get_db_connection():
-    return sqlite3.connect('hmd_solutions.db', check_same_thread=False)
+# Full-text search tables: FTS5 table -> (source table, indexed columns)
+SEARCH_INDEXES = {
+    'employees_fts': ('employees', ('name', 'department', 'position', 'email')),
+    'transactions_fts': ('transactions', ('description', 'category')),
+    'expenses_fts': ('expenses', ('description', 'category', 'employee_name'))
+}
+
+def rebuild_search_index(c, fts_tables=SEARCH_INDEXES):
+    # Repopulates the given FTS tables, by default all of them, from their source tables
+    for fts_table in fts_tables:
+        table, columns = SEARCH_INDEXES[fts_table]
+        column_list = ', '.join(columns)
+        c.execute(f'DELETE FROM {fts_table}')
+        c.execute(f'''
+            INSERT INTO {fts_table} (rowid, id, {column_list})
+            SELECT rowid, id, {column_list} FROM {table}
+        ''')
+
+def sync_search_index(c):
+    # The triggers address FTS rows by the source row's rowid, which a VACUUM
+    # may renumber in tables with TEXT keys. Rebuilds the FTS tables whose rows
+    # no longer line up with their source rows and returns their names.
+    stale = []
+    for fts_table, (table, columns) in SEARCH_INDEXES.items():
+        in_sync = c.execute(f'''
+            SELECT (SELECT COUNT(*) FROM {table}) = (SELECT COUNT(*) FROM {fts_table})
+               AND NOT EXISTS (SELECT 1 FROM {table} LEFT JOIN {fts_table} ON {fts_table}.rowid = {table}.rowid
+                               WHERE {fts_table}.id IS NOT {table}.id)
+        ''').fetchone()[0]
+        if not in_sync:
+            stale.append(fts_table)
+    rebuild_search_index(c, stale)
+    return stale
+
+def migration_004_full_text_search(c):
+    # FTS rows share the source row's rowid so triggers can address them
+    # directly; sync_search_index() realigns them after a VACUUM
+    for fts_table, (table, columns) in SEARCH_INDEXES.items():
+        column_list = ', '.join(columns)
+        new_values = ', '.join(f'NEW.{column}' for column in columns)
+        c.execute(f'''
+            CREATE VIRTUAL TABLE IF NOT EXISTS {fts_table}
+            USING fts5(id UNINDEXED, {column_list}, prefix='2 3')
+        ''')
+        add_row = f'INSERT INTO {fts_table} (rowid, id, {column_list}) VALUES (NEW.rowid, NEW.id, {new_values});'
+        remove_row = f'DELETE FROM {fts_table} WHERE rowid = OLD.rowid;'
+        c.execute(f'CREATE TRIGGER IF NOT EXISTS {table}_fts_insert AFTER INSERT ON {table} BEGIN {add_row} END')
+        c.execute(f'CREATE TRIGGER IF NOT EXISTS {table}_fts_delete AFTER DELETE ON {table} BEGIN {remove_row} END')
+        c.execute(f'''
+            CREATE TRIGGER IF NOT EXISTS {table}_fts_update AFTER UPDATE ON {table}
+            BEGIN {remove_row} {add_row} END
+        ''')
+    rebuild_search_index(c)
+
+def migration_005_keyset_indexes(c):
+    # Listings page by (date, id) newest first; the id column makes the
+    # cursor unique and lets each page start with an index seek
+    c.execute('DROP INDEX IF EXISTS idx_transactions_date')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_date_id ON transactions (date, id)')
+    c.execute('DROP INDEX IF EXISTS idx_expenses_date')
+    c.execute('DROP INDEX IF EXISTS idx_expenses_type_date')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_expenses_date_id ON expenses (date, id)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_expenses_type_date_id ON expenses (type, date, id)')
+
+def migration_006_natural_key_indexes(c):
+    # Merge imports look rows up by their natural keys; the transactions key
+    # index also serves every (employee_id, date) query the old index did
+    c.execute('DROP INDEX IF EXISTS idx_transactions_employee_date')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_transactions_natural_key ON transactions (employee_id, date, type, description)')
+    c.execute('CREATE INDEX IF NOT EXISTS idx_employees_name ON employees (name)')
+
+SCHEMA_MIGRATIONS = [
+    migration_001_base_schema,
+    migration_002_secondary_indexes,
+    migration_003_expense_monthly_rollup,
+    migration_004_full_text_search,
+    migration_005_keyset_indexes,
+    migration_006_natural_key_indexes
+]
+
+def fts_query(search_query, column=None):
+    # Turns free text into an FTS5 prefix query: every word must match as a prefix
+    terms = ' '.join(f'"{word}"*' for word in re.findall(r'\w+', search_query or ''))
+    if not terms:
+        return None
+    return f'{column} : ({terms})' if column else terms
+
+# Rows per page in the transaction and expense listings
+PAGE_SIZE = 25
+
+def transaction_from_row(row):
+    if len(row) >= 8:
+        return {
+            'id': row[0],
+            'employee_id': row[1],
+            'type': row[2],
+            'amount': row[3],
+            'description': row[4],
+            'category': row[5],
+            'date': row[6],
+            'employee_name': row[7]
+        }
+    return {
+        'id': row[0],
+        'employee_id': row[1],
+        'type': row[2],
+        'amount': row[3],
+        'description': row[4],
+        'category': "",
+        'date': row[5] if len(row) > 5 else row[4],
+        'employee_name': "Unknown"
+    }
 
-class SettingsManager:
-    def __init__(self):
-        init_database()
+def expense_from_row(row):
+    if len(row) >= 8:
+        return {
+            'id': row[0],
+            'type': row[1],
+            'description': row[2],
+            'amount': row[3],
+            'category': row[4],
+            'employee_name': row[5],
+            'date': row[6],
+            'status': row[7]
+        }
+    # Handle older schema without status column
+    return {
+        'id': row[0],
+        'type': row[1],
+        'description': row[2],
+        'amount': row[3],
+        'category': row[4] if len(row) > 4 else "",
+        'employee_name': row[5] if len(row) > 5 else "",
+        'date': row[6] if len(row) > 6 else row[5],
+        'status': 'Pending'
+    }
+
+def keyset_page(c, query, conditions, params, cursor, page_size, from_row, prefix=''):
+    # Runs a listing query one page at a time, newest first. The cursor is the
+    # (date, id) of the last row already shown; returns (items, next cursor).
+    conditions = list(conditions)
+    params = list(params)
+    if cursor is not None:
+        conditions.append(f'({prefix}date, {prefix}id) < (?, ?)')
+        params.extend(cursor)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    query += f' ORDER BY {prefix}date DESC, {prefix}id DESC LIMIT ?'
+    c.execute(query, params + [page_size + 1])
+    items = [from_row(row) for row in c.fetchall()]
+    if len(items) <= page_size:
+        return items, None
+    items = items[:page_size]
+    return items, (items[-1]['date'], items[-1]['id'])
+
+# Hot queries that must be served by an index, with representative parameters
+HOT_QUERIES = {
+    'employee transactions': (
+        'SELECT * FROM transactions WHERE employee_id = ? ORDER BY date DESC',
+        ('employee',)
+    ),
+    'employee transactions by date': (
+        'SELECT * FROM transactions WHERE employee_id = ? AND date BETWEEN ? AND ? ORDER BY date DESC',
+        ('employee', '2024-01-01', '2024-12-31')
+    ),
+    'employee balance': (
+        'SELECT type, SUM(amount) FROM transactions WHERE employee_id = ? GROUP BY type',
+        ('employee',)
+    ),
+    'expenses by date': (
+        'SELECT * FROM expenses WHERE date BETWEEN ? AND ? ORDER BY date DESC',
+        ('2024-01-01', '2024-12-31')
+    ),
+    'expenses by type and date': (
+        'SELECT * FROM expenses WHERE type = ? AND date BETWEEN ? AND ? ORDER BY date DESC',
+        ('company', '2024-01-01', '2024-12-31')
+    ),
+    'expenses by type': (
+        'SELECT * FROM expenses WHERE type = ? ORDER BY date DESC',
+        ('company',)
+    ),
+    'transactions page': (
+        'SELECT * FROM transactions WHERE (date, id) < (?, ?) ORDER BY date DESC, id DESC LIMIT 26',
+        ('2024-06-30', 'id')
+    ),
+    'expenses page by type and date': (
+        'SELECT * FROM expenses WHERE type = ? AND date BETWEEN ? AND ? AND (date, id) < (?, ?) '
+        'ORDER BY date DESC, id DESC LIMIT 26',
+        ('company', '2024-01-01', '2024-12-31', '2024-06-30', 'id')
+    )
+}
+
+def check_query_plans(path=DB_PATH):
+    # Returns {query name: [plan steps that scan a whole table or sort in a temp b-tree]}.
+    # Uses its own connection so no cached statement hides a schema change.
+    if path == DB_PATH:
+        get_db_connection()  # Migrates the app database, whatever ran before us
+    conn = sqlite3.connect(path)
+    try:
+        migrate_database(conn)  # No-op once the schema is current
+        problems = {}
+        for name, (query, params) in HOT_QUERIES.items():
+            steps = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', params)]
+            bad = [step for step in steps if step.startswith('SCAN ') or 'TEMP B-TREE' in step]
+            if bad:
+                problems[name] = bad
+        return problems
+    finally:
+        conn.close()
+
+# Group-by dimensions for the summary APIs, mapped to SQL expressions
+EXPENSE_DIMENSIONS = {
+    'type': 'type',
+    'category': 'category',
+    'status': 'status',
+    'employee': 'employee_name',
+    'month': 'substr(date, 1, 7)'
+}
+TRANSACTION_DIMENSIONS = {
+    'type': 'type',
+    'category': 'category',
+    'employee': 'employee_id',
+    'month': 'substr(date, 1, 7)'
+}
+
+def summarize_table(table, dimensions, group_by=(), start_date=None, end_date=None, filters=None):
+    # Aggregates amount in SQLite: [{<dimension>: value, ..., 'total': sum, 'count': rows}]
+    unknown = [name for name in list(group_by) + list(filters or {}) if name not in dimensions]
+    if unknown:
+        raise ValueError(f"Unknown summary dimension(s): {', '.join(unknown)}")
+
+    columns = [f'{dimensions[name]} AS {name}' for name in group_by]
+    columns += ['COALESCE(SUM(amount), 0) AS total', 'COUNT(*) AS count']
+    query = f"SELECT {', '.join(columns)} FROM {table}"
+
+    conditions = []
+    params = []
+    if start_date and end_date:
+        conditions.append('date BETWEEN ? AND ?')
+        params.extend([start_date, end_date])
+    for name, value in (filters or {}).items():
+        conditions.append(f'{dimensions[name]} = ?')
+        params.append(value)
+    if conditions:
+        query += ' WHERE ' + ' AND '.join(conditions)
+    if group_by:
+        query += f" GROUP BY {', '.join(group_by)} ORDER BY {', '.join(group_by)}"
+
+    c = get_db_connection().cursor()
+    c.execute(query, params)
+    names = [column[0] for column in c.description]
+    return [dict(zip(names, row)) for row in c.fetchall()]
+
+# CSV import layouts: column order, required columns, defaults for optional
+# ones, numeric and date columns, allowed values, and the natural keys a merge
+# import matches existing rows on (the first key whose columns the file has)
+IMPORT_SPECS = {
+    'employees': {
+        'columns': ['name', 'initial_balance', 'phone', 'email', 'department', 'position', 'join_date'],
+        'required': ['name'],
+        'defaults': {'initial_balance': 0.0, 'phone': '', 'email': '', 'department': '', 'position': ''},
+        'numeric': ['initial_balance'],
+        'dates': ['join_date'],
+        'choices': {},
+        'keys': [('id',), ('name',)]
+    },
+    'transactions': {
+        'columns': ['employee_id', 'type', 'amount', 'description', 'category', 'date'],
+        'required': ['employee_id', 'type', 'amount', 'description'],
+        'defaults': {'category': ''},
+        'numeric': ['amount'],
+        'dates': ['date'],
+        'choices': {'type': ['expense', 'payment']},
+        'keys': [('employee_id', 'date', 'type', 'description')]
+    },
+    'expenses': {
+        'columns': ['type', 'description', 'amount', 'category', 'employee_name', 'date', 'status'],
+        'required': ['type', 'description', 'amount'],
+        'defaults': {'category': '', 'employee_name': '', 'status': 'Pending'},
+        'numeric': ['amount'],
+        'dates': ['date'],
+        'choices': {'type': ['company', 'employee'], 'status': ['Pending', 'Approved', 'Rejected', 'Paid']},
+        'keys': [('type', 'date', 'description', 'employee_name')]
+    }
+}
+IMPORT_CHUNK_SIZE = 5000
+# Row errors kept for display; the total is still counted
+MAX_IMPORT_ERRORS = 1000
+# Added and updated rows listed in a merge preview
+MAX_IMPORT_PREVIEW = 50
+
+def validate_import_chunk(kind, df, keep_blank=()):
+    # Checks a chunk column by column; returns (rows ready to insert, {row index: [problems]}).
+    # Blank cells in keep_blank columns stay empty instead of taking their default,
+    # so a merge can leave the existing value alone.
+    spec = IMPORT_SPECS[kind]
+    missing = [column for column in spec['required'] if column not in df.columns]
+    if missing:
+        raise ValueError(f"Missing required column(s): {', '.join(missing)}")
+    
+    df = df.reindex(columns=['id'] + spec['columns'])
+    problems = pd.Series([[] for _ in range(len(df))], index=df.index)
+    
+    def flag(mask, message):
+        for index in df.index[mask]:
+            problems[index].append(message)
+    
+    text = df.apply(lambda column: column.str.strip() if pd.api.types.is_string_dtype(column) else column)
+    for column in spec['required']:
+        flag(text[column].isna() | (text[column] == ''), f"{column} is required")
+    for column, default in spec['defaults'].items():
+        default = None if column in keep_blank else default
+        text[column] = text[column].where(text[column].notna() & (text[column] != ''), default)
+    for column in spec['numeric']:
+        values = pd.to_numeric(text[column], errors='coerce')
+        flag(values.isna() & text[column].notna() & (text[column] != ''), f"{column} is not a number")
+        if column == 'amount':
+            flag(values <= 0, "amount must be greater than zero")
+        text[column] = values
+    for column in spec['dates']:
+        given = text[column].notna() & (text[column] != '')
+        dates = pd.to_datetime(text[column].where(given), format='%Y-%m-%d', errors='coerce')
+        flag(given & dates.isna(), f"{column} must be YYYY-MM-DD")
+        default = None if column in keep_blank else datetime.now().strftime('%Y-%m-%d')
+        text[column] = dates.dt.strftime('%Y-%m-%d').where(given, default)
+    for column, allowed in spec['choices'].items():
+        present = text[column].notna() & (text[column] != '')
+        flag(present & ~text[column].isin(allowed), f"{column} must be one of {', '.join(allowed)}")
+    
+    errors = {index: messages for index, messages in problems.items() if messages}
+    return text.drop(index=list(errors)), errors
+
+def merge_import_rows(c, kind, rows, keys, result, provided, blank=()):
+    # Upserts validated rows by natural key through a temp table: matched rows
+    # get only their changed columns, unmatched rows are inserted. Only columns
+    # the file provides are updated; defaults for the others apply to new rows only.
+    # Cells of the blank columns left empty keep the matched row's value and take
+    # their default on insert.
+    spec = IMPORT_SPECS[kind]
+    table = f'temp.import_{kind}'
+    columns = ['id'] + spec['columns']
+    values = [column for column in spec['columns'] if column not in keys and column in provided]
+    c.execute(f"CREATE TEMP TABLE IF NOT EXISTS import_{kind} (row INTEGER, {', '.join(columns)})")
+    c.execute(f'DELETE FROM {table}')
+    c.executemany(
+        f"INSERT INTO {table} (row, {', '.join(columns)}) VALUES ({', '.join('?' * (len(columns) + 1))})",
+        ((index + 1, *row) for index, row in zip(rows.index, rows.itertuples(index=False, name=None)))
+    )
+    
+    # The last row wins when a key repeats within the chunk
+    c.execute(f"""
+        SELECT row FROM {table} WHERE rowid NOT IN (SELECT MAX(rowid) FROM {table} GROUP BY {', '.join(keys)})
+    """)
+    for (row,) in c.fetchall():
+        result['error_count'] += 1
+        if len(result['errors']) < MAX_IMPORT_ERRORS:
+            result['errors'].append({'row': row, 'error': "duplicate key; a later row in the file was used"})
+    c.execute(f"DELETE FROM {table} WHERE rowid NOT IN (SELECT MAX(rowid) FROM {table} GROUP BY {', '.join(keys)})")
+    
+    match = ' AND '.join(
+        f't.{key} = i.{key}' if key in spec['required'] + spec['dates'] + ['id']
+        else f"COALESCE(t.{key}, '') = COALESCE(i.{key}, '')"
+        for key in keys
+    )
+    differs = ' OR '.join(
+        f"COALESCE(t.{column}, '') IS NOT COALESCE(i.{column}, t.{column}, '')" for column in values
+    ) or '0'
+    
+    c.execute(f"""
+        SELECT i.row, {', '.join(f'i.{key}' for key in keys)},
+               {', '.join(f't.{column}, i.{column}' for column in values)}
+        FROM {table} i CROSS JOIN {kind} t ON {match}
+        WHERE {differs}
+    """)
+    updated = c.fetchall()
+    c.execute(f"SELECT COUNT(*) FROM {table} i WHERE EXISTS (SELECT 1 FROM {kind} t WHERE {match})")
+    matched = c.fetchone()[0]
+    c.execute(f"""
+        SELECT i.row, {', '.join(f'i.{key}' for key in keys)}
+        FROM {table} i WHERE NOT EXISTS (SELECT 1 FROM {kind} t WHERE {match})
+        LIMIT {MAX_IMPORT_PREVIEW}
+    """)
+    added = c.fetchall()
+    
+    for row in added:
+        if len(result['preview']) < MAX_IMPORT_PREVIEW:
+            result['preview'].append({'row': row[0], 'action': 'added', **dict(zip(keys, row[1:]))})
+    for row in updated:
+        if len(result['preview']) < MAX_IMPORT_PREVIEW:
+            pairs = row[1 + len(keys):]
+            changes = {column: f"{old} → {new}" for column, old, new in zip(values, pairs[::2], pairs[1::2])
+                       if new is not None and (old if old is not None else '') != new}
+            result['preview'].append({'row': row[0], 'action': 'updated', **dict(zip(keys, row[1:1 + len(keys)])), **changes})
+    
+    if values:
+        # CROSS JOIN walks the import rows and probes the table's index per row
+        c.execute(f"""
+            UPDATE {kind} AS t SET ({', '.join(values)}) = (
+                SELECT {', '.join(f'COALESCE(i.{column}, t.{column})' for column in values)} FROM {table} i WHERE {match}
+            )
+            WHERE t.rowid IN (SELECT t.rowid FROM {table} i CROSS JOIN {kind} t ON {match} WHERE {differs})
+        """)
+    today = datetime.now().strftime('%Y-%m-%d')
+    defaults = [spec['defaults'].get(column, today) for column in columns if column in blank]
+    c.execute(f"""
+        INSERT INTO {kind} ({', '.join(columns)})
+        SELECT {', '.join(f'COALESCE(i.{column}, ?)' if column in blank else f'i.{column}' for column in columns)}
+        FROM {table} i
+        WHERE NOT EXISTS (SELECT 1 FROM {kind} t WHERE {match})
+    """, defaults)
+    result['imported'] += c.rowcount
+    updated_rows = len({row[0] for row in updated})
+    result['updated'] += updated_rows
+    result['unchanged'] += matched - updated_rows
+
+def bulk_import_csv(kind, source, chunk_size=IMPORT_CHUNK_SIZE, progress=None, merge=False, dry_run=False):
+    # Streams a CSV in chunks of text columns into bulk_import_chunks()
+    chunks = pd.read_csv(source, chunksize=chunk_size, dtype=str, keep_default_na=False)
+    return bulk_import_chunks(kind, chunks, progress, merge, dry_run)
+
+def bulk_import_chunks(kind, chunks, progress=None, merge=False, dry_run=False):
+    # Writes every valid row of the chunks in a single transaction. By default
+    # rows are appended with executemany; with merge they are upserted by
+    # natural key. A dry run does the same work and rolls it back, so its
+    # counts and preview are exactly what the import would do.
+    spec = IMPORT_SPECS[kind]
+    result = {'imported': 0, 'updated': 0, 'unchanged': 0, 'error_count': 0, 'errors': [], 'preview': []}
+    columns = ', '.join(['id'] + spec['columns'])
+    placeholders = ', '.join('?' * (len(spec['columns']) + 1))
+    keys = None
+    provided = None
+    blank = ()
+    
+    with db_transaction() as conn:
+        c = conn.cursor()
+        for chunk in chunks:
+            chunk.columns = [str(column).strip() for column in chunk.columns]
+            if keys is None:
+                provided = set(chunk.columns)
+                # The last key only uses required or defaulted columns, so it always applies
+                keys = next((key for key in spec['keys'] if set(key) <= set(chunk.columns)), spec['keys'][-1])
+                if merge:
+                    # Optional columns a merge updates: a blank cell there means "leave as is"
+                    blank = [column for column in spec['columns']
+                             if column in provided and column not in keys and column not in spec['required']]
+            rows, errors = validate_import_chunk(kind, chunk, blank)
+            
+            if kind == 'transactions' and len(rows):
+                # Reject rows pointing at employees that do not exist
+                employee_ids = rows['employee_id'].unique().tolist()
+                c.execute(f"SELECT id FROM employees WHERE id IN ({', '.join('?' * len(employee_ids))})", employee_ids)
+                known = {row[0] for row in c.fetchall()}
+                unknown = rows.index[~rows['employee_id'].isin(known)]
+                for index in unknown:
+                    errors[index] = ["employee_id does not match an employee"]
+                rows = rows.drop(index=unknown)
+            
+            # Rows get fresh ids unless a merge matches on the file's own ids
+            if merge and keys == ('id',):
+                given = (rows['id'].notna() & (rows['id'] != '')).tolist()
+            else:
+                given = [False] * len(rows)
+            rows['id'] = [row_id if keep else str(uuid.uuid4()) for row_id, keep in zip(rows['id'], given)]
+            
+            result['error_count'] += len(errors)
+            for index in sorted(errors):
+                if len(result['errors']) < MAX_IMPORT_ERRORS:
+                    result['errors'].append({'row': index + 1, 'error': '; '.join(errors[index])})
+            
+            if merge:
+                merge_import_rows(c, kind, rows, keys, result, provided, blank)
+            else:
+                c.executemany(
+                    f'INSERT INTO {kind} ({columns}) VALUES ({placeholders})',
+                    rows.itertuples(index=False, name=None)
+                )
+                result['imported'] += len(rows)
+            if progress:
+                progress(result['imported'] + result['updated'] + result['unchanged'], result['error_count'])
+        if dry_run:
+            conn.rollback()
+        else:
+            sync_search_index(c)
+    return result
+
+# Rows per Parquet row group. Exports are sorted by date, so each group's
+# min/max statistics let readers skip groups outside a date filter.
+PARQUET_ROW_GROUP_SIZE = 10000
+PARQUET_SORT = {'employees': 'name', 'transactions': 'date', 'expenses': 'date'}
+
+def parquet_schema(table):
+    spec = IMPORT_SPECS[table]
+    return pa.schema([('id', pa.string())] + [
+        (column, pa.float64() if column in spec['numeric'] else pa.date32() if column in spec['dates'] else pa.string())
+        for column in spec['columns']
+    ])
 
+def export_table_parquet(table, row_group_size=PARQUET_ROW_GROUP_SIZE):
+    # Writes a table to Parquet with typed dates and amounts, one row group per
+    # fetched batch, and returns the file's bytes
+    schema = parquet_schema(table)
+    conn = get_db_connection()
+    c = conn.cursor()
+    c.execute(f"SELECT {', '.join(schema.names)} FROM {table} ORDER BY {PARQUET_SORT[table]}")
+    
+    sink = io.BytesIO()
+    with pq.ParquetWriter(sink, schema, compression='zstd') as writer:
+        while True:
+            rows = c.fetchmany(row_group_size)
+            if not rows:
+                break
+            arrays = []
+            for field, values in zip(schema, zip(*rows)):
+                if field.type == pa.date32():
+                    # Malformed legacy dates become nulls rather than failing the export
+                    parsed = pc.strptime(pa.array(values, pa.string()), format='%Y-%m-%d', unit='s', error_is_null=True)
+                    arrays.append(parsed.cast(pa.date32()))
+                else:
+                    arrays.append(pa.array(values, field.type, from_pandas=True))
+            writer.write_table(pa.Table.from_arrays(arrays, schema=schema))
+    return sink.getvalue()
+
+def read_parquet_chunks(source, table, start_date=None, end_date=None, chunk_size=IMPORT_CHUNK_SIZE):
+    # Reads a Parquet file as text chunks for bulk_import_chunks(). A date range
+    # is pushed down to the reader, which skips row groups outside it.
+    date_column = IMPORT_SPECS[table]['dates'][0]
+    filters = []
+    if start_date:
+        filters.append((date_column, '>=', pd.Timestamp(start_date).date()))
+    if end_date:
+        filters.append((date_column, '<=', pd.Timestamp(end_date).date()))
+    data = pq.read_table(source, filters=filters or None)
+    for batch in data.to_batches(max_chunksize=chunk_size):
+        df = batch.to_pandas()
+        yield df.astype(object).where(df.notna(), '').astype(str)
+
+class SettingsManager:
     def get_settings(self):
         conn = get_db_connection()
         c = conn.cursor()
         c.execute('SELECT * FROM settings WHERE id = "default"')
         row = c.fetchone()
-        conn.close()
         if row:
             return {
                 'id': row[0],
@@ -319,53 +990,47 @@ class SettingsManager:
         return None
 
     def update_settings(self, company_name, company_address, company_phone, company_email, currency):
-        conn = get_db_connection()
-        c = conn.cursor()
-        c.execute('''
-            UPDATE settings 
-            SET company_name = ?, company_address = ?, company_phone = ?, company_email = ?, currency = ?
-            WHERE id = "default"
-        ''', (company_name, company_address, company_phone, company_email, currency))
-        conn.commit()
-        conn.close()
+        with db_transaction() as conn:
+            c = conn.cursor()
+            c.execute('''
+                UPDATE settings 
+                SET company_name = ?, company_address = ?, company_phone = ?, company_email = ?, currency = ?
+                WHERE id = "default"
+            ''', (company_name, company_address, company_phone, company_email, currency))
 
 class EmployeeLedger:
-    def __init__(self):
-        init_database()
-    
     def add_employee(self, name, initial_balance=0, phone="", email="", department="", position="", join_date=None):
-        conn = get_db_connection()
-        c = conn.cursor()
         employee_id = str(uuid.uuid4())
         
         if join_date is None:
             join_date = datetime.now().strftime('%Y-%m-%d')
         
         try:
-            c.execute('''
-                INSERT INTO employees (id, name, initial_balance, phone, email, department, position, join_date)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (employee_id, name, initial_balance, phone, email, department, position, join_date))
-            
-            conn.commit()
+            with db_transaction() as conn:
+                c = conn.cursor()
+                c.execute('''
+                    INSERT INTO employees (id, name, initial_balance, phone, email, department, position, join_date)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (employee_id, name, initial_balance, phone, email, department, position, join_date))
             return employee_id
         except Exception as e:
             st.error(f"Error adding employee: {str(e)}")
             return None
-        finally:
-            conn.close()
     
     def get_employees(self, search_query=""):
         conn = get_db_connection()
         c = conn.cursor()
         
         try:
-            if search_query:
+            match = fts_query(search_query)
+            if match:
+                # Best matches first
                 c.execute('''
-                    SELECT * FROM employees 
-                    WHERE name LIKE ? OR department LIKE ? OR position LIKE ? OR email LIKE ?
-                    ORDER BY name
-                ''', (f'%{search_query}%', f'%{search_query}%', f'%{search_query}%', f'%{search_query}%'))
+                    SELECT employees.* FROM employees_fts
+                    JOIN employees ON employees.id = employees_fts.id
+                    WHERE employees_fts MATCH ?
+                    ORDER BY employees_fts.rank, employees.name
+                ''', (match,))
             else:
                 c.execute('SELECT * FROM employees ORDER BY name')
                 
@@ -389,8 +1054,6 @@ class EmployeeLedger:
         except Exception as e:
             st.error(f"Error fetching employees: {str(e)}")
             return []
-        finally:
-            conn.close()
     
     def get_employee(self, employee_id):
         conn = get_db_connection()
@@ -414,61 +1077,50 @@ class EmployeeLedger:
         except Exception as e:
             st.error(f"Error fetching employee: {str(e)}")
             return None
-        finally:
-            conn.close()
     
     def update_employee(self, employee_id, name, initial_balance, phone, email, department, position, join_date):
-        conn = get_db_connection()
-        c = conn.cursor()
         try:
-            c.execute('''
-                UPDATE employees 
-                SET name = ?, initial_balance = ?, phone = ?, email = ?, department = ?, position = ?, join_date = ?
-                WHERE id = ?
-            ''', (name, initial_balance, phone, email, department, position, join_date, employee_id))
-            conn.commit()
+            with db_transaction() as conn:
+                c = conn.cursor()
+                c.execute('''
+                    UPDATE employees 
+                    SET name = ?, initial_balance = ?, phone = ?, email = ?, department = ?, position = ?, join_date = ?
+                    WHERE id = ?
+                ''', (name, initial_balance, phone, email, department, position, join_date, employee_id))
             return True
         except Exception as e:
             st.error(f"Error updating employee: {str(e)}")
             return False
-        finally:
-            conn.close()
     
     def delete_employee(self, employee_id):
-        conn = get_db_connection()
-        c = conn.cursor()
         try:
-            # First delete related transactions
-            c.execute('DELETE FROM transactions WHERE employee_id = ?', (employee_id,))
-            # Then delete employee
-            c.execute('DELETE FROM employees WHERE id = ?', (employee_id,))
-            conn.commit()
+            with db_transaction() as conn:
+                c = conn.cursor()
+                # First delete related transactions
+                c.execute('DELETE FROM transactions WHERE employee_id = ?', (employee_id,))
+                # Then delete employee
+                c.execute('DELETE FROM employees WHERE id = ?', (employee_id,))
             return True
         except Exception as e:
             st.error(f"Error deleting employee: {str(e)}")
             return False
-        finally:
-            conn.close()
     
     def add_transaction(self, employee_id, transaction_type, amount, description, category="", date=None):
-        conn = get_db_connection()
-        c = conn.cursor()
         try:
-            transaction_id = str(uuid.uuid4())
-            if date is None:
-                date = datetime.now().strftime('%Y-%m-%d')
-                
-            c.execute('''
-                INSERT INTO transactions (id, employee_id, type, amount, description, category, date)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            ''', (transaction_id, employee_id, transaction_type, amount, description, category, date))
-            conn.commit()
+            with db_transaction() as conn:
+                c = conn.cursor()
+                transaction_id = str(uuid.uuid4())
+                if date is None:
+                    date = datetime.now().strftime('%Y-%m-%d')
+
+                c.execute('''
+                    INSERT INTO transactions (id, employee_id, type, amount, description, category, date)
+                    VALUES (?, ?, ?, ?, ?, ?, ?)
+                ''', (transaction_id, employee_id, transaction_type, amount, description, category, date))
             return transaction_id
         except Exception as e:
             st.error(f"Error adding transaction: {str(e)}")
             return None
-        finally:
-            conn.close()
     
     def get_employee_transactions(self, employee_id, start_date=None, end_date=None):
         conn = get_db_connection()
@@ -504,8 +1156,6 @@ class EmployeeLedger:
         except Exception as e:
             st.error(f"Error fetching transactions: {str(e)}")
             return []
-        finally:
-            conn.close()
     
     def get_transaction(self, transaction_id):
         conn = get_db_connection()
@@ -528,38 +1178,30 @@ class EmployeeLedger:
         except Exception as e:
             st.error(f"Error fetching transaction: {str(e)}")
             return None
-        finally:
-            conn.close()
     
     def update_transaction(self, transaction_id, employee_id, transaction_type, amount, description, category, date):
-        conn = get_db_connection()
-        c = conn.cursor()
         try:
-            c.execute('''
-                UPDATE transactions 
-                SET employee_id = ?, type = ?, amount = ?, description = ?, category = ?, date = ?
-                WHERE id = ?
-            ''', (employee_id, transaction_type, amount, description, category, date, transaction_id))
-            conn.commit()
+            with db_transaction() as conn:
+                c = conn.cursor()
+                c.execute('''
+                    UPDATE transactions 
+                    SET employee_id = ?, type = ?, amount = ?, description = ?, category = ?, date = ?
+                    WHERE id = ?
+                ''', (employee_id, transaction_type, amount, description, category, date, transaction_id))
             return True
         except Exception as e:
             st.error(f"Error updating transaction: {str(e)}")
             return False
-        finally:
-            conn.close()
     
     def delete_transaction(self, transaction_id):
-        conn = get_db_connection()
-        c = conn.cursor()
         try:
-            c.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
-            conn.commit()
+            with db_transaction() as conn:
+                c = conn.cursor()
+                c.execute('DELETE FROM transactions WHERE id = ?', (transaction_id,))
             return True
         except Exception as e:
             st.error(f"Error deleting transaction: {str(e)}")
             return False
-        finally:
-            conn.close()
     
     def get_employee_balance(self, employee_id):
         conn = get_db_connection()
@@ -589,31 +1231,59 @@ class EmployeeLedger:
         except Exception as e:
             st.error(f"Error calculating balance: {str(e)}")
             return 0
-        finally:
-            conn.close()
+    
+    def get_all_employee_balances(self):
+        conn = get_db_connection()
+        c = conn.cursor()
+        
+        try:
+            # One grouped pass over transactions joined to employees: {employee_id: balance}
+            c.execute('''
+                SELECT e.id,
+                       COALESCE(e.initial_balance, 0) + COALESCE(t.expenses, 0) - COALESCE(t.payments, 0)
+                FROM employees e
+                LEFT JOIN (
+                    SELECT employee_id,
+                           SUM(CASE WHEN type = 'expense' THEN amount ELSE 0 END) AS expenses,
+                           SUM(CASE WHEN type = 'payment' THEN amount ELSE 0 END) AS payments
+                    FROM transactions
+                    GROUP BY employee_id
+                ) t ON t.employee_id = e.id
+            ''')
+            return dict(c.fetchall())
+        except Exception as e:
+            st.error(f"Error calculating balances: {str(e)}")
+            return {}
     
     def get_employee_summary(self, employee_id, start_date=None, end_date=None):
         try:
-            transactions = self.get_employee_transactions(employee_id, start_date, end_date)
-            
-            total_expenses = sum(t['amount'] for t in transactions if t['type'] == 'expense')
-            total_payments = sum(t['amount'] for t in transactions if t['type'] == 'payment')
-            
-            # Get initial balance for the employee
             conn = get_db_connection()
             c = conn.cursor()
-            c.execute('SELECT initial_balance FROM employees WHERE id = ?', (employee_id,))
-            result = c.fetchone()
-            initial_balance = result[0] if result else 0
-            conn.close()
             
-            balance = initial_balance + total_expenses - total_payments
+            date_filter = ''
+            params = []
+            if start_date and end_date:
+                date_filter = ' AND t.date BETWEEN ? AND ?'
+                params.extend([start_date, end_date])
+            params.append(employee_id)
+            
+            c.execute(f'''
+                SELECT COALESCE(SUM(CASE WHEN t.type = 'expense' THEN t.amount END), 0),
+                       COALESCE(SUM(CASE WHEN t.type = 'payment' THEN t.amount END), 0),
+                       COUNT(t.id),
+                       COALESCE(e.initial_balance, 0)
+                FROM employees e
+                LEFT JOIN transactions t ON t.employee_id = e.id{date_filter}
+                WHERE e.id = ?
+                GROUP BY e.id
+            ''', params)
+            total_expenses, total_payments, transaction_count, initial_balance = c.fetchone() or (0, 0, 0, 0)
             
             return {
                 'total_expenses': total_expenses,
                 'total_payments': total_payments,
-                'balance': balance,
-                'transaction_count': len(transactions)
+                'balance': initial_balance + total_expenses - total_payments,
+                'transaction_count': transaction_count
             }
         except Exception as e:
             st.error(f"Error getting employee summary: {str(e)}")
@@ -624,87 +1294,108 @@ class EmployeeLedger:
                 'transaction_count': 0
             }
     
+    def summarize_transactions(self, group_by=(), start_date=None, end_date=None, **filters):
+        try:
+            return summarize_table('transactions', TRANSACTION_DIMENSIONS, group_by, start_date, end_date, filters)
+        except Exception as e:
+            st.error(f"Error summarizing transactions: {str(e)}")
+            return []
+    
+    def _transaction_filters(self, search_query=""):
+        match = fts_query(search_query)
+        if not match:
+            return [], []
+        return [
+            '(t.id IN (SELECT id FROM transactions_fts WHERE transactions_fts MATCH ?)'
+            ' OR t.employee_id IN (SELECT id FROM employees_fts WHERE employees_fts MATCH ?))'
+        ], [match, fts_query(search_query, 'name')]
+    
     def get_transactions(self, search_query=""):
         conn = get_db_connection()
         c = conn.cursor()
         
         try:
-            if search_query:
-                c.execute('''
-                    SELECT t.*, e.name as employee_name 
-                    FROM transactions t 
-                    LEFT JOIN employees e ON t.employee_id = e.id 
-                    WHERE t.description LIKE ? OR e.name LIKE ? OR t.category LIKE ?
-                    ORDER BY t.date DESC
-                ''', (f'%{search_query}%', f'%{search_query}%', f'%{search_query}%'))
-            else:
-                c.execute('''
-                    SELECT t.*, e.name as employee_name 
-                    FROM transactions t 
-                    LEFT JOIN employees e ON t.employee_id = e.id 
-                    ORDER BY t.date DESC
-                ''')
-                
-            rows = c.fetchall()
-            transactions = []
-            
-            for row in rows:
-                if len(row) >= 8:
-                    transaction = {
-                        'id': row[0],
-                        'employee_id': row[1],
-                        'type': row[2],
-                        'amount': row[3],
-                        'description': row[4],
-                        'category': row[5],
-                        'date': row[6],
-                        'employee_name': row[7]
-                    }
-                else:
-                    transaction = {
-                        'id': row[0],
-                        'employee_id': row[1],
-                        'type': row[2],
-                        'amount': row[3],
-                        'description': row[4],
-                        'category': "",
-                        'date': row[5] if len(row) > 5 else row[4],
-                        'employee_name': "Unknown"
-                    }
-                transactions.append(transaction)
+            conditions, params = self._transaction_filters(search_query)
+            query = '''
+                SELECT t.*, e.name as employee_name 
+                FROM transactions t 
+                LEFT JOIN employees e ON t.employee_id = e.id 
+            '''
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            query += ' ORDER BY t.date DESC'
             
-            return transactions
+            c.execute(query, params)
+            return [transaction_from_row(row) for row in c.fetchall()]
         except Exception as e:
             st.error(f"Error fetching transactions: {str(e)}")
             return []
-        finally:
-            conn.close()
-
-class ExpenseTracker:
-    def __init__(self):
-        init_database()
     
-    def add_expense(self, expense_type, description, amount, category="", employee_name=None, date=None, status="Pending"):
+    def get_transactions_page(self, search_query="", cursor=None, page_size=PAGE_SIZE):
         conn = get_db_connection()
         c = conn.cursor()
+        
         try:
-            expense_id = str(uuid.uuid4())
-            
-            if date is None:
-                date = datetime.now().strftime('%Y-%m-%d')
-            
-            c.execute('''
-                INSERT INTO expenses (id, type, description, amount, category, employee_name, date, status)
-                VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-            ''', (expense_id, expense_type, description, amount, category, employee_name, date, status))
-            
-            conn.commit()
+            conditions, params = self._transaction_filters(search_query)
+            return keyset_page(c, '''
+                SELECT t.*, e.name as employee_name 
+                FROM transactions t 
+                LEFT JOIN employees e ON t.employee_id = e.id 
+            ''', conditions, params, cursor, page_size, transaction_from_row, prefix='t.')
+        except Exception as e:
+            st.error(f"Error fetching transactions: {str(e)}")
+            return [], None
+    
+    def count_transactions(self, search_query=""):
+        conn = get_db_connection()
+        c = conn.cursor()
+        
+        try:
+            conditions, params = self._transaction_filters(search_query)
+            query = 'SELECT COUNT(*) FROM transactions t'
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            c.execute(query, params)
+            return c.fetchone()[0]
+        except Exception as e:
+            st.error(f"Error counting transactions: {str(e)}")
+            return 0
+
+class ExpenseTracker:
+    def add_expense(self, expense_type, description, amount, category="", employee_name=None, date=None, status="Pending"):
+        try:
+            with db_transaction() as conn:
+                c = conn.cursor()
+                expense_id = str(uuid.uuid4())
+
+                if date is None:
+                    date = datetime.now().strftime('%Y-%m-%d')
+
+                c.execute('''
+                    INSERT INTO expenses (id, type, description, amount, category, employee_name, date, status)
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (expense_id, expense_type, description, amount, category, employee_name, date, status))
             return expense_id
         except Exception as e:
             st.error(f"Error adding expense: {str(e)}")
             return None
-        finally:
-            conn.close()
+    
+    def _expense_filters(self, expense_type=None, start_date=None, end_date=None, search_query=""):
+        conditions = []
+        params = []
+        if expense_type:
+            conditions.append('type = ?')
+            params.append(expense_type)
+        
+        if start_date and end_date:
+            conditions.append('date BETWEEN ? AND ?')
+            params.extend([start_date, end_date])
+        
+        match = fts_query(search_query)
+        if match:
+            conditions.append('id IN (SELECT id FROM expenses_fts WHERE expenses_fts MATCH ?)')
+            params.append(match)
+        return conditions, params
     
     def get_expenses(self, expense_type=None, start_date=None, end_date=None, search_query=""):
         conn = get_db_connection()
@@ -712,62 +1403,44 @@ class ExpenseTracker:
         
         try:
             query = 'SELECT * FROM expenses'
-            params = []
-            
-            conditions = []
-            if expense_type:
-                conditions.append('type = ?')
-                params.append(expense_type)
-            
-            if start_date and end_date:
-                conditions.append('date BETWEEN ? AND ?')
-                params.extend([start_date, end_date])
-            
-            if search_query:
-                conditions.append('(description LIKE ? OR category LIKE ? OR employee_name LIKE ?)')
-                params.extend([f'%{search_query}%', f'%{search_query}%', f'%{search_query}%'])
-            
+            conditions, params = self._expense_filters(expense_type, start_date, end_date, search_query)
             if conditions:
                 query += ' WHERE ' + ' AND '.join(conditions)
             
             query += ' ORDER BY date DESC'
             
             c.execute(query, params)
-            rows = c.fetchall()
-            expenses = []
-            
-            for row in rows:
-                if len(row) >= 8:
-                    expense = {
-                        'id': row[0],
-                        'type': row[1],
-                        'description': row[2],
-                        'amount': row[3],
-                        'category': row[4],
-                        'employee_name': row[5],
-                        'date': row[6],
-                        'status': row[7]
-                    }
-                else:
-                    # Handle older schema without status column
-                    expense = {
-                        'id': row[0],
-                        'type': row[1],
-                        'description': row[2],
-                        'amount': row[3],
-                        'category': row[4] if len(row) > 4 else "",
-                        'employee_name': row[5] if len(row) > 5 else "",
-                        'date': row[6] if len(row) > 6 else row[5],
-                        'status': 'Pending'
-                    }
-                expenses.append(expense)
-            
-            return expenses
+            return [expense_from_row(row) for row in c.fetchall()]
         except Exception as e:
             st.error(f"Error fetching expenses: {str(e)}")
             return []
-        finally:
-            conn.close()
+    
+    def get_expenses_page(self, expense_type=None, start_date=None, end_date=None, search_query="",
+                          cursor=None, page_size=PAGE_SIZE):
+        conn = get_db_connection()
+        c = conn.cursor()
+        
+        try:
+            conditions, params = self._expense_filters(expense_type, start_date, end_date, search_query)
+            return keyset_page(c, 'SELECT * FROM expenses', conditions, params, cursor, page_size, expense_from_row)
+        except Exception as e:
+            st.error(f"Error fetching expenses: {str(e)}")
+            return [], None
+    
+    def count_expenses(self, expense_type=None, start_date=None, end_date=None, search_query=""):
+        conn = get_db_connection()
+        c = conn.cursor()
+        
+        try:
+            conditions, params = self._expense_filters(expense_type, start_date, end_date, search_query)
+            query = 'SELECT COUNT(*) FROM expenses'
+            if conditions:
+                query += ' WHERE ' + ' AND '.join(conditions)
+            c.execute(query, params)
+            return c.fetchone()[0]
+        except Exception as e:
+            st.error(f"Error counting expenses: {str(e)}")
+            return 0
     
     def get_expense(self, expense_id):
         conn = get_db_connection()
@@ -803,52 +1476,42 @@ class ExpenseTracker:
         except Exception as e:
             st.error(f"Error fetching expense: {str(e)}")
             return None
-        finally:
-            conn.close()
     
     def update_expense(self, expense_id, expense_type, description, amount, category, employee_name, date, status):
-        conn = get_db_connection()
-        c = conn.cursor()
         try:
-            c.execute('''
-                UPDATE expenses 
-                SET type = ?, description = ?, amount = ?, category = ?, employee_name = ?, date = ?, status = ?
-                WHERE id = ?
-            ''', (expense_type, description, amount, category, employee_name, date, status, expense_id))
-            conn.commit()
+            with db_transaction() as conn:
+                c = conn.cursor()
+                c.execute('''
+                    UPDATE expenses 
+                    SET type = ?, description = ?, amount = ?, category = ?, employee_name = ?, date = ?, status = ?
+                    WHERE id = ?
+                ''', (expense_type, description, amount, category, employee_name, date, status, expense_id))
             return True
         except Exception as e:
             st.error(f"Error updating expense: {str(e)}")
             return False
-        finally:
-            conn.close()
     
     def delete_expense(self, expense_id):
-        conn = get_db_connection()
-        c = conn.cursor()
         try:
-            c.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
-            conn.commit()
+            with db_transaction() as conn:
+                c = conn.cursor()
+                c.execute('DELETE FROM expenses WHERE id = ?', (expense_id,))
             return True
         except Exception as e:
             st.error(f"Error deleting expense: {str(e)}")
             return False
-        finally:
-            conn.close()
     
     def get_summary(self, start_date=None, end_date=None):
         try:
-            expenses = self.get_expenses(start_date=start_date, end_date=end_date)
-            
-            company_total = sum(e['amount'] for e in expenses if e['type'] == 'company')
-            employee_total = sum(e['amount'] for e in expenses if e['type'] == 'employee')
-            grand_total = company_total + employee_total
+            totals = {row['type']: row for row in self.summarize(('type',), start_date, end_date)}
+            company_total = totals['company']['total'] if 'company' in totals else 0
+            employee_total = totals['employee']['total'] if 'employee' in totals else 0
             
             return {
                 'company_total': company_total,
                 'employee_total': employee_total,
-                'grand_total': grand_total,
-                'expense_count': len(expenses)
+                'grand_total': company_total + employee_total,
+                'expense_count': sum(row['count'] for row in totals.values())
             }
         except Exception as e:
             st.error(f"Error getting expense summary: {str(e)}")
@@ -858,508 +1521,403 @@ class ExpenseTracker:
                 'grand_total': 0,
                 'expense_count': 0
             }
+    
+    def get_monthly_trend(self):
+        conn = get_db_connection()
+        c = conn.cursor()
+        try:
+            # Reads the pre-aggregated rollup, a handful of rows per month
+            c.execute('''
+                SELECT month, type, SUM(total)
+                FROM expense_monthly_rollup
+                GROUP BY month, type
+                ORDER BY month, type
+            ''')
+            return [{'date': month, 'type': expense_type, 'amount': total}
+                    for month, expense_type, total in c.fetchall()]
+        except Exception as e:
+            st.error(f"Error fetching monthly trend: {str(e)}")
+            return []
+    
+    def summarize(self, group_by=(), start_date=None, end_date=None, **filters):
+        try:
+            return summarize_table('expenses', EXPENSE_DIMENSIONS, group_by, start_date, end_date, filters)
+        except Exception as e:
+            st.error(f"Error summarizing expenses: {str(e)}")
+            return []
+
+# Text colors shared by the PDF reports
+EXPENSE_COLOR = (255, 0, 0)
+PAYMENT_COLOR = (0, 128, 0)
+
+def balance_color(balance):
+    # Red when the employee owes, green for an advance
+    if balance > 0:
+        return EXPENSE_COLOR
+    if balance < 0:
+        return PAYMENT_COLOR
+    return None
+
+# PDF reports are templates laid out by the shared report engine; sizes are in millimetres
+REPORT_THEME = Theme(
+    'expense',
+    text={
+        'company': {'bold': True, 'size': 20, 'leading': 10, 'align': 'C'},
+        'title': {'bold': True, 'size': 16, 'leading': 10, 'align': 'C'},
+        'period': {'italic': True, 'size': 12, 'leading': 10, 'align': 'C'},
+        'heading': {'bold': True, 'size': 14, 'leading': 10},
+        'subheading': {'bold': True, 'size': 12, 'leading': 10},
+        'body': {'size': 12, 'leading': 8},
+        'line': {'size': 12, 'leading': 10},
+        'footer': {'italic': True, 'size': 8, 'leading': 10, 'align': 'C'},
+        'contact': {'italic': True, 'size': 8, 'leading': 5, 'align': 'C'},
+    },
+    tables={
+        'default': {'header_fill': '#4F81BD', 'header_size': 12, 'size': 10, 'header_height': 10, 'row_height': 8,
+                    'stripes': ['#F0F0F0', '#FFFFFF'], 'grid': 1},
+        'dense': {'header_fill': '#4F81BD', 'header_size': 12, 'size': 8, 'header_height': 10, 'row_height': 8,
+                  'stripes': ['#F0F0F0', '#FFFFFF'], 'grid': 1},
+        'summary': {'header_fill': '#4F81BD', 'header_size': 10, 'size': 9, 'header_height': 8, 'row_height': 6,
+                    'stripes': ['#F0F0F0', '#FFFFFF'], 'grid': 1},
+        'summary_dense': {'header_fill': '#4F81BD', 'header_size': 10, 'size': 8, 'header_height': 8, 'row_height': 6,
+                          'stripes': ['#F0F0F0', '#FFFFFF'], 'grid': 1},
+    }
+)
 
 class PDFGenerator:
     def __init__(self):
         self.settings_manager = SettingsManager()
         self.settings = self.settings_manager.get_settings()
 
-    def generate_employee_ledger_pdf(self, employee_name, transactions, summary, start_date=None, end_date=None):
+    def _heading(self, title):
+        return [Text(self.settings['company_name'], 'company'), Text(title, 'title')]
+
+    def _period(self, start_date, end_date):
+        period_text = f"Period: {start_date} to {end_date}" if start_date and end_date else "All Time Period"
+        return Text(period_text, 'period')
+
+    def _report(self, blocks):
+        # Every report ends with the company footer
+        blocks += [
+            Spacer(15),
+            Text(f'Generated by {self.settings["company_name"]} Business Management System', 'footer'),
+            Text(f'Contact: {self.settings["company_phone"]} | Email: {self.settings["company_email"]}', 'contact')
+        ]
+        return Report(blocks)
+
+    def _balance_text(self, balance):
+        balance_text = f"{self.settings['currency']} {abs(balance):.2f}"
+        if balance > 0:
+            balance_text += " (Due)"
+        elif balance < 0:
+            balance_text += " (Advance)"
+        return balance_text
+
+    def _balance_line(self, label, balance):
+        # Red for due, green for advance
+        balance_status = '(Due)' if balance > 0 else '(Advance)' if balance < 0 else ''
+        return Text(f'{label}: {self.settings["currency"]} {abs(balance):.2f} {balance_status}', 'body',
+                    EXPENSE_COLOR if balance > 0 else PAYMENT_COLOR)
+
+    def employee_ledger_report(self, employee_name, transactions, summary, start_date=None, end_date=None):
         if not FPDF_AVAILABLE:
-            st.error("PDF generation is not available. Please install fpdf.")
-            return None
-            
-        try:
-            pdf = FPDF()
-            pdf.add_page()
-
-            # Header with company name from settings
-            pdf.set_font('Arial', 'B', 20)
-            pdf.cell(0, 10, self.settings['company_name'], 0, 1, 'C')
-            pdf.set_font('Arial', 'B', 16)
-            pdf.cell(0, 10, 'Employee Ledger Report', 0, 1, 'C')
-            pdf.ln(5)
-
-            # Report period
-            pdf.set_font('Arial', 'I', 12)
-            period_text = f"Period: {start_date} to {end_date}" if start_date and end_date else "All Time Period"
-            pdf.cell(0, 10, period_text, 0, 1, 'C')
-            pdf.ln(10)
+            raise RuntimeError("PDF generation is not available. Please install fpdf.")
+
+        blocks = self._heading('Employee Ledger Report') + [
+            Spacer(5),
+            self._period(start_date, end_date),
+            Spacer(10),
 
             # Employee information
-            pdf.set_font('Arial', 'B', 14)
-            pdf.cell(0, 10, f'Employee: {employee_name}', 0, 1)
-            pdf.set_font('Arial', '', 12)
-            pdf.cell(0, 10, f'Report Date: {datetime.now().strftime("%Y-%m-%d %H:%M")}', 0, 1)
-            pdf.ln(5)
+            Text(f'Employee: {employee_name}', 'heading'),
+            Text(f'Data as of: {database_as_of().strftime("%Y-%m-%d %H:%M")}', 'line'),
+            Spacer(5),
 
             # Summary
-            pdf.set_font('Arial', 'B', 12)
-            pdf.cell(0, 10, 'Summary:', 0, 1)
-            pdf.set_font('Arial', '', 12)
-            pdf.cell(0, 8, f'Total Expenses: {self.settings["currency"]} {summary["total_expenses"]:.2f}', 0, 1)
-            pdf.cell(0, 8, f'Total Payments: {self.settings["currency"]} {summary["total_payments"]:.2f}', 0, 1)
-
-            # Balance with color
-            balance_status = '(Due)' if summary['balance'] > 0 else '(Advance)' if summary['balance'] < 0 else ''
-            if summary['balance'] > 0:
-                pdf.set_text_color(255, 0, 0)  # Red for due
-            else:
-                pdf.set_text_color(0, 128, 0)  # Green for advance
-                
-            pdf.cell(0, 8, f'Balance: {self.settings["currency"]} {abs(summary["balance"]):.2f} {balance_status}', 0, 1)
-            pdf.set_text_color(0, 0, 0)  # Reset to black
-            pdf.ln(10)
-
-            # Transactions table
-            if transactions:
-                pdf.set_font('Arial', 'B', 12)
-                pdf.cell(0, 10, 'Transaction History:', 0, 1)
-
-                # Table header
-                pdf.set_fill_color(79, 129, 189)
-                pdf.set_text_color(255, 255, 255)
-                pdf.cell(40, 10, 'Date', 1, 0, 'C', True)
-                pdf.cell(30, 10, 'Type', 1, 0, 'C', True)
-                pdf.cell(70, 10, 'Description', 1, 0, 'C', True)
-                pdf.cell(30, 10, 'Amount', 1, 1, 'C', True)
-
-                pdf.set_text_color(0, 0, 0)
-                pdf.set_font('Arial', '', 10)
-                for t in transactions:
-                    # Alternate row colors
-                    if transactions.index(t) % 2 == 0:
-                        pdf.set_fill_color(240, 240, 240)
-                    else:
-                        pdf.set_fill_color(255, 255, 255)
-
-                    pdf.cell(40, 8, t['date'], 1, 0, 'C', True)
-                    pdf.cell(30, 8, t['type'].title(), 1, 0, 'C', True)
-                    pdf.cell(70, 8, t['description'][:40], 1, 0, 'C', True)
-
-                    # Color code amounts
-                    if t['type'] == 'expense':
-                        pdf.set_text_color(255, 0, 0)
-                    else:
-                        pdf.set_text_color(0, 128, 0)
-                    pdf.cell(30, 8, f"{self.settings['currency']} {t['amount']:.2f}", 1, 1, 'C', True)
-                    pdf.set_text_color(0, 0, 0)
-            else:
-                pdf.cell(0, 10, 'No transactions found for the selected period.', 0, 1)
-
-            # Footer with company info
-            pdf.ln(15)
-            pdf.set_font('Arial', 'I', 8)
-            pdf.cell(0, 10, f'Generated by {self.settings["company_name"]} Business Management System', 0, 1, 'C')
-            pdf.cell(0, 5, f'Contact: {self.settings["company_phone"]} | Email: {self.settings["company_email"]}', 0, 1, 'C')
+            Text('Summary:', 'subheading'),
+            Text(f'Total Expenses: {self.settings["currency"]} {summary["total_expenses"]:.2f}'),
+            Text(f'Total Payments: {self.settings["currency"]} {summary["total_payments"]:.2f}'),
+            self._balance_line('Balance', summary['balance']),
+            Spacer(10)
+        ]
+
+        # Transactions table
+        if transactions:
+            blocks += [
+                Text('Transaction History:', 'subheading'),
+                DataTable(
+                    [('Date', 40), ('Type', 30), ('Description', 70), ('Amount', 30)],
+                    (([t['date'], t['type'].title(), t['description'][:40],
+                       f"{self.settings['currency']} {t['amount']:.2f}"],
+                      # Color code amounts
+                      {3: EXPENSE_COLOR if t['type'] == 'expense' else PAYMENT_COLOR})
+                     for t in transactions)
+                )
+            ]
+        else:
+            blocks.append(Text('No transactions found for the selected period.', 'line'))
 
-            return pdf
-        except Exception as e:
-            st.error(f"Error generating PDF: {str(e)}")
-            return None
+        return self._report(blocks)
 
-    def generate_expense_report_pdf(self, expenses, report_type="All", employee_name=None, start_date=None, end_date=None):
+    def expense_report(self, expenses, report_type="All", employee_name=None, start_date=None, end_date=None):
         if not FPDF_AVAILABLE:
-            st.error("PDF generation is not available. Please install fpdf.")
-            return None
-            
-        try:
-            pdf = FPDF()
-            pdf.add_page()
-
-            # Header
-            pdf.set_font('Arial', 'B', 20)
-            pdf.cell(0, 10, self.settings['company_name'], 0, 1, 'C')
-            pdf.set_font('Arial', 'B', 16)
-
-            if report_type == "employee" and employee_name:
-                pdf.cell(0, 10, f'Expense Report - {employee_name}', 0, 1, 'C')
-            else:
-                pdf.cell(0, 10, f'{report_type.title()} Expense Report', 0, 1, 'C')
+            raise RuntimeError("PDF generation is not available. Please install fpdf.")
 
-            # Report period
-            pdf.set_font('Arial', 'I', 12)
-            period_text = f"Period: {start_date} to {end_date}" if start_date and end_date else "All Time Period"
-            pdf.cell(0, 10, period_text, 0, 1, 'C')
-            pdf.ln(5)
+        if report_type == "employee" and employee_name:
+            title = f'Expense Report - {employee_name}'
+        else:
+            title = f'{report_type.title()} Expense Report'
 
-            # Report details
-            pdf.set_font('Arial', '', 12)
-            pdf.cell(0, 8, f'Report Date: {datetime.now().strftime("%Y-%m-%d %H:%M")}', 0, 1)
-            pdf.ln(5)
+        total_amount = sum(e['amount'] for e in expenses)
+        blocks = self._heading(title) + [
+            self._period(start_date, end_date),
+            Spacer(5),
+            Text(f'Data as of: {database_as_of().strftime("%Y-%m-%d %H:%M")}'),
+            Spacer(5),
 
             # Summary
-            total_amount = sum(e['amount'] for e in expenses)
-            pdf.set_font('Arial', 'B', 14)
-            pdf.cell(0, 10, f'Total Amount: {self.settings["currency"]} {total_amount:.2f}', 0, 1)
-            pdf.ln(5)
+            Text(f'Total Amount: {self.settings["currency"]} {total_amount:.2f}', 'heading'),
+            Spacer(5)
+        ]
 
-            # Expenses table
-            if expenses:
-                pdf.set_font('Arial', 'B', 12)
-
-                # Table header
-                pdf.set_fill_color(79, 129, 189)
-                pdf.set_text_color(255, 255, 255)
-                pdf.cell(25, 10, 'Date', 1, 0, 'C', True)
-                pdf.cell(25, 10, 'Type', 1, 0, 'C', True)
-                pdf.cell(60, 10, 'Description', 1, 0, 'C', True)
-                pdf.cell(30, 10, 'Employee', 1, 0, 'C', True)
-                pdf.cell(30, 10, 'Amount', 1, 1, 'C', True)
-
-                pdf.set_text_color(0, 0, 0)
-                pdf.set_font('Arial', '', 10)
-                for idx, e in enumerate(expenses):
-                    # Alternate row colors
-                    if idx % 2 == 0:
-                        pdf.set_fill_color(240, 240, 240)
-                    else:
-                        pdf.set_fill_color(255, 255, 255)
-
-                    pdf.cell(25, 8, e['date'], 1, 0, 'C', True)
-                    pdf.cell(25, 8, e['type'].title(), 1, 0, 'C', True)
-                    pdf.cell(60, 8, e['description'][:35], 1, 0, 'C', True)
-                    pdf.cell(30, 8, e['employee_name'] or 'N/A', 1, 0, 'C', True)
-                    pdf.cell(30, 8, f"{self.settings['currency']} {e['amount']:.2f}", 1, 1, 'C', True)
-            else:
-                pdf.cell(0, 10, 'No expenses found for the selected period.', 0, 1)
-
-            # Footer with company info
-            pdf.ln(15)
-            pdf.set_font('Arial', 'I', 8)
-            pdf.cell(0, 10, f'Generated by {self.settings["company_name"]} Business Management System', 0, 1, 'C')
-            pdf.cell(0, 5, f'Contact: {self.settings["company_phone"]} | Email: {self.settings["company_email"]}', 0, 1, 'C')
+        # Expenses table
+        if expenses:
+            blocks.append(DataTable(
+                [('Date', 25), ('Type', 25), ('Description', 60), ('Employee', 30), ('Amount', 30)],
+                (([e['date'], e['type'].title(), e['description'][:35], e['employee_name'] or 'N/A',
+                   f"{self.settings['currency']} {e['amount']:.2f}"], None)
+                 for e in expenses)
+            ))
+        else:
+            blocks.append(Text('No expenses found for the selected period.', 'line'))
 
-            return pdf
-        except Exception as e:
-            st.error(f"Error generating PDF: {str(e)}")
-            return None
+        return self._report(blocks)
 
-    def generate_employee_list_pdf(self, employees, ledger):
+    def employee_list_report(self, employees, ledger):
         if not FPDF_AVAILABLE:
-            st.error("PDF generation is not available. Please install fpdf.")
-            return None
-            
-        try:
-            pdf = FPDF()
-            pdf.add_page()
-
-            # Header
-            pdf.set_font('Arial', 'B', 20)
-            pdf.cell(0, 10, self.settings['company_name'], 0, 1, 'C')
-            pdf.set_font('Arial', 'B', 16)
-            pdf.cell(0, 10, 'Employee List Report', 0, 1, 'C')
-            pdf.ln(5)
-
-            # Report details
-            pdf.set_font('Arial', '', 12)
-            pdf.cell(0, 8, f'Report Date: {datetime.now().strftime("%Y-%m-%d %H:%M")}', 0, 1)
-            pdf.cell(0, 8, f'Total Employees: {len(employees)}', 0, 1)
-            pdf.ln(5)
-
-            # Employee table
-            if employees:
-                pdf.set_font('Arial', 'B', 12)
+            raise RuntimeError("PDF generation is not available. Please install fpdf.")
 
-                # Table header
-                pdf.set_fill_color(79, 129, 189)
-                pdf.set_text_color(255, 255, 255)
-                pdf.cell(60, 10, 'Employee Name', 1, 0, 'C', True)
-                pdf.cell(40, 10, 'Initial Balance', 1, 0, 'C', True)
-                pdf.cell(40, 10, 'Current Balance', 1, 1, 'C', True)
+        blocks = self._heading('Employee List Report') + [
+            Spacer(5),
+            Text(f'Data as of: {database_as_of().strftime("%Y-%m-%d %H:%M")}'),
+            Text(f'Total Employees: {len(employees)}'),
+            Spacer(5)
+        ]
 
-                pdf.set_text_color(0, 0, 0)
-                pdf.set_font('Arial', '', 10)
-                for emp in employees:
-                    # Alternate row colors
-                    if employees.index(emp) % 2 == 0:
-                        pdf.set_fill_color(240, 240, 240)
-                    else:
-                        pdf.set_fill_color(255, 255, 255)
-
-                    balance = ledger.get_employee_balance(emp['id'])
-                    
-                    pdf.cell(60, 8, emp['name'], 1, 0, 'C', True)
-                    pdf.cell(40, 8, f"{self.settings['currency']} {emp['initial_balance']:.2f}", 1, 0, 'C', True)
-                    
-                    # Color code current balance
-                    if balance > 0:
-                        pdf.set_text_color(255, 0, 0)
-                    elif balance < 0:
-                        pdf.set_text_color(0, 128, 0)
-                    else:
-                        pdf.set_text_color(0, 0, 0)
-                    
-                    balance_text = f"{self.settings['currency']} {abs(balance):.2f}"
-                    if balance > 0:
-                        balance_text += " (Due)"
-                    elif balance < 0:
-                        balance_text += " (Advance)"
-                    
-                    pdf.cell(40, 8, balance_text, 1, 1, 'C', True)
-                    pdf.set_text_color(0, 0, 0)
-            else:
-                pdf.cell(0, 10, 'No employees found.', 0, 1)
+        # Employee table
+        if employees:
+            balances = ledger.get_all_employee_balances()
+            blocks.append(DataTable(
+                [('Employee Name', 60), ('Initial Balance', 40), ('Current Balance', 40)],
+                (([emp['name'], f"{self.settings['currency']} {emp['initial_balance']:.2f}",
+                   self._balance_text(balances.get(emp['id'], 0))],
+                  # Color code current balance
+                  {2: balance_color(balances.get(emp['id'], 0))})
+                 for emp in employees)
+            ))
+        else:
+            blocks.append(Text('No employees found.', 'line'))
 
-            # Footer with company info
-            pdf.ln(15)
-            pdf.set_font('Arial', 'I', 8)
-            pdf.cell(0, 10, f'Generated by {self.settings["company_name"]} Business Management System', 0, 1, 'C')
-            pdf.cell(0, 5, f'Contact: {self.settings["company_phone"]} | Email: {self.settings["company_email"]}', 0, 1, 'C')
+        return self._report(blocks)
 
-            return pdf
-        except Exception as e:
-            st.error(f"Error generating PDF: {str(e)}")
-            return None
-
-    def generate_comprehensive_report_pdf(self, ledger, expense_tracker, start_date=None, end_date=None):
+    def comprehensive_report(self, ledger, expense_tracker, start_date=None, end_date=None):
         if not FPDF_AVAILABLE:
-            st.error("PDF generation is not available. Please install fpdf.")
-            return None
-            
-        try:
-            pdf = FPDF()
-            pdf.add_page()
-
-            # Header
-            pdf.set_font('Arial', 'B', 20)
-            pdf.cell(0, 10, self.settings['company_name'], 0, 1, 'C')
-            pdf.set_font('Arial', 'B', 16)
-            pdf.cell(0, 10, 'Comprehensive Business Report', 0, 1, 'C')
-            pdf.ln(5)
-
-            # Report period
-            pdf.set_font('Arial', 'I', 12)
-            period_text = f"Period: {start_date} to {end_date}" if start_date and end_date else "All Time Period"
-            pdf.cell(0, 10, period_text, 0, 1, 'C')
-            pdf.ln(5)
-
-            # Report details
-            pdf.set_font('Arial', '', 12)
-            pdf.cell(0, 8, f'Report Date: {datetime.now().strftime("%Y-%m-%d %H:%M")}', 0, 1)
-            pdf.ln(10)
-
-            # Get data
-            employees = ledger.get_employees()
-            expenses = expense_tracker.get_expenses(start_date=start_date, end_date=end_date)
-            expense_summary = expense_tracker.get_summary(start_date, end_date)
-
-            # Summary section
-            pdf.set_font('Arial', 'B', 14)
-            pdf.cell(0, 10, 'Business Summary', 0, 1)
-            pdf.set_font('Arial', '', 12)
-            pdf.cell(0, 8, f'Total Employees: {len(employees)}', 0, 1)
-            pdf.cell(0, 8, f'Total Expenses Recorded: {len(expenses)}', 0, 1)
-            pdf.cell(0, 8, f'Company Expenses: {self.settings["currency"]} {expense_summary["company_total"]:.2f}', 0, 1)
-            pdf.cell(0, 8, f'Employee Expenses: {self.settings["currency"]} {expense_summary["employee_total"]:.2f}', 0, 1)
-            pdf.cell(0, 8, f'Grand Total Expenses: {self.settings["currency"]} {expense_summary["grand_total"]:.2f}', 0, 1)
-            pdf.ln(10)
-
-            # Employee summary
-            if employees:
-                pdf.set_font('Arial', 'B', 14)
-                pdf.cell(0, 10, 'Employee Summary', 0, 1)
-                pdf.set_font('Arial', 'B', 10)
-                
-                # Table header
-                pdf.set_fill_color(79, 129, 189)
-                pdf.set_text_color(255, 255, 255)
-                pdf.cell(60, 8, 'Employee', 1, 0, 'C', True)
-                pdf.cell(30, 8, 'Expenses', 1, 0, 'C', True)
-                pdf.cell(30, 8, 'Payments', 1, 0, 'C', True)
-                pdf.cell(40, 8, 'Balance', 1, 1, 'C', True)
-
-                pdf.set_text_color(0, 0, 0)
-                pdf.set_font('Arial', '', 9)
-                for emp in employees:
-                    # Alternate row colors
-                    if employees.index(emp) % 2 == 0:
-                        pdf.set_fill_color(240, 240, 240)
-                    else:
-                        pdf.set_fill_color(255, 255, 255)
+            raise RuntimeError("PDF generation is not available. Please install fpdf.")
 
-                    summary = ledger.get_employee_summary(emp['id'], start_date, end_date)
-                    
-                    pdf.cell(60, 6, emp['name'], 1, 0, 'C', True)
-                    pdf.cell(30, 6, f"{self.settings['currency']} {summary['total_expenses']:.2f}", 1, 0, 'C', True)
-                    pdf.cell(30, 6, f"{self.settings['currency']} {summary['total_payments']:.2f}", 1, 0, 'C', True)
-                    
-                    # Color code balance
-                    if summary['balance'] > 0:
-                        pdf.set_text_color(255, 0, 0)
-                    elif summary['balance'] < 0:
-                        pdf.set_text_color(0, 128, 0)
-                    
-                    balance_text = f"{self.settings['currency']} {abs(summary['balance']):.2f}"
-                    if summary['balance'] > 0:
-                        balance_text += " (Due)"
-                    elif summary['balance'] < 0:
-                        balance_text += " (Advance)"
-                    
-                    pdf.cell(40, 6, balance_text, 1, 1, 'C', True)
-                    pdf.set_text_color(0, 0, 0)
-                pdf.ln(10)
+        # Get data
+        employees = ledger.get_employees()
+        expenses = expense_tracker.get_expenses(start_date=start_date, end_date=end_date)
+        expense_summary = expense_tracker.get_summary(start_date, end_date)
 
-            # Expense summary
-            if expenses:
-                pdf.set_font('Arial', 'B', 14)
-                pdf.cell(0, 10, 'Recent Expenses', 0, 1)
-                pdf.set_font('Arial', 'B', 10)
-                
-                # Table header
-                pdf.set_fill_color(79, 129, 189)
-                pdf.set_text_color(255, 255, 255)
-                pdf.cell(25, 8, 'Date', 1, 0, 'C', True)
-                pdf.cell(25, 8, 'Type', 1, 0, 'C', True)
-                pdf.cell(80, 8, 'Description', 1, 0, 'C', True)
-                pdf.cell(30, 8, 'Amount', 1, 1, 'C', True)
-
-                pdf.set_text_color(0, 0, 0)
-                pdf.set_font('Arial', '', 8)
-                for idx, exp in enumerate(expenses[:15]):  # Show last 15 expenses
-                    if idx % 2 == 0:
-                        pdf.set_fill_color(240, 240, 240)
-                    else:
-                        pdf.set_fill_color(255, 255, 255)
+        blocks = self._heading('Comprehensive Business Report') + [
+            Spacer(5),
+            self._period(start_date, end_date),
+            Spacer(5),
+            Text(f'Data as of: {database_as_of().strftime("%Y-%m-%d %H:%M")}'),
+            Spacer(10),
 
-                    pdf.cell(25, 6, exp['date'], 1, 0, 'C', True)
-                    pdf.cell(25, 6, exp['type'].title(), 1, 0, 'C', True)
-                    pdf.cell(80, 6, exp['description'][:50], 1, 0, 'C', True)
-                    pdf.cell(30, 6, f"{self.settings['currency']} {exp['amount']:.2f}", 1, 1, 'C', True)
+            # Summary section
+            Text('Business Summary', 'heading'),
+            Text(f'Total Employees: {len(employees)}'),
+            Text(f'Total Expenses Recorded: {len(expenses)}'),
+            Text(f'Company Expenses: {self.settings["currency"]} {expense_summary["company_total"]:.2f}'),
+            Text(f'Employee Expenses: {self.settings["currency"]} {expense_summary["employee_total"]:.2f}'),
+            Text(f'Grand Total Expenses: {self.settings["currency"]} {expense_summary["grand_total"]:.2f}'),
+            Spacer(10)
+        ]
+
+        # Employee summary
+        if employees:
+            totals = {(row['employee'], row['type']): row['total']
+                      for row in ledger.summarize_transactions(('employee', 'type'), start_date, end_date)}
 
-            # Footer with company info
-            pdf.ln(15)
-            pdf.set_font('Arial', 'I', 8)
-            pdf.cell(0, 10, f'Generated by {self.settings["company_name"]} Business Management System', 0, 1, 'C')
-            pdf.cell(0, 5, f'Contact: {self.settings["company_phone"]} | Email: {self.settings["company_email"]}', 0, 1, 'C')
+            def employee_rows():
+                for emp in employees:
+                    expenses_total = totals.get((emp['id'], 'expense'), 0)
+                    payments_total = totals.get((emp['id'], 'payment'), 0)
+                    balance = (emp['initial_balance'] or 0) + expenses_total - payments_total
+                    yield ([emp['name'], f"{self.settings['currency']} {expenses_total:.2f}",
+                            f"{self.settings['currency']} {payments_total:.2f}", self._balance_text(balance)],
+                           # Color code balance
+                           {3: balance_color(balance)})
+
+            blocks += [
+                Text('Employee Summary', 'heading'),
+                DataTable([('Employee', 60), ('Expenses', 30), ('Payments', 30), ('Balance', 40)],
+                          employee_rows(), 'summary'),
+                Spacer(10)
+            ]
+
+        # Expense summary
+        if expenses:
+            blocks += [
+                Text('Recent Expenses', 'heading'),
+                DataTable(
+                    [('Date', 25), ('Type', 25), ('Description', 80), ('Amount', 30)],
+                    (([exp['date'], exp['type'].title(), exp['description'][:50],
+                       f"{self.settings['currency']} {exp['amount']:.2f}"], None)
+                     for exp in expenses[:15]),  # Show last 15 expenses
+                    'summary_dense'
+                )
+            ]
 
-            return pdf
-        except Exception as e:
-            st.error(f"Error generating PDF: {str(e)}")
-            return None
+        return self._report(blocks)
 
-    def generate_individual_employee_ledger_pdf(self, employee, ledger, start_date=None, end_date=None):
+    def individual_employee_ledger_report(self, employee, ledger, start_date=None, end_date=None):
         """Generate individual employee ledger PDF"""
         if not FPDF_AVAILABLE:
-            st.error("PDF generation is not available. Please install fpdf.")
-            return None
-            
-        try:
-            pdf = FPDF()
-            pdf.add_page()
-
-            # Header with company name from settings
-            pdf.set_font('Arial', 'B', 20)
-            pdf.cell(0, 10, self.settings['company_name'], 0, 1, 'C')
-            pdf.set_font('Arial', 'B', 16)
-            pdf.cell(0, 10, 'Individual Employee Ledger', 0, 1, 'C')
-            pdf.ln(5)
-
-            # Report period
-            pdf.set_font('Arial', 'I', 12)
-            period_text = f"Period: {start_date} to {end_date}" if start_date and end_date else "All Time Period"
-            pdf.cell(0, 10, period_text, 0, 1, 'C')
-            pdf.ln(10)
+            raise RuntimeError("PDF generation is not available. Please install fpdf.")
+
+        blocks = self._heading('Individual Employee Ledger') + [
+            Spacer(5),
+            self._period(start_date, end_date),
+            Spacer(10),
 
             # Employee information
-            pdf.set_font('Arial', 'B', 14)
-            pdf.cell(0, 10, f'Employee: {employee["name"]}', 0, 1)
-            pdf.set_font('Arial', '', 12)
-            
-            # Employee details
-            if employee.get('department'):
-                pdf.cell(0, 8, f'Department: {employee["department"]}', 0, 1)
-            if employee.get('position'):
-                pdf.cell(0, 8, f'Position: {employee["position"]}', 0, 1)
-            if employee.get('phone'):
-                pdf.cell(0, 8, f'Phone: {employee["phone"]}', 0, 1)
-            if employee.get('email'):
-                pdf.cell(0, 8, f'Email: {employee["email"]}', 0, 1)
-            if employee.get('join_date'):
-                pdf.cell(0, 8, f'Join Date: {employee["join_date"]}', 0, 1)
-                
-            pdf.cell(0, 8, f'Report Date: {datetime.now().strftime("%Y-%m-%d %H:%M")}', 0, 1)
-            pdf.ln(10)
+            Text(f'Employee: {employee["name"]}', 'heading')
+        ]
 
-            # Get transactions and summary
-            transactions = ledger.get_employee_transactions(employee['id'], start_date, end_date)
-            summary = ledger.get_employee_summary(employee['id'], start_date, end_date)
+        # Employee details
+        for field, label in (('department', 'Department'), ('position', 'Position'), ('phone', 'Phone'),
+                             ('email', 'Email'), ('join_date', 'Join Date')):
+            if employee.get(field):
+                blocks.append(Text(f'{label}: {employee[field]}'))
 
-            # Summary
-            pdf.set_font('Arial', 'B', 12)
-            pdf.cell(0, 10, 'Financial Summary:', 0, 1)
-            pdf.set_font('Arial', '', 12)
-            pdf.cell(0, 8, f'Initial Balance: {self.settings["currency"]} {employee["initial_balance"]:.2f}', 0, 1)
-            pdf.cell(0, 8, f'Total Expenses: {self.settings["currency"]} {summary["total_expenses"]:.2f}', 0, 1)
-            pdf.cell(0, 8, f'Total Payments: {self.settings["currency"]} {summary["total_payments"]:.2f}', 0, 1)
-
-            # Balance with color
-            balance_status = '(Due)' if summary['balance'] > 0 else '(Advance)' if summary['balance'] < 0 else ''
-            if summary['balance'] > 0:
-                pdf.set_text_color(255, 0, 0)  # Red for due
-            else:
-                pdf.set_text_color(0, 128, 0)  # Green for advance
-                
-            pdf.cell(0, 8, f'Current Balance: {self.settings["currency"]} {abs(summary["balance"]):.2f} {balance_status}', 0, 1)
-            pdf.set_text_color(0, 0, 0)  # Reset to black
-            pdf.ln(10)
+        # Get transactions and summary
+        transactions = ledger.get_employee_transactions(employee['id'], start_date, end_date)
+        summary = ledger.get_employee_summary(employee['id'], start_date, end_date)
 
-            # Transactions table
-            if transactions:
-                pdf.set_font('Arial', 'B', 12)
-                pdf.cell(0, 10, 'Transaction History:', 0, 1)
-
-                # Table header
-                pdf.set_fill_color(79, 129, 189)
-                pdf.set_text_color(255, 255, 255)
-                pdf.cell(25, 10, 'Date', 1, 0, 'C', True)
-                pdf.cell(25, 10, 'Type', 1, 0, 'C', True)
-                pdf.cell(80, 10, 'Description', 1, 0, 'C', True)
-                pdf.cell(20, 10, 'Category', 1, 0, 'C', True)
-                pdf.cell(30, 10, 'Amount', 1, 1, 'C', True)
-
-                pdf.set_text_color(0, 0, 0)
-                pdf.set_font('Arial', '', 8)
-                for t in transactions:
-                    # Alternate row colors
-                    if transactions.index(t) % 2 == 0:
-                        pdf.set_fill_color(240, 240, 240)
-                    else:
-                        pdf.set_fill_color(255, 255, 255)
+        blocks += [
+            Text(f'Data as of: {database_as_of().strftime("%Y-%m-%d %H:%M")}'),
+            Spacer(10),
 
-                    pdf.cell(25, 8, t['date'], 1, 0, 'C', True)
-                    pdf.cell(25, 8, t['type'].title(), 1, 0, 'C', True)
-                    pdf.cell(80, 8, t['description'][:50], 1, 0, 'C', True)
-                    pdf.cell(20, 8, t.get('category', '')[:15], 1, 0, 'C', True)
+            # Summary
+            Text('Financial Summary:', 'subheading'),
+            Text(f'Initial Balance: {self.settings["currency"]} {employee["initial_balance"]:.2f}'),
+            Text(f'Total Expenses: {self.settings["currency"]} {summary["total_expenses"]:.2f}'),
+            Text(f'Total Payments: {self.settings["currency"]} {summary["total_payments"]:.2f}'),
+            self._balance_line('Current Balance', summary['balance']),
+            Spacer(10)
+        ]
+
+        # Transactions table
+        if transactions:
+            blocks += [
+                Text('Transaction History:', 'subheading'),
+                DataTable(
+                    [('Date', 25), ('Type', 25), ('Description', 80), ('Category', 20), ('Amount', 30)],
+                    (([t['date'], t['type'].title(), t['description'][:50], t.get('category', '')[:15],
+                       f"{self.settings['currency']} {t['amount']:.2f}"],
+                      # Color code amounts
+                      {4: EXPENSE_COLOR if t['type'] == 'expense' else PAYMENT_COLOR})
+                     for t in transactions),
+                    'dense'
+                )
+            ]
+        else:
+            blocks.append(Text('No transactions found for the selected period.', 'line'))
 
-                    # Color code amounts
-                    if t['type'] == 'expense':
-                        pdf.set_text_color(255, 0, 0)
-                    else:
-                        pdf.set_text_color(0, 128, 0)
-                    pdf.cell(30, 8, f"{self.settings['currency']} {t['amount']:.2f}", 1, 1, 'C', True)
-                    pdf.set_text_color(0, 0, 0)
-            else:
-                pdf.cell(0, 10, 'No transactions found for the selected period.', 0, 1)
+        return self._report(blocks)
 
-            # Footer with company info
-            pdf.ln(15)
-            pdf.set_font('Arial', 'I', 8)
-            pdf.cell(0, 10, f'Generated by {self.settings["company_name"]} Business Management System', 0, 1, 'C')
-            pdf.cell(0, 5, f'Contact: {self.settings["company_phone"]} | Email: {self.settings["company_email"]}', 0, 1, 'C')
+# Background PDF rendering: the shared report engine renders each report in a worker process
+# and keeps the result in the report cache, keyed on the database version it was built from
+def database_version(path=DB_PATH):
+    # Every commit rewrites the database or its WAL file, so their stat changes with the data
+    markers = []
+    for name in (path, f'{path}-wal'):
+        try:
+            info = os.stat(name)
+            markers.append([info.st_mtime_ns, info.st_size])
+        except FileNotFoundError:
+            markers.append(None)
+    return markers
+
+def database_as_of(path=DB_PATH):
+    # Reports are dated by the last commit they reflect, which the cache key above tracks, not the clock
+    times = [marker[0] for marker in database_version(path) if marker]
+    return datetime.fromtimestamp(max(times) / 1e9) if times else datetime.now()
+
+def submit_report(report, params, template):
+    # Requests for the same report over the same data share one job and one cached file;
+    # the template is built here and laid out by a report worker
+    return get_report_queue().submit(report, params, database_version(), template, REPORT_THEME, 'fpdf')
+
+def render_report_job(name, label, file_name, key):
+    job = st.session_state.report_jobs.get(name)
+    if job is None:
+        return
+    if not job.done:
+        st.info(f"⏳ Generating PDF in the background... {job.pages} page(s) rendered")
+        if st.button("🔄 Check Report", use_container_width=True, key=f"check_{key}"):
+            st.rerun()
+    elif job.error:
+        st.error(f"Error generating PDF: {job.error}")
+    else:
+        st.download_button(
+            label=label,
+            data=job.read(),
+            file_name=file_name,
+            mime="application/pdf",
+            use_container_width=True,
+            key=key
+        )
 
-            return pdf
-        except Exception as e:
-            st.error(f"Error generating individual employee ledger PDF: {str(e)}")
-            return None
+def submit_employee_ledger_pdf(pdf_generator, employee, ledger):
+    return submit_report(
+        'employee_ledger', {'employee_id': employee['id']},
+        lambda: pdf_generator.individual_employee_ledger_report(employee, ledger))
+
+def get_page_cursor(state_key, filters):
+    # Cursor for the page being viewed; going back to page one when the filters change
+    pager = st.session_state.get(state_key)
+    if pager is None or pager['filters'] != filters:
+        pager = {'filters': filters, 'cursors': [None]}
+        st.session_state[state_key] = pager
+    return pager['cursors'][-1]
+
+def render_pager(state_key, next_cursor, total):
+    pager = st.session_state[state_key]
+    page = len(pager['cursors'])
+    pages = max(1, -(-total // PAGE_SIZE))
+    col1, col2, col3 = st.columns([1, 2, 1])
+    with col1:
+        if st.button("⬅️ Previous", key=f"{state_key}_prev", disabled=page == 1, use_container_width=True):
+            pager['cursors'].pop()
+            st.rerun()
+    with col2:
+        st.caption(f"Page {page} of {pages}")
+    with col3:
+        if st.button("Next ➡️", key=f"{state_key}_next", disabled=next_cursor is None, use_container_width=True):
+            pager['cursors'].append(next_cursor)
+            st.rerun()
 
 def render_dashboard(ledger, expense_tracker, pdf_generator):
     st.markdown('<div class="sub-header">📊 Business Dashboard</div>', unsafe_allow_html=True)
 
     # Quick stats
     employees = ledger.get_employees()
-    transactions = ledger.get_transactions()
-    expenses = expense_tracker.get_expenses()
+    transaction_count = ledger.count_transactions()
+    expenses, _ = expense_tracker.get_expenses_page(page_size=5)
     expense_summary = expense_tracker.get_summary()
 
     col1, col2, col3, col4 = st.columns(4)
@@ -1367,7 +1925,7 @@ def render_dashboard(ledger, expense_tracker, pdf_generator):
     with col1:
         st.markdown(f'<div class="metric-card">👥 Total Employees<br>{len(employees)}</div>', unsafe_allow_html=True)
     with col2:
-        st.markdown(f'<div class="metric-card">💸 Total Transactions<br>{len(transactions)}</div>', unsafe_allow_html=True)
+        st.markdown(f'<div class="metric-card">💸 Total Transactions<br>{transaction_count}</div>', unsafe_allow_html=True)
     with col3:
         st.markdown(f'<div class="metric-card">🏢 Company Expenses<br>PKR {expense_summary["company_total"]:.2f}</div>',
                     unsafe_allow_html=True)
@@ -1381,44 +1939,25 @@ def render_dashboard(ledger, expense_tracker, pdf_generator):
     
     with col1:
         if st.button("📊 Comprehensive Report", use_container_width=True, key="comp_report"):
-            pdf = pdf_generator.generate_comprehensive_report_pdf(ledger, expense_tracker)
-            if pdf:
-                pdf_output = pdf.output(dest='S').encode('latin1')
-                st.download_button(
-                    label="Download PDF",
-                    data=pdf_output,
-                    file_name=f"comprehensive_report_{datetime.now().strftime('%Y%m%d')}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+            st.session_state.report_jobs['comprehensive'] = submit_report(
+                'comprehensive', {}, lambda: pdf_generator.comprehensive_report(ledger, expense_tracker))
+        render_report_job('comprehensive', "Download PDF",
+                          f"comprehensive_report_{datetime.now().strftime('%Y%m%d')}.pdf", "download_comp_report")
     
     with col2:
         if st.button("👥 Employee List", use_container_width=True, key="emp_list"):
-            employees = ledger.get_employees()
-            pdf = pdf_generator.generate_employee_list_pdf(employees, ledger)
-            if pdf:
-                pdf_output = pdf.output(dest='S').encode('latin1')
-                st.download_button(
-                    label="Download PDF",
-                    data=pdf_output,
-                    file_name=f"employee_list_{datetime.now().strftime('%Y%m%d')}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+            st.session_state.report_jobs['employee_list'] = submit_report(
+                'employee_list', {}, lambda: pdf_generator.employee_list_report(ledger.get_employees(), ledger))
+        render_report_job('employee_list', "Download PDF",
+                          f"employee_list_{datetime.now().strftime('%Y%m%d')}.pdf", "download_emp_list")
     
     with col3:
         if st.button("💰 All Expenses", use_container_width=True, key="all_exp"):
-            expenses = expense_tracker.get_expenses()
-            pdf = pdf_generator.generate_expense_report_pdf(expenses, "All")
-            if pdf:
-                pdf_output = pdf.output(dest='S').encode('latin1')
-                st.download_button(
-                    label="Download PDF",
-                    data=pdf_output,
-                    file_name=f"all_expenses_{datetime.now().strftime('%Y%m%d')}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+            st.session_state.report_jobs['all_expenses'] = submit_report(
+                'expense_report', {'report_type': 'All'},
+                lambda: pdf_generator.expense_report(expense_tracker.get_expenses(), "All"))
+        render_report_job('all_expenses', "Download PDF",
+                          f"all_expenses_{datetime.now().strftime('%Y%m%d')}.pdf", "download_all_exp")
     
     with col4:
         # Individual Employee Ledger Downloads
@@ -1433,16 +1972,11 @@ def render_dashboard(ledger, expense_tracker, pdf_generator):
             if selected_employee:
                 employee = ledger.get_employee(selected_employee)
                 if st.button("📄 Download Employee Ledger", use_container_width=True, key="dashboard_emp_ledger"):
-                    pdf = pdf_generator.generate_individual_employee_ledger_pdf(employee, ledger)
-                    if pdf:
-                        pdf_output = pdf.output(dest='S').encode('latin1')
-                        st.download_button(
-                            label="📥 Download PDF",
-                            data=pdf_output,
-                            file_name=f"ledger_{employee['name']}_{datetime.now().strftime('%Y%m%d')}.pdf",
-                            mime="application/pdf",
-                            use_container_width=True
-                        )
+                    st.session_state.report_jobs[f"ledger_{employee['id']}"] = submit_employee_ledger_pdf(
+                        pdf_generator, employee, ledger)
+                render_report_job(f"ledger_{employee['id']}", "📥 Download PDF",
+                                  f"ledger_{employee['name']}_{datetime.now().strftime('%Y%m%d')}.pdf",
+                                  "download_dashboard_emp_ledger")
         else:
             st.info("No employees available")
 
@@ -1452,8 +1986,9 @@ def render_dashboard(ledger, expense_tracker, pdf_generator):
     with col1:
         st.markdown("### 👥 Recent Employees")
         if employees:
+            balances = ledger.get_all_employee_balances()
             for emp in employees[:5]:
-                balance = ledger.get_employee_balance(emp['id'])
+                balance = balances.get(emp['id'], 0)
                 balance_text = f"PKR {abs(balance):.2f} {'(Due)' if balance > 0 else '(Advance)' if balance < 0 else ''}"
                 st.write(f"**{emp['name']}** - {balance_text}")
         else:
@@ -1532,6 +2067,7 @@ def render_employee_ledger(ledger, pdf_generator):
         
         if employees:
             st.markdown(f"**Found {len(employees)} employee(s)**")
+            balances = ledger.get_all_employee_balances()
             
             for emp in employees:
                 with st.container():
@@ -1549,7 +2085,7 @@ def render_employee_ledger(ledger, pdf_generator):
                             st.caption(f"📧 {emp['email']}")
                     
                     with col2:
-                        balance = ledger.get_employee_balance(emp['id'])
+                        balance = balances.get(emp['id'], 0)
                         balance_text = f"PKR {abs(balance):.2f}"
                         if balance > 0:
                             st.error(f"💰 Due: {balance_text}")
@@ -1560,16 +2096,11 @@ def render_employee_ledger(ledger, pdf_generator):
                     
                     with col3:
                         if st.button("📄 PDF", key=f"pdf_emp_{emp['id']}", use_container_width=True):
-                            pdf = pdf_generator.generate_individual_employee_ledger_pdf(emp, ledger)
-                            if pdf:
-                                pdf_output = pdf.output(dest='S').encode('latin1')
-                                st.download_button(
-                                    label="Download Ledger",
-                                    data=pdf_output,
-                                    file_name=f"ledger_{emp['name']}_{datetime.now().strftime('%Y%m%d')}.pdf",
-                                    mime="application/pdf",
-                                    key=f"download_emp_{emp['id']}"
-                                )
+                            st.session_state.report_jobs[f"ledger_{emp['id']}"] = submit_employee_ledger_pdf(
+                                pdf_generator, emp, ledger)
+                        render_report_job(f"ledger_{emp['id']}", "Download Ledger",
+                                          f"ledger_{emp['name']}_{datetime.now().strftime('%Y%m%d')}.pdf",
+                                          f"download_emp_{emp['id']}")
                     
                     with col4:
                         if st.button("✏️ Edit", key=f"edit_emp_{emp['id']}", use_container_width=True):
@@ -1678,10 +2209,16 @@ def render_employee_ledger(ledger, pdf_generator):
             if st.button("🔄 Refresh", key="refresh_trans", use_container_width=True):
                 st.rerun()
         
-        transactions = ledger.get_transactions(trans_search)
+        cursor = get_page_cursor('transactions_pager', trans_search)
+        transactions, next_cursor = ledger.get_transactions_page(trans_search, cursor)
+        if not transactions and cursor is not None:
+            # The rest of this page was deleted; start over from the newest
+            del st.session_state.transactions_pager
+            st.rerun()
         
         if transactions:
-            st.markdown(f"**Found {len(transactions)} transaction(s)**")
+            transaction_total = ledger.count_transactions(trans_search)
+            st.markdown(f"**Found {transaction_total} transaction(s)**")
             
             for trans in transactions:
                 with st.container():
@@ -1754,6 +2291,8 @@ def render_employee_ledger(ledger, pdf_generator):
                             if st.button("❌ Cancel", key=f"cancel_del_trans_{trans['id']}", use_container_width=True):
                                 del st.session_state.deleting_transaction
                                 st.rerun()
+            
+            render_pager('transactions_pager', next_cursor, transaction_total)
         
         # Add new transaction form
         st.markdown("### ➕ Record New Transaction")
@@ -1829,16 +2368,11 @@ def render_employee_ledger(ledger, pdf_generator):
                 col1, col2 = st.columns(2)
                 with col1:
                     if st.button("📥 Download Full Ledger PDF", key="emp_ledger_pdf_full", use_container_width=True):
-                        pdf = pdf_generator.generate_individual_employee_ledger_pdf(employee, ledger)
-                        if pdf:
-                            pdf_output = pdf.output(dest='S').encode('latin1')
-                            st.download_button(
-                                label="📥 Download PDF",
-                                data=pdf_output,
-                                file_name=f"ledger_{employee['name']}_{datetime.now().strftime('%Y%m%d')}.pdf",
-                                mime="application/pdf",
-                                key="download_ledger_full"
-                            )
+                        st.session_state.report_jobs[f"ledger_{employee['id']}"] = submit_employee_ledger_pdf(
+                            pdf_generator, employee, ledger)
+                    render_report_job(f"ledger_{employee['id']}", "📥 Download PDF",
+                                      f"ledger_{employee['name']}_{datetime.now().strftime('%Y%m%d')}.pdf",
+                                      "download_ledger_full")
                 
                 with col2:
                     if st.button("📅 Download Filtered Ledger PDF", key="emp_ledger_pdf_filtered", use_container_width=True):
@@ -1846,18 +2380,17 @@ def render_employee_ledger(ledger, pdf_generator):
                             selected_employee, start_date.isoformat(), end_date.isoformat()
                         )
                         filtered_summary = ledger.get_employee_summary(selected_employee, start_date.isoformat(), end_date.isoformat())
-                        pdf = pdf_generator.generate_employee_ledger_pdf(
-                            employee['name'], filtered_transactions, filtered_summary, start_date.isoformat(), end_date.isoformat()
-                        )
-                        if pdf:
-                            pdf_output = pdf.output(dest='S').encode('latin1')
-                            st.download_button(
-                                label="📥 Download PDF",
-                                data=pdf_output,
-                                file_name=f"ledger_{employee['name']}_{start_date}_{end_date}.pdf",
-                                mime="application/pdf",
-                                key="download_ledger_filtered"
+                        st.session_state.report_jobs['filtered_ledger'] = submit_report(
+                            'employee_ledger',
+                            {'employee_id': selected_employee, 'start_date': start_date, 'end_date': end_date},
+                            lambda: pdf_generator.employee_ledger_report(
+                                employee['name'], filtered_transactions, filtered_summary,
+                                start_date.isoformat(), end_date.isoformat()
                             )
+                        )
+                    render_report_job('filtered_ledger', "📥 Download PDF",
+                                      f"ledger_{employee['name']}_{start_date}_{end_date}.pdf",
+                                      "download_ledger_filtered")
                 
                 # Display transactions
                 if transactions:
@@ -1912,23 +2445,17 @@ def render_expense_dashboard(expense_tracker, ledger, pdf_generator):
         with col3:
             st.metric("💰 Total Expenses", f"PKR {expense_summary['grand_total']:.2f}")
         
-        # Expense breakdown
-        expenses = expense_tracker.get_expenses()
-        if expenses:
-            df = pd.DataFrame(expenses)
-            if 'date' in df.columns:
-                df['date'] = pd.to_datetime(df['date'])
-                
-                # Monthly trend
-                monthly_expenses = df.groupby([df['date'].dt.to_period('M'), 'type'])['amount'].sum().reset_index()
-                monthly_expenses['date'] = monthly_expenses['date'].astype(str)
-                
-                if PLOTLY_AVAILABLE:
-                    fig = px.bar(monthly_expenses, x='date', y='amount', color='type',
-                               title="📊 Monthly Expenses Trend", barmode='group')
-                    st.plotly_chart(fig, use_container_width=True)
-                else:
-                    st.bar_chart(monthly_expenses.pivot(index='date', columns='type', values='amount'))
+        # Monthly trend from the maintained rollup
+        monthly_trend = expense_tracker.get_monthly_trend()
+        if monthly_trend:
+            monthly_expenses = pd.DataFrame(monthly_trend)
+            
+            if PLOTLY_AVAILABLE:
+                fig = px.bar(monthly_expenses, x='date', y='amount', color='type',
+                           title="📊 Monthly Expenses Trend", barmode='group')
+                st.plotly_chart(fig, use_container_width=True)
+            else:
+                st.bar_chart(monthly_expenses.pivot(index='date', columns='type', values='amount'))
 
     with tab2:
         st.markdown("### ➕ Add New Expense")
@@ -1974,10 +2501,17 @@ def render_expense_dashboard(expense_tracker, ledger, pdf_generator):
         
         # Get filtered expenses
         expense_type_filter = None if filter_type == "All" else filter_type
-        expenses = expense_tracker.get_expenses(expense_type_filter, start_date.isoformat(), end_date.isoformat(), search_query)
+        filters = (expense_type_filter, start_date.isoformat(), end_date.isoformat(), search_query)
+        cursor = get_page_cursor('expenses_pager', filters)
+        expenses, next_cursor = expense_tracker.get_expenses_page(*filters, cursor=cursor)
+        if not expenses and cursor is not None:
+            # The rest of this page was deleted; start over from the newest
+            del st.session_state.expenses_pager
+            st.rerun()
         
         if expenses:
-            st.markdown(f"**Found {len(expenses)} expense(s)**")
+            expense_total = expense_tracker.count_expenses(*filters)
+            st.markdown(f"**Found {expense_total} expense(s)**")
             
             for exp in expenses:
                 with st.container():
@@ -2074,9 +2608,43 @@ def render_expense_dashboard(expense_tracker, ledger, pdf_generator):
                             if st.button("❌ Cancel", key=f"cancel_del_exp_{exp['id']}", use_container_width=True):
                                 del st.session_state.deleting_expense
                                 st.rerun()
+            
+            render_pager('expenses_pager', next_cursor, expense_total)
         else:
             st.info("💰 No expenses found for the selected filters.")
 
+def render_bulk_import(kind, uploaded_file, label, key):
+    try:
+        st.write("Preview:", pd.read_csv(uploaded_file, nrows=5))
+        merge = st.radio("Import mode", ["Append all rows", "Merge (update matching, add new)"],
+                         key=f"{key}_mode") != "Append all rows"
+        preview = merge and st.button("🔍 Preview Changes", key=f"{key}_preview")
+        run = st.button(label, key=key)
+        if preview or run:
+            uploaded_file.seek(0)
+            status = st.empty()
+            result = bulk_import_csv(
+                kind, uploaded_file, merge=merge, dry_run=preview,
+                progress=lambda done, failed: status.caption(f"⏳ {done} row(s) processed, {failed} rejected...")
+            )
+            status.empty()
+            render_import_result(kind, result, merge, preview)
+    except Exception as e:
+        st.error(f"Error importing {kind}: {str(e)}")
+
+def render_import_result(kind, result, merge=False, preview=False):
+    if preview:
+        st.info(f"🔍 {result['imported']} to add, {result['updated']} to update, {result['unchanged']} unchanged")
+    elif merge:
+        st.success(f"✅ Added {result['imported']}, updated {result['updated']}, unchanged {result['unchanged']} {kind}")
+    else:
+        st.success(f"✅ Imported {result['imported']} {kind}")
+    if result['preview']:
+        st.dataframe(pd.DataFrame(result['preview']).astype(str), hide_index=True, use_container_width=True)
+    if result['error_count']:
+        st.warning(f"⚠️ {result['error_count']} row(s) were skipped")
+        st.dataframe(pd.DataFrame(result['errors']), hide_index=True, use_container_width=True)
+
 def render_reports_analytics(ledger, expense_tracker, pdf_generator):
     st.markdown('<div class="sub-header">📊 Reports & Analytics</div>', unsafe_allow_html=True)
 
@@ -2086,16 +2654,10 @@ def render_reports_analytics(ledger, expense_tracker, pdf_generator):
     
     with col1:
         if st.button("🏢 Full Business Report", use_container_width=True, key="full_business"):
-            pdf = pdf_generator.generate_comprehensive_report_pdf(ledger, expense_tracker)
-            if pdf:
-                pdf_output = pdf.output(dest='S').encode('latin1')
-                st.download_button(
-                    label="Download Full Report",
-                    data=pdf_output,
-                    file_name=f"full_business_report_{datetime.now().strftime('%Y%m%d')}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+            st.session_state.report_jobs['comprehensive'] = submit_report(
+                'comprehensive', {}, lambda: pdf_generator.comprehensive_report(ledger, expense_tracker))
+        render_report_job('comprehensive', "Download Full Report",
+                          f"full_business_report_{datetime.now().strftime('%Y%m%d')}.pdf", "download_full_business")
     
     with col2:
         # Date range for custom report
@@ -2106,17 +2668,12 @@ def render_reports_analytics(ledger, expense_tracker, pdf_generator):
             custom_end = st.date_input("End Date", value=datetime.now(), key="custom_end")
         
         if st.button("📅 Custom Period Report", use_container_width=True, key="custom_report"):
-            pdf = pdf_generator.generate_comprehensive_report_pdf(ledger, expense_tracker, 
-                                                                 custom_start.isoformat(), custom_end.isoformat())
-            if pdf:
-                pdf_output = pdf.output(dest='S').encode('latin1')
-                st.download_button(
-                    label="Download Custom Report",
-                    data=pdf_output,
-                    file_name=f"custom_report_{custom_start}_{custom_end}.pdf",
-                    mime="application/pdf",
-                    use_container_width=True
-                )
+            st.session_state.report_jobs['custom_report'] = submit_report(
+                'comprehensive', {'start_date': custom_start, 'end_date': custom_end},
+                lambda: pdf_generator.comprehensive_report(ledger, expense_tracker,
+                                                           custom_start.isoformat(), custom_end.isoformat()))
+        render_report_job('custom_report', "Download Custom Report",
+                          f"custom_report_{custom_start}_{custom_end}.pdf", "download_custom_report")
     
     with col3:
         # Individual Employee Ledgers
@@ -2131,16 +2688,11 @@ def render_reports_analytics(ledger, expense_tracker, pdf_generator):
             if selected_employee:
                 employee = ledger.get_employee(selected_employee)
                 if st.button("📄 Download Employee Ledger", use_container_width=True, key="reports_emp_ledger"):
-                    pdf = pdf_generator.generate_individual_employee_ledger_pdf(employee, ledger)
-                    if pdf:
-                        pdf_output = pdf.output(dest='S').encode('latin1')
-                        st.download_button(
-                            label="📥 Download PDF",
-                            data=pdf_output,
-                            file_name=f"ledger_{employee['name']}_{datetime.now().strftime('%Y%m%d')}.pdf",
-                            mime="application/pdf",
-                            use_container_width=True
-                        )
+                    st.session_state.report_jobs[f"ledger_{employee['id']}"] = submit_employee_ledger_pdf(
+                        pdf_generator, employee, ledger)
+                render_report_job(f"ledger_{employee['id']}", "📥 Download PDF",
+                                  f"ledger_{employee['name']}_{datetime.now().strftime('%Y%m%d')}.pdf",
+                                  "download_reports_emp_ledger")
 
     # Data Import/Export Section
     st.markdown("### 📁 Data Import & Export")
@@ -2250,64 +2802,17 @@ def render_reports_analytics(ledger, expense_tracker, pdf_generator):
         with col1:
             uploaded_employees = st.file_uploader("Import Employees", type=['csv'], key="employees_upload")
             if uploaded_employees is not None:
-                try:
-                    df = pd.read_csv(uploaded_employees)
-                    st.write("Preview:", df.head())
-                    if st.button("Import Employees", key="import_emp"):
-                        for _, row in df.iterrows():
-                            ledger.add_employee(
-                                row['name'],
-                                float(row.get('initial_balance', 0)),
-                                row.get('phone', ''),
-                                row.get('email', ''),
-                                row.get('department', ''),
-                                row.get('position', ''),
-                                row.get('join_date', datetime.now().strftime('%Y-%m-%d'))
-                            )
-                        st.success("✅ Employees imported successfully!")
-                except Exception as e:
-                    st.error(f"Error importing employees: {str(e)}")
+                render_bulk_import('employees', uploaded_employees, "Import Employees", "import_emp")
         
         with col2:
             uploaded_transactions = st.file_uploader("Import Transactions", type=['csv'], key="transactions_upload")
             if uploaded_transactions is not None:
-                try:
-                    df = pd.read_csv(uploaded_transactions)
-                    st.write("Preview:", df.head())
-                    if st.button("Import Transactions", key="import_trans"):
-                        for _, row in df.iterrows():
-                            ledger.add_transaction(
-                                row['employee_id'],
-                                row['type'],
-                                float(row['amount']),
-                                row['description'],
-                                row.get('category', ''),
-                                row.get('date', datetime.now().strftime('%Y-%m-%d'))
-                            )
-                        st.success("✅ Transactions imported successfully!")
-                except Exception as e:
-                    st.error(f"Error importing transactions: {str(e)}")
+                render_bulk_import('transactions', uploaded_transactions, "Import Transactions", "import_trans")
         
         with col3:
             uploaded_expenses = st.file_uploader("Import Expenses", type=['csv'], key="expenses_upload")
             if uploaded_expenses is not None:
-                try:
-                    df = pd.read_csv(uploaded_expenses)
-                    st.write("Preview:", df.head())
-                    if st.button("Import Expenses", key="import_exp"):
-                        for _, row in df.iterrows():
-                            expense_tracker.add_expense(
-                                row['type'],
-                                row['description'],
-                                float(row['amount']),
-                                row.get('category', ''),
-                                row.get('employee_name', ''),
-                                row.get('date', datetime.now().strftime('%Y-%m-%d')),
-                                row.get('status', 'Pending')
-                            )
-                        st.success("✅ Expenses imported successfully!")
-                except Exception as e:
-                    st.error(f"Error importing expenses: {str(e)}")
+                render_bulk_import('expenses', uploaded_expenses, "Import Expenses", "import_exp")
     
     with tab3:
         st.markdown("### 📊 Business Analytics")
@@ -2316,8 +2821,9 @@ def render_reports_analytics(ledger, expense_tracker, pdf_generator):
         employees = ledger.get_employees()
         if employees:
             employee_data = []
+            balances = ledger.get_all_employee_balances()
             for emp in employees:
-                balance = ledger.get_employee_balance(emp['id'])
+                balance = balances.get(emp['id'], 0)
                 employee_data.append({
                     'name': emp['name'],
                     'balance': balance,
@@ -2380,19 +2886,75 @@ def render_data_management(ledger, expense_tracker):
                 file_name=f"backup_{datetime.now().strftime('%Y%m%d_%H%M%S')}.json",
                 mime="application/json"
             )
+        
+        st.markdown("### 📦 Parquet Export & Import")
+        if not PARQUET_AVAILABLE:
+            st.info("ℹ️ Install pyarrow to export and import Parquet files.")
+        else:
+            parquet_table = st.selectbox("Table", ["expenses", "transactions", "employees"], key="parquet_table")
+            col1, col2 = st.columns(2)
+            with col1:
+                if st.button("📦 Export Parquet", key="export_parquet", use_container_width=True):
+                    try:
+                        st.download_button(
+                            label=f"📥 Download {parquet_table}.parquet",
+                            data=export_table_parquet(parquet_table),
+                            file_name=f"{parquet_table}_{datetime.now().strftime('%Y%m%d')}.parquet",
+                            mime="application/octet-stream",
+                            use_container_width=True
+                        )
+                    except Exception as e:
+                        st.error(f"Error exporting {parquet_table}: {str(e)}")
+            with col2:
+                uploaded_parquet = st.file_uploader("Import Parquet", type=['parquet'], key="parquet_upload")
+                if uploaded_parquet is not None:
+                    date_range = st.checkbox("Only rows in a date range", key="parquet_date_range")
+                    start_date = end_date = None
+                    if date_range:
+                        start_date = st.date_input("From", value=datetime.now() - timedelta(days=30), key="parquet_start")
+                        end_date = st.date_input("To", value=datetime.now(), key="parquet_end")
+                    merge = st.radio("Import mode", ["Append all rows", "Merge (update matching, add new)"],
+                                     key="parquet_mode") != "Append all rows"
+                    preview = merge and st.button("🔍 Preview Changes", key="parquet_preview")
+                    run = st.button("📥 Import Parquet", key="import_parquet")
+                    if preview or run:
+                        try:
+                            uploaded_parquet.seek(0)
+                            chunks = read_parquet_chunks(uploaded_parquet, parquet_table, start_date, end_date)
+                            result = bulk_import_chunks(parquet_table, chunks, merge=merge, dry_run=preview)
+                            render_import_result(parquet_table, result, merge, preview)
+                        except Exception as e:
+                            st.error(f"Error importing {parquet_table}: {str(e)}")
+        
+        st.markdown("### 🩺 Query Plan Check")
+        if st.button("🔍 Check Query Plans", key="check_query_plans"):
+            problems = check_query_plans()
+            if problems:
+                for name, steps in problems.items():
+                    st.error(f"❌ {name}: {'; '.join(steps)}")
+            else:
+                st.success(f"✅ All {len(HOT_QUERIES)} hot queries use an index.")
+        
+        st.markdown("### 🔎 Search Index")
+        st.caption("Rebuild the search index if searches miss records, e.g. after the database was vacuumed by another tool.")
+        if st.button("🔄 Rebuild Search Index", key="rebuild_search_index"):
+            try:
+                with db_transaction() as conn:
+                    rebuild_search_index(conn.cursor())
+                st.success("✅ Search index rebuilt.")
+            except Exception as e:
+                st.error(f"Error rebuilding search index: {str(e)}")
     
     with tab2:
         st.markdown("### ⚠️ System Reset")
         st.warning("🚨 This action cannot be undone! All data will be permanently deleted.")
         
         if st.button("🗑️ Reset All Data", type="secondary", use_container_width=True):
-            conn = get_db_connection()
-            c = conn.cursor()
-            c.execute('DELETE FROM employees')
-            c.execute('DELETE FROM transactions')
-            c.execute('DELETE FROM expenses')
-            conn.commit()
-            conn.close()
+            with db_transaction() as conn:
+                c = conn.cursor()
+                c.execute('DELETE FROM employees')
+                c.execute('DELETE FROM transactions')
+                c.execute('DELETE FROM expenses')
             st.success("✅ All data has been reset!")
             st.rerun()
 
@@ -2474,6 +3036,8 @@ def main():
         st.session_state.editing_expense = None
     if 'deleting_expense' not in st.session_state:
         st.session_state.deleting_expense = None
+    if 'report_jobs' not in st.session_state:
+        st.session_state.report_jobs = {}
 
     # Sidebar navigation
     st.sidebar.markdown("""
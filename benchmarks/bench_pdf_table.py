@@ -0,0 +1,67 @@
+"""Benchmark the report engine's table renderer on both PDF backends.
+
+Renders transaction tables of growing size through report_engine, once with
+FPDF (Expense.py's reports) and once with ReportLab (Chemical.py's reports),
+and prints the time per row, which should stay flat as the row count grows.
+FPDF used to copy the whole document on each write while outputting it, and
+ReportLab's Table copies every remaining row each time it splits across a
+page; both grew quadratically.
+
+Run from the repository root:
+
+    python benchmarks/bench_pdf_table.py [max_rows]
+"""
+import os
+import sys
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SIZES = (1000, 10000, 100000)
+EXPENSE_COLOR = (255, 0, 0)
+PAYMENT_COLOR = (0, 128, 0)
+
+sys.path.insert(0, ROOT)
+import report_engine  # noqa: E402
+
+THEME = report_engine.Theme(
+    'bench',
+    text={},
+    tables={'default': {'header_fill': '#4F81BD', 'header_size': 12, 'size': 10, 'header_height': 10,
+                        'row_height': 8, 'stripes': ['#F0F0F0', '#FFFFFF'], 'grid': 1}}
+)
+# Column widths are millimetres for FPDF and points for ReportLab
+WIDTHS = {'fpdf': (40, 30, 70, 30), 'reportlab': (110, 85, 200, 85)}
+
+
+def make_transactions(count):
+    return [{'date': f'2024-{1 + i % 12:02d}-{1 + i % 28:02d}',
+             'type': 'expense' if i % 3 else 'payment',
+             'description': f'Travel claim {i}',
+             'amount': 100.0 + i % 500} for i in range(count)]
+
+
+def render(backend, transactions):
+    columns = list(zip(('Date', 'Type', 'Description', 'Amount'), WIDTHS[backend]))
+    table = report_engine.DataTable(
+        columns,
+        (([t['date'], t['type'].title(), t['description'][:40], f"PKR {t['amount']:.2f}"],
+          {3: EXPENSE_COLOR if t['type'] == 'expense' else PAYMENT_COLOR})
+         for t in transactions)
+    )
+    return report_engine.render_report(report_engine.Report([table]), THEME, backend)
+
+
+def main():
+    max_rows = int(sys.argv[1]) if len(sys.argv) > 1 else SIZES[-1]
+    print(f"{'backend':>10} {'rows':>8} {'seconds':>9} {'us/row':>8}")
+    for backend in ('fpdf', 'reportlab'):
+        for count in [size for size in SIZES if size <= max_rows]:
+            transactions = make_transactions(count)
+            start = time.perf_counter()
+            render(backend, transactions)
+            elapsed = time.perf_counter() - start
+            print(f"{backend:>10} {count:>8} {elapsed:>9.2f} {elapsed / count * 1e6:>8.1f}")
+
+
+if __name__ == '__main__':
+    main()
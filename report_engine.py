@@ -0,0 +1,817 @@
+"""Report engine shared by the HMD Solutions apps
+
+Reports are described as templates: a Report holding a list of blocks (Text,
+Spacer, DataTable, Signature) with no drawing code in them. render_report()
+lays a template out with a Theme through either ReportLab (Chemical.py) or
+FPDF (Expense.py). Themes are compiled once per process and backend, and every
+table goes through the same row pipeline, which writes one page at a time in
+both backends. The disk report cache, the background report queue and the
+branding images live here too, so both apps share one implementation of each.
+"""
+import bisect
+import hashlib
+import json
+import os
+import pickle
+import subprocess
+import sys
+import tempfile
+import threading
+from collections import namedtuple
+from datetime import datetime
+from io import BytesIO
+
+try:
+    from reportlab.lib import colors
+    from reportlab.lib.fonts import tt2ps
+    from reportlab.lib.pagesizes import A4
+    from reportlab.lib.styles import ParagraphStyle
+    from reportlab.lib.utils import ImageReader
+    from reportlab.platypus import Flowable, Image, Paragraph, SimpleDocTemplate, Table, TableStyle
+    from reportlab.platypus import Spacer as SpacerFlowable
+    REPORTLAB_AVAILABLE = True
+except ImportError:
+    REPORTLAB_AVAILABLE = False
+
+try:
+    from fpdf import FPDF
+    FPDF_AVAILABLE = True
+except ImportError:
+    FPDF_AVAILABLE = False
+
+try:
+    from PIL import Image as PILImage
+    PIL_AVAILABLE = True
+except ImportError:
+    PIL_AVAILABLE = False
+
+# Template blocks. Table rows are (values, colors) pairs, where colors optionally
+# maps a column index to that cell's text colour.
+Report = namedtuple('Report', 'blocks watermark', defaults=(False,))
+Text = namedtuple('Text', 'text style color', defaults=('body', None))
+Spacer = namedtuple('Spacer', 'height')
+DataTable = namedtuple('DataTable', 'columns rows style', defaults=('default',))
+Signature = namedtuple('Signature', [])
+
+BACKENDS = ('reportlab', 'fpdf')
+ALIGNMENTS = {'L': 0, 'C': 1, 'R': 2}
+GRID_COLOR = '#808080'
+MEASURE_ROWS = 500  # Rows sized per ReportLab Table while measuring a long table
+
+
+def file_version(path):
+    """Return a cheap change marker for a file: (mtime, size), or None if missing"""
+    try:
+        info = os.stat(path)
+    except FileNotFoundError:
+        return None
+    return info.st_mtime_ns, info.st_size
+
+
+def rgb(color):
+    """Return a '#RRGGBB' string or an (r, g, b) tuple as an (r, g, b) tuple"""
+    if isinstance(color, str):
+        color = color.lstrip('#')
+        return tuple(int(color[i:i + 2], 16) for i in (0, 2, 4))
+    return tuple(color)
+
+
+_compiled_themes = {}
+_compiled_lock = threading.Lock()
+
+
+class Theme:
+    """Named text and table styles for report templates
+
+    Text styles take bold, italic, size, leading, align ('L', 'C' or 'R'),
+    color, space_before and space_after. Table styles take header_fill,
+    header_color, header_size, header_padding, size, fill or stripes, grid,
+    align, header_height and row_height. Lengths are in the backend's unit,
+    points for ReportLab and millimetres for FPDF, and colours are '#RRGGBB'
+    strings or (r, g, b) tuples. A theme is compiled into backend objects the
+    first time it is rendered and reused by every later report in the process.
+    """
+
+    def __init__(self, name, text, tables, font='Helvetica', margins=None):
+        self.name = name
+        self.text = text
+        self.tables = tables
+        self.font = font
+        self.margins = margins
+        spec = json.dumps([name, text, tables, font, margins], sort_keys=True, default=str)
+        self.key = hashlib.sha256(spec.encode()).hexdigest()[:16]
+
+    def compiled(self, backend):
+        """Return the (text styles, table styles) compiled for a backend, compiling them once"""
+        key = (backend, self.key)
+        compiled = _compiled_themes.get(key)
+        if compiled is None:
+            if backend not in BACKENDS:
+                raise ValueError(f"Unknown report backend: {backend}")
+            compile_styles = _compile_reportlab if backend == 'reportlab' else _compile_fpdf
+            with _compiled_lock:
+                compiled = _compiled_themes.setdefault(key, compile_styles(self))
+        return compiled
+
+
+def _compile_reportlab(theme):
+    text_styles = {}
+    for name, style in theme.text.items():
+        size = style.get('size', 10)
+        text_styles[name] = ParagraphStyle(
+            f"{theme.name}-{name}",
+            fontName=tt2ps(theme.font, style.get('bold', False), style.get('italic', False)),
+            fontSize=size,
+            leading=style.get('leading', size * 1.2),
+            alignment=ALIGNMENTS[style.get('align', 'L')],
+            textColor=_reportlab_color(style.get('color', '#000000')),
+            spaceBefore=style.get('space_before', 0),
+            spaceAfter=style.get('space_after', 0)
+        )
+
+    table_styles = {}
+    for name, style in theme.tables.items():
+        commands = [
+            ('BACKGROUND', (0, 0), (-1, 0), _reportlab_color(style['header_fill'])),
+            ('TEXTCOLOR', (0, 0), (-1, 0), _reportlab_color(style.get('header_color', '#FFFFFF'))),
+            ('ALIGN', (0, 0), (-1, -1), {'L': 'LEFT', 'C': 'CENTER', 'R': 'RIGHT'}[style.get('align', 'C')]),
+            ('FONTNAME', (0, 0), (-1, 0), tt2ps(theme.font, 1, 0)),
+            ('FONTSIZE', (0, 0), (-1, 0), style.get('header_size', 10)),
+            ('FONTNAME', (0, 1), (-1, -1), tt2ps(theme.font, 0, 0)),
+            ('FONTSIZE', (0, 1), (-1, -1), style.get('size', 10)),
+        ]
+        if 'header_padding' in style:
+            commands.append(('BOTTOMPADDING', (0, 0), (-1, 0), style['header_padding']))
+        if 'fill' in style:
+            commands.append(('BACKGROUND', (0, 1), (-1, -1), _reportlab_color(style['fill'])))
+        if 'grid' in style:
+            commands.append(('GRID', (0, 0), (-1, -1), style['grid'], _reportlab_color(GRID_COLOR)))
+        stripes = [_reportlab_color(color) for color in style.get('stripes', ())]
+        table_styles[name] = {'commands': commands, 'stripes': stripes}
+    return text_styles, table_styles
+
+
+def _compile_fpdf(theme):
+    text_styles = {}
+    for name, style in theme.text.items():
+        font_style = ('B' if style.get('bold') else '') + ('I' if style.get('italic') else '')
+        size = style.get('size', 12)
+        text_styles[name] = {
+            'font': (theme.font, font_style, size),
+            'leading': style.get('leading', size / 2),
+            'align': style.get('align', 'L'),
+            'color': rgb(style['color']) if 'color' in style else None,
+            'space_before': style.get('space_before', 0),
+            'space_after': style.get('space_after', 0),
+        }
+
+    table_styles = {}
+    for name, style in theme.tables.items():
+        stripes = style.get('stripes') or [style.get('fill', '#FFFFFF')]
+        table_styles[name] = {
+            'header_font': (theme.font, 'B', style.get('header_size', 12)),
+            'font': (theme.font, '', style.get('size', 10)),
+            'header_fill': rgb(style['header_fill']),
+            'header_color': rgb(style.get('header_color', '#FFFFFF')),
+            'stripes': [rgb(color) for color in stripes],
+            'border': 1 if 'grid' in style else 0,
+            'align': style.get('align', 'C'),
+            'header_height': style.get('header_height', 10),
+            'row_height': style.get('row_height', 8),
+        }
+    return text_styles, table_styles
+
+
+_reportlab_colors = {}
+
+
+def _reportlab_color(color):
+    key = rgb(color)
+    cached = _reportlab_colors.get(key)
+    if cached is None:
+        cached = _reportlab_colors[key] = colors.Color(*(value / 255 for value in key))
+    return cached
+
+
+def table_rows(rows):
+    """Normalise a table's rows into (cell strings, colours) pairs, lazily"""
+    for values, cell_colors in rows:
+        yield [value if isinstance(value, str) else str(value) for value in values], cell_colors
+
+
+def render_report(report, theme, backend='reportlab'):
+    """Lay a report template out with a theme and return the PDF bytes"""
+    if backend == 'reportlab':
+        if not REPORTLAB_AVAILABLE:
+            raise RuntimeError("ReportLab is not installed")
+        return _render_reportlab(report, theme)
+    if backend == 'fpdf':
+        if not FPDF_AVAILABLE:
+            raise RuntimeError("FPDF is not installed")
+        return _render_fpdf(report, theme)
+    raise ValueError(f"Unknown report backend: {backend}")
+
+
+def _render_reportlab(report, theme):
+    text_styles, table_styles = theme.compiled('reportlab')
+    elements = []
+    for block in report.blocks:
+        if isinstance(block, Text):
+            text = block.text
+            if block.color is not None:
+                text = '<font color="#%02x%02x%02x">%s</font>' % (*rgb(block.color), text)
+            elements.append(Paragraph(text, text_styles[block.style]))
+        elif isinstance(block, Spacer):
+            elements.append(SpacerFlowable(1, block.height))
+        elif isinstance(block, DataTable):
+            elements.append(StreamingTable(block.columns, list(table_rows(block.rows)), table_styles[block.style]))
+        elif isinstance(block, Signature):
+            try:
+                signature = get_branding_assets().signature()
+                if signature is not None:
+                    elements.append(Image(BytesIO(signature[0]), width=signature[1], height=signature[2]))
+            except Exception as e:
+                print(f"Signature error: {e}")
+        else:
+            raise TypeError(f"Unknown report block: {block!r}")
+
+    buffer = BytesIO()
+    margins = {}
+    if theme.margins:
+        margins = {'topMargin': theme.margins[0], 'bottomMargin': theme.margins[1]}
+    doc = SimpleDocTemplate(buffer, pagesize=A4, **margins)
+    on_page = add_watermark if report.watermark else _count_page
+    doc.build(elements, onFirstPage=on_page, onLaterPages=on_page)
+    return buffer.getvalue()
+
+
+def _count_page(canvas, doc):
+    report_page_rendered()
+
+
+if REPORTLAB_AVAILABLE:
+    class StreamingTable(Flowable):
+        """A table laid out one page at a time, repeating its header on each page
+
+        Platypus splits a long Table by copying every remaining row into a new
+        table for each page, which makes a report quadratic in its row count.
+        This measures all rows once, keeps the running row heights, and cuts
+        each page's rows from the shared list with a binary search, so every
+        row is styled and drawn once.
+        """
+
+        def __init__(self, columns, rows, style, start=0, layout=None):
+            super().__init__()
+            self.columns = columns
+            self.rows = rows
+            self.style = style
+            self.start = start
+            self.layout = layout
+            self.hAlign = 'CENTER'
+
+        def _table(self, start, stop, widths):
+            data = [[title for title, _ in self.columns]]
+            commands = list(self.style['commands'])
+            stripes = self.style['stripes']
+            if stripes:
+                # Keep the stripe phase continuous across pages
+                shift = start % len(stripes)
+                commands.append(('ROWBACKGROUNDS', (0, 1), (-1, -1), stripes[shift:] + stripes[:shift]))
+            for row, (values, cell_colors) in enumerate(self.rows[start:stop], 1):
+                data.append(values)
+                if cell_colors:
+                    for column, color in cell_colors.items():
+                        if color is not None:
+                            commands.append(('TEXTCOLOR', (column, row), (column, row), _reportlab_color(color)))
+            table = Table(data, colWidths=widths)
+            table.setStyle(TableStyle(commands))
+            return table
+
+        def _measure(self, available_width, available_height):
+            if self.layout is None:
+                # Column widths come from every row, as a single Table would size them; rows are
+                # measured in chunks because Table's own height pass rescans all rows for each row
+                widths = [width for _, width in self.columns]
+                measured = None
+                offsets = [0]
+                for start in range(0, max(len(self.rows), 1), MEASURE_ROWS):
+                    table = self._table(start, start + MEASURE_ROWS, widths)
+                    table.wrap(available_width, available_height)
+                    measured = [max(pair) for pair in zip(measured, table._colWidths)] if measured else table._colWidths
+                    header = table._rowHeights[0]
+                    for height in table._rowHeights[1:]:
+                        offsets.append(offsets[-1] + height)
+                self.layout = {'width': sum(measured), 'widths': measured, 'header': header, 'offsets': offsets}
+            return self.layout
+
+        def wrap(self, available_width, available_height):
+            layout = self._measure(available_width, available_height)
+            offsets = layout['offsets']
+            self.width = layout['width']
+            self.height = layout['header'] + offsets[-1] - offsets[self.start]
+            return self.width, self.height
+
+        def split(self, available_width, available_height):
+            layout = self._measure(available_width, available_height)
+            offsets = layout['offsets']
+            limit = offsets[self.start] + available_height - layout['header'] + 1e-6
+            stop = bisect.bisect_right(offsets, limit, lo=self.start) - 1
+            if stop <= self.start:
+                return []
+            page = self._table(self.start, stop, layout['widths'])
+            if stop >= len(self.rows):
+                return [page]
+            return [page, StreamingTable(self.columns, self.rows, self.style, stop, layout)]
+
+        def draw(self):
+            table = self._table(self.start, len(self.rows), self.layout['widths'])
+            table.wrap(self.width, self.height)
+            table.drawOn(self.canv, 0, 0)
+
+
+def _render_fpdf(report, theme):
+    text_styles, table_styles = theme.compiled('fpdf')
+    pdf = ReportPDF()
+    pdf.add_page()
+    for block in report.blocks:
+        if isinstance(block, Text):
+            style = text_styles[block.style]
+            if style['space_before']:
+                pdf.ln(style['space_before'])
+            pdf.set_font(*style['font'])
+            color = rgb(block.color) if block.color is not None else style['color']
+            if color:
+                pdf.set_text_color(*color)
+            pdf.cell(0, style['leading'], block.text, 0, 1, style['align'])
+            if color:
+                pdf.set_text_color(0, 0, 0)
+            if style['space_after']:
+                pdf.ln(style['space_after'])
+        elif isinstance(block, Spacer):
+            pdf.ln(block.height)
+        elif isinstance(block, DataTable):
+            FPDFTable(pdf, block.columns, table_styles[block.style]).write(table_rows(block.rows))
+        elif isinstance(block, Signature):
+            raise ValueError("Signature blocks need the ReportLab backend")
+        else:
+            raise TypeError(f"Unknown report block: {block!r}")
+    return pdf.output(dest='S').encode('latin1')
+
+
+class PDFBuffer:
+    """Collects an FPDF document's parts and joins them once, as FPDF only appends and asks for the length"""
+
+    def __init__(self):
+        self.parts = []
+        self.length = 0
+
+    def __iadd__(self, text):
+        self.parts.append(text)
+        self.length += len(text)
+        return self
+
+    def __len__(self):
+        return self.length
+
+    def __str__(self):
+        return ''.join(self.parts)
+
+
+if FPDF_AVAILABLE:
+    class ReportPDF(FPDF):
+        """FPDF document with a linear-time output buffer and page counting for report jobs"""
+
+        def __init__(self, *args, **kwargs):
+            super().__init__(*args, **kwargs)
+            # FPDF 1.7.2 appends every object to one str with +=, copying the whole
+            # document per write, which made large reports quadratic
+            self.buffer = PDFBuffer()
+
+        def header(self):
+            # Called on every new page; counts pages for background job progress
+            report_page_rendered()
+
+        def output(self, name='', dest=''):
+            if self.state < 3:
+                self.close()
+            self.buffer = str(self.buffer)
+            return super().output(name, dest)
+
+
+class FPDFTable:
+    """Writes table rows straight into an FPDF document, repeating the header after each page break"""
+
+    def __init__(self, pdf, columns, style):
+        # columns is a list of (title, width) pairs
+        self.pdf = pdf
+        self.columns = columns
+        self.style = style
+        self.rows = 0
+
+    def header(self):
+        pdf = self.pdf
+        style = self.style
+        pdf.set_font(*style['header_font'])
+        pdf.set_fill_color(*style['header_fill'])
+        pdf.set_text_color(*style['header_color'])
+        last = len(self.columns) - 1
+        for i, (title, width) in enumerate(self.columns):
+            pdf.cell(width, style['header_height'], title, style['border'], 1 if i == last else 0, 'C', True)
+        pdf.set_text_color(0, 0, 0)
+        pdf.set_font(*style['font'])
+
+    def row(self, values, cell_colors=None):
+        pdf = self.pdf
+        style = self.style
+        row_height = style['row_height']
+        # Break before a row that would not fit and repeat the header on the new page
+        if pdf.get_y() + row_height > pdf.page_break_trigger:
+            pdf.add_page()
+            self.header()
+        stripes = style['stripes']
+        pdf.set_fill_color(*stripes[self.rows % len(stripes)])
+        last = len(self.columns) - 1
+        for i, ((_, width), value) in enumerate(zip(self.columns, values)):
+            color = cell_colors.get(i) if cell_colors else None
+            if color:
+                pdf.set_text_color(*rgb(color))
+            pdf.cell(width, row_height, value, style['border'], 1 if i == last else 0, style['align'], True)
+            if color:
+                pdf.set_text_color(0, 0, 0)
+        self.rows += 1
+
+    def write(self, rows):
+        """Stream (values, colors) pairs into the table in a single pass"""
+        self.header()
+        for values, cell_colors in rows:
+            self.row(values, cell_colors)
+        return self.rows
+
+
+# Branding images drawn on the ReportLab reports
+LOGO_FILE = 'logo.png'
+SIGNATURE_FILE = 'Asim Siganture.jpg'
+WATERMARK_WIDTH = 500  # Points; covers most of the page without being prominent
+WATERMARK_OPACITY = 0.03
+WATERMARK_FORM = 'hmd_watermark'
+SIGNATURE_SIZE = (120, 40)  # Points
+BRANDING_DPI = 150  # Resolution branding images are downsampled to at their drawn size
+
+
+class BrandingAssets:
+    """Logo watermark and signature images prepared once per process
+
+    Each image is decoded, downsampled to the size it is drawn at and
+    flattened onto white, the watermark with its opacity already applied, then
+    kept as JPEG bytes that ReportLab embeds as-is instead of decoding the
+    source again. A file is reprocessed only when its on-disk version changes.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.images = {}
+
+    def _prepare(self, path, width, height, opacity):
+        with PILImage.open(path) as source:
+            image = source.convert('RGBA')
+        if height is None:
+            height = width * image.height / image.width
+        pixels = (round(width * BRANDING_DPI / 72), round(height * BRANDING_DPI / 72))
+        image = image.resize(pixels, PILImage.LANCZOS)
+        alpha = image.getchannel('A')
+        if opacity < 1:
+            alpha = alpha.point(lambda value: round(value * opacity))
+        flattened = PILImage.new('RGB', image.size, 'white')
+        flattened.paste(image, mask=alpha)
+        output = BytesIO()
+        flattened.save(output, 'JPEG', quality=90)
+        return output.getvalue(), width, height
+
+    def _get(self, path, width, height=None, opacity=1.0):
+        version = file_version(path)
+        if version is None or not PIL_AVAILABLE:
+            return None
+        with self.lock:
+            cached = self.images.get(path)
+            if cached is None or cached[0] != version:
+                cached = (version, self._prepare(path, width, height, opacity))
+                self.images[path] = cached
+        return cached[1]
+
+    def watermark(self):
+        """Return (JPEG bytes, width, height) of the faded logo, or None without a logo"""
+        return self._get(LOGO_FILE, WATERMARK_WIDTH, opacity=WATERMARK_OPACITY)
+
+    def signature(self):
+        """Return (JPEG bytes, width, height) of the signature, or None without a signature file"""
+        return self._get(SIGNATURE_FILE, *SIGNATURE_SIZE)
+
+
+def add_watermark(canvas, doc):
+    """Add the logo watermark to a ReportLab page, embedding the image once per document"""
+    try:
+        if not canvas.hasForm(WATERMARK_FORM):
+            watermark = get_branding_assets().watermark()
+            if watermark is None:
+                return
+            image, width, height = watermark
+            # Record the centred logo as a form the first time, later pages only reference it
+            canvas.beginForm(WATERMARK_FORM)
+            x = (doc.pagesize[0] - width) / 2
+            y = (doc.pagesize[1] - height) / 2
+            canvas.drawImage(ImageReader(BytesIO(image)), x, y, width=width, height=height)
+            canvas.endForm()
+        canvas.doForm(WATERMARK_FORM)
+    except Exception as e:
+        print(f"Watermark error: {e}")
+    finally:
+        report_page_rendered()
+
+
+REPORT_CACHE_DIR = 'report_cache'
+REPORT_CACHE_MAX_BYTES = 64 * 1024 * 1024  # Disk budget for cached reports; least recently used go first
+REPORT_LAYOUT_VERSION = 3  # Bump when a report layout changes so cached PDFs are rebuilt
+REPORT_ASSETS = (LOGO_FILE, SIGNATURE_FILE)
+
+
+class ReportCache:
+    """Disk-backed cache of rendered PDF reports shared by every session and process
+
+    Entries are keyed on a hash of the inputs a report reads, plus the layout
+    version and the branding images, so any change to those gives a new key
+    and a stale report is never served. Files are named
+    <report>-<params hash>-<content hash>.pdf; storing a new version removes
+    the superseded ones for the same parameters.
+    """
+
+    def __init__(self, cache_dir=REPORT_CACHE_DIR, max_bytes=REPORT_CACHE_MAX_BYTES):
+        # Absolute, so worker processes write where the app reads whatever their cwd
+        self.cache_dir = os.path.abspath(cache_dir)
+        self.max_bytes = max_bytes
+        self.lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    @staticmethod
+    def _digest(value):
+        payload = json.dumps(value, sort_keys=True, separators=(',', ':'), default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+    def locate(self, report, params, inputs):
+        """Return the (params prefix, file path) a report with these inputs is cached under"""
+        prefix = f"{report}-{self._digest(params)}-"
+        content_hash = self._digest([REPORT_LAYOUT_VERSION, [file_version(p) for p in REPORT_ASSETS], inputs])
+        return prefix, os.path.join(self.cache_dir, f"{prefix}{content_hash}.pdf")
+
+    def get(self, report, params, inputs, template, theme, backend='reportlab'):
+        """Return the cached PDF for these inputs as a buffer, rendering the template and storing it on a miss"""
+        prefix, path = self.locate(report, params, inputs)
+        try:
+            with open(path, 'rb') as f:
+                pdf = f.read()
+            os.utime(path)  # Mark as recently used for pruning
+            return BytesIO(pdf)
+        except OSError:
+            pass
+
+        pdf = render_report(template(), theme, backend)
+        try:
+            self.write(path, pdf)
+            self.prune(prefix, path)
+        except OSError as e:
+            print(f"Report cache error: {e}")
+        return BytesIO(pdf)
+
+    @staticmethod
+    def write(path, pdf):
+        """Write a rendered PDF into place atomically"""
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            f.write(pdf)
+        os.replace(temp_path, path)
+
+    def prune(self, prefix, path):
+        """Drop versions superseded by path, then the least recently used entries past the size budget"""
+        with self.lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                entry_path = os.path.join(self.cache_dir, name)
+                try:
+                    if name.startswith(prefix) and entry_path != path:
+                        os.remove(entry_path)
+                    elif name.endswith('.pdf'):
+                        info = os.stat(entry_path)
+                        entries.append((info.st_mtime, info.st_size, entry_path))
+                except FileNotFoundError:
+                    pass  # Removed by another process meanwhile
+            total = sum(size for _, size, _ in entries)
+            for _, size, entry_path in sorted(entries):
+                if total <= self.max_bytes:
+                    break
+                if entry_path != path:
+                    try:
+                        os.remove(entry_path)
+                    except FileNotFoundError:
+                        pass
+                    total -= size
+
+
+REPORT_WORKERS = max(1, min(4, (os.cpu_count() or 2) - 1))  # Reports rendered at once, one process each
+REPORT_JOB_TIMEOUT = 300  # Seconds before a stuck render is stopped
+REPORT_JOB_RETENTION = 3600  # Seconds a finished job stays available for coalescing
+
+
+_job_progress = None  # Stream a report worker announces finished pages on
+
+
+def report_page_rendered():
+    """Count a finished page towards the running report job's progress, inside a report worker"""
+    if _job_progress is not None:
+        _job_progress.write('page\n')
+        _job_progress.flush()
+
+
+def worker_command():
+    """Return the command that starts a report worker process
+
+    Workers are fresh interpreters that import only this module. They never
+    fork the multithreaded app server, and unlike multiprocessing's spawn they
+    do not re-run the app script, which Streamlit installs as __main__.
+    """
+    return [sys.executable, '-c', f'import {__name__}; {__name__}.run_report_worker()']
+
+
+def materialize(report):
+    """Return the report with every table's rows as lists, so it can be sent to a worker process"""
+    return report._replace(blocks=[
+        block._replace(rows=list(table_rows(block.rows))) if isinstance(block, DataTable) else block
+        for block in report.blocks
+    ])
+
+
+def run_report_worker():
+    """Render the report job read from stdin and write it to the report cache, inside a worker process
+
+    Progress and the outcome go to stdout, one line each: 'page' per finished
+    page, then 'done' or 'error <message>'.
+    """
+    global _job_progress
+    report, theme, backend, path = pickle.load(sys.stdin.buffer)
+    _job_progress = sys.stdout
+    try:
+        ReportCache.write(path, render_report(report, theme, backend))
+    except Exception as e:
+        message = ' '.join((str(e) or type(e).__name__).split())
+        sys.stdout.write(f'error {message}\n')
+        raise
+    sys.stdout.write('done\n')
+
+
+class ReportJob:
+    """A report rendering in a worker process, readable from the report cache once done"""
+
+    def __init__(self, path):
+        self.path = path
+        self.pages = 0
+        self.started = datetime.now()
+        self.error = None
+        self.finished = threading.Event()
+
+    @property
+    def done(self):
+        return self.finished.is_set()
+
+    def read(self):
+        """Return the finished PDF's bytes"""
+        with open(self.path, 'rb') as f:
+            return f.read()
+
+
+class ReportQueue:
+    """Render PDF reports in worker processes, off the Streamlit script thread
+
+    A report's template is built on the submitting thread, where it can read
+    the session and the database, and only the resulting plain-data Report and
+    its theme are pickled to the worker, which lays it out. At most `workers`
+    reports render at once. Finished PDFs land in the report cache, which
+    doubles as the download spool. A report whose inputs match a queued,
+    running or cached one is coalesced onto that job instead of being rendered
+    again.
+    """
+
+    def __init__(self, cache, workers=REPORT_WORKERS, timeout=REPORT_JOB_TIMEOUT):
+        self.cache = cache
+        self.slots = threading.BoundedSemaphore(workers)
+        self.timeout = timeout
+        self.lock = threading.Lock()
+        self.jobs = {}
+
+    def submit(self, report, params, inputs, template, theme, backend='reportlab'):
+        """Queue a report and return its job, reusing an identical pending or finished one
+
+        template is called only when the report has to be rendered and returns a
+        Report; an exception it raises becomes the job's error.
+        """
+        prefix, path = self.cache.locate(report, params, inputs)
+        with self.lock:
+            now = datetime.now()
+            for job_path, job in list(self.jobs.items()):
+                if job.done and (now - job.started).total_seconds() > REPORT_JOB_RETENTION:
+                    del self.jobs[job_path]
+
+            job = self.jobs.get(path)
+            if job is not None and (not job.done or (not job.error and os.path.exists(path))):
+                return job
+            job = ReportJob(path)
+            self.jobs[path] = job
+
+        if os.path.exists(path):
+            os.utime(path)  # Mark as recently used for pruning
+            job.finished.set()
+            return job
+        try:
+            document = pickle.dumps((materialize(template()), theme, backend, path))
+        except Exception as e:
+            job.error = str(e) or type(e).__name__
+            job.finished.set()
+            return job
+        threading.Thread(target=self._run, args=(job, prefix, document),
+                         name='report-job', daemon=True).start()
+        return job
+
+    def _run(self, job, prefix, document):
+        with self.slots:
+            env = dict(os.environ)
+            env['PYTHONPATH'] = os.pathsep.join(filter(None, [os.path.dirname(os.path.abspath(__file__)),
+                                                              env.get('PYTHONPATH')]))
+            outcome = None
+            try:
+                process = subprocess.Popen(worker_command(), stdin=subprocess.PIPE, stdout=subprocess.PIPE,
+                                           env=env, text=True)
+            except OSError as e:
+                job.error = f"Could not start the report worker: {e}"
+                job.finished.set()
+                return
+            timed_out = threading.Event()
+
+            def stop():
+                timed_out.set()
+                process.kill()
+
+            timer = threading.Timer(self.timeout, stop)
+            timer.start()
+            try:
+                try:
+                    process.stdin.buffer.write(document)
+                    process.stdin.close()
+                except OSError:
+                    pass  # The worker died early; its exit code says so below
+                for line in process.stdout:
+                    if line == 'page\n':
+                        job.pages += 1
+                    elif line.startswith(('done', 'error ')):
+                        outcome = line.rstrip('\n')
+                process.wait()
+            finally:
+                timer.cancel()
+                process.stdout.close()
+            if timed_out.is_set():
+                job.error = f"Rendering took longer than {self.timeout} seconds"
+            elif outcome is not None and outcome.startswith('error '):
+                job.error = outcome[len('error '):]
+            elif process.returncode != 0 or outcome != 'done':
+                job.error = f"Report worker exited with code {process.returncode}"
+            else:
+                try:
+                    self.cache.prune(prefix, job.path)
+                except OSError as e:
+                    print(f"Report cache error: {e}")
+        job.finished.set()
+
+
+_singletons = {}
+_singletons_lock = threading.RLock()
+
+
+def _singleton(name, factory):
+    instance = _singletons.get(name)
+    if instance is None:
+        with _singletons_lock:
+            instance = _singletons.get(name)
+            if instance is None:
+                instance = _singletons[name] = factory()
+    return instance
+
+
+def get_report_cache():
+    """Return the process-wide report cache"""
+    return _singleton('cache', ReportCache)
+
+
+def get_report_queue():
+    """Return the process-wide report queue"""
+    return _singleton('queue', lambda: ReportQueue(get_report_cache()))
+
+
+def get_branding_assets():
+    """Return the process-wide branding assets"""
+    return _singleton('branding', BrandingAssets)
@@ -0,0 +1,31 @@
+import logging
+import os
+import sys
+
+import pytest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+
+@pytest.fixture(scope='session')
+def app_dir(tmp_path_factory):
+    # Importing an app runs it in Streamlit bare mode; both apps keep their data files,
+    # named differently, in one scratch directory, since Chemical.py resolves its paths on each call
+    path = tmp_path_factory.mktemp('apps')
+    os.chdir(path)
+    logging.getLogger('streamlit').setLevel(logging.ERROR)
+    return path
+
+
+@pytest.fixture(scope='session')
+def expense_app(app_dir):
+    import Expense
+    return Expense
+
+
+@pytest.fixture(scope='session')
+def chemical_app(app_dir):
+    import Chemical
+    Chemical.load_data()
+    return Chemical
@@ -0,0 +1,42 @@
+import io
+import zipfile
+
+import streamlit as st
+
+
+def zipped(members):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as z:
+        for name, text in members.items():
+            z.writestr(name, text)
+    buffer.seek(0)
+    return buffer
+
+
+def restored_matches_live(app):
+    restored = app.get_backup_manager().restore()
+    return {name: restored[name] for name in app.DATA_COLLECTIONS} == app.current_data()
+
+
+def test_restore_after_merge_import_matches_live_data(chemical_app):
+    chemical_app.merge_csv_zip(zipped({'production_history.csv': (
+        'date,product,batch_size,status,type\n'
+        '2024-02-01,Restore Soap,10,Completed,production\n'
+        '2024-02-02,Restore Soap,20,Completed,production\n'
+    )}))
+
+    restored = chemical_app.get_backup_manager().restore()
+    assert len(restored['production_history']) == len(st.session_state.production_history)
+    assert restored_matches_live(chemical_app)
+
+
+def test_restore_replays_saves_after_full_snapshot(chemical_app):
+    chemical_app.save_data(compact=True)
+    for number in range(3):
+        record = {'id': 7000 + number, 'date': '2024-02-03', 'vendor_name': 'Restore Vendor', 'amount': 10.0 + number,
+                  'method': 'Cash', 'notes': ''}
+        st.session_state.vendor_payments.append(record)
+        chemical_app.record_change('upsert', 'vendor_payments', record['id'], record)
+        chemical_app.save_data()
+
+    assert restored_matches_live(chemical_app)
@@ -0,0 +1,54 @@
+import csv
+import io
+import threading
+import zipfile
+from datetime import date
+
+import pyarrow as pa
+import pyarrow.parquet as pq
+import streamlit as st
+
+
+def test_export_keeps_records_as_of_the_request(chemical_app, monkeypatch):
+    started = threading.Event()
+    export_to_csv = chemical_app.export_to_csv
+
+    def paused_export(data):
+        assert started.wait(10)
+        return export_to_csv(data)
+
+    monkeypatch.setattr(chemical_app, 'export_to_csv', paused_export)
+    chemical = {'id': 7200, 'name': 'Export Acid', 'stock': 5.0, 'rate': 1.0, 'original_unit': 'kg'}
+    job = chemical_app.ExportJob({**chemical_app.current_data(), 'chemicals': [chemical]})
+
+    # An edit made while the export is still running
+    chemical['stock'] = 0.0
+    started.set()
+    job.thread.join(30)
+
+    assert job.error is None
+    with zipfile.ZipFile(io.BytesIO(job.read())) as z:
+        rows = list(csv.DictReader(io.TextIOWrapper(z.open('chemicals.csv'), encoding='utf-8')))
+    assert [(row['name'], float(row['stock'])) for row in rows] == [('Export Acid', 5.0)]
+
+
+def test_parquet_round_trip_with_date_filter(chemical_app):
+    payments = [
+        {'id': 1, 'date': '2024-03-03', 'vendor_name': 'Parquet Vendor', 'amount': 12.5, 'method': 'Cash', 'notes': ''},
+        {'id': 2, 'date': 'not a date', 'vendor_name': 'Parquet Vendor', 'amount': 3.0, 'method': 'Cash', 'notes': ''},
+        {'id': 3, 'date': '2024-03-01', 'vendor_name': 'Parquet Vendor', 'amount': 7.0, 'method': 'Cheque', 'notes': 'x'},
+    ]
+    source = chemical_app.export_parquet('vendor_payments', payments)
+
+    table = pq.read_table(io.BytesIO(source))
+    assert table.schema.field('date').type == pa.date32() and table.schema.field('amount').type == pa.float64()
+    # Sorted by date; a malformed date is kept as a null rather than failing the export
+    assert table.column('date').to_pylist() == [date(2024, 3, 1), date(2024, 3, 3), None]
+
+    report = chemical_app.merge_parquet(io.BytesIO(source), 'vendor_payments', start_date=date(2024, 3, 2))
+    assert (report['vendor_payments']['added'], report['vendor_payments']['updated']) == (1, 0)
+    merged = [payment for payment in st.session_state.vendor_payments if payment['vendor_name'] == 'Parquet Vendor']
+    assert [(payment['date'], payment['amount'], payment['method']) for payment in merged] == [('2024-03-03', 12.5, 'Cash')]
+
+    again = chemical_app.merge_parquet(io.BytesIO(source), 'vendor_payments', start_date=date(2024, 3, 2), dry_run=True)
+    assert again['vendor_payments']['unchanged'] == 1
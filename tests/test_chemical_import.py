@@ -0,0 +1,47 @@
+import io
+import zipfile
+
+import pytest
+import streamlit as st
+
+
+def chemicals_zip(rows):
+    buffer = io.BytesIO()
+    with zipfile.ZipFile(buffer, 'w') as z:
+        z.writestr('chemicals.csv', 'id,name,stock,rate\n' + ''.join(
+            f'{chemical_id},Import Chem {chemical_id},{stock},1.5\n' for chemical_id, stock in rows))
+    buffer.seek(0)
+    return buffer
+
+
+@pytest.fixture
+def small_chunks(chemical_app, monkeypatch):
+    monkeypatch.setattr(chemical_app, 'CSV_IMPORT_CHUNK_SIZE', 2)
+    return chemical_app
+
+
+@pytest.mark.parametrize('importer', ['import_from_csv', 'merge_csv_zip'])
+def test_bad_row_in_later_chunk_leaves_store_untouched(small_chunks, importer):
+    app = small_chunks
+    before = [dict(chemical) for chemical in st.session_state.chemicals]
+    rows = [(number, 'oops' if number == 8005 else 10) for number in range(8001, 8007)]
+
+    with pytest.raises(Exception, match='line 6: stock must be a number'):
+        getattr(app, importer)(chemicals_zip(rows))
+
+    assert st.session_state.chemicals == before
+    assert st.session_state.pending_changes == []
+    assert app.get_storage().load()['chemicals'] == before
+
+
+def test_import_replaces_collection_chunk_by_chunk(small_chunks):
+    app = small_chunks
+    seen = []
+
+    imported = app.import_from_csv(chemicals_zip([(number, 10) for number in range(8101, 8106)]),
+                                   progress=lambda member, rows: seen.append(rows))
+
+    assert imported == {'chemicals': 5}
+    assert seen == [2, 4, 5]
+    assert [chemical['name'] for chemical in app.get_storage().load()['chemicals']] == \
+        [f'Import Chem {number}' for number in range(8101, 8106)]
@@ -0,0 +1,70 @@
+import streamlit as st
+
+
+def test_catalog_follows_adds_renames_and_removals(chemical_app):
+    chemicals = [{'id': 1, 'name': 'Citric Acid'}, {'id': 2, 'name': 'Menthol'}, {'id': 3, 'name': 'Menthol'}]
+    catalog = chemical_app.ChemicalCatalog(chemicals)
+
+    # The first record wins on a duplicate name, as a linear scan would
+    assert catalog.find('Menthol') is chemicals[1]
+    assert catalog.exists('citric acid', ignore_case=True) and not catalog.exists('citric acid')
+
+    catalog.add({'id': 4, 'name': 'Formic Acid'})
+    catalog.rename(chemicals[0], 'Lactic Acid')
+    assert catalog.remove(2) is not None
+    assert catalog.remove(2) is None
+
+    assert [chem['id'] for chem in chemicals] == [1, 3, 4]
+    assert catalog.find('Citric Acid') is None and catalog.find('Lactic Acid')['id'] == 1
+    assert catalog.find('Menthol')['id'] == 3
+    assert catalog.get(4) is chemicals[2]
+
+
+def test_vendor_totals_follow_edits_and_match_a_rebuild(chemical_app):
+    ledger = [{'vendor_name': 'Acme', 'date': '2024-01-02', 'total_amount': 100.0},
+              {'vendor_name': 'Acme', 'date': '2024-01-05', 'total_amount': 50.0}]
+    payments = [{'vendor_name': 'Acme', 'date': '2024-01-06', 'amount': 30.0}]
+    totals = chemical_app.VendorAggregates(ledger, payments)
+
+    transaction = {'vendor_name': 'Beta', 'date': '2024-02-01', 'total_amount': 0.1}
+    ledger.append(transaction)
+    totals.add_transaction(transaction)
+    totals.remove_transaction(transaction)
+    transaction.update(total_amount=0.2)
+    totals.add_transaction(transaction)
+    ledger.remove(ledger[1])
+    totals.remove_transaction({'vendor_name': 'Acme', 'date': '2024-01-05', 'total_amount': 50.0})
+
+    assert totals.summary('Acme') == {'purchases': 100.0, 'payments': 30.0, 'balance': 70.0,
+                                      'last_activity': '2024-01-06'}
+    assert totals.summary('Beta')['balance'] == 0.2
+    assert totals.vendor_names() == ['Acme', 'Beta']
+    assert totals.check() == []
+
+    # A vendor with nothing left is dropped and shows a zero balance
+    ledger.remove(transaction)
+    totals.remove_transaction(transaction)
+    assert totals.summary('Beta') == {'purchases': 0.0, 'payments': 0.0, 'balance': 0.0, 'last_activity': None}
+    assert totals.check() == []
+
+    # An edit that bypassed the totals is reported once and then repaired
+    ledger[0]['total_amount'] = 120.0
+    assert totals.check() == ['Acme']
+    assert totals.summary('Acme')['balance'] == 90.0 and totals.check() == []
+
+
+def test_reserved_ids_move_past_a_replaced_list_and_are_never_reused(chemical_app):
+    try:
+        st.session_state.vendor_payments = [{'id': 40}, {'id': 7}]
+        first = chemical_app.reserve_ids('vendor_payments', count=3)
+        assert first >= 41
+        assert chemical_app.get_next_payment_id() == first + 3
+
+        st.session_state.vendor_payments.append({'id': first + 3})
+        st.session_state.vendor_payments.pop()
+        assert chemical_app.get_next_payment_id() == first + 4
+        assert st.session_state.sequences['vendor_payments'] == {'next_id': first + 5}
+        assert st.session_state.pending_changes[-1] == {'op': 'upsert', 'collection': 'sequences',
+                                                        'key': 'vendor_payments', 'value': {'next_id': first + 5}}
+    finally:
+        chemical_app.discard_unsaved_changes()
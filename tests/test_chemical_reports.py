@@ -0,0 +1,73 @@
+import os
+from io import BytesIO
+
+import streamlit as st
+from PIL import Image
+
+import report_engine
+from report_engine import ReportCache
+
+
+def cached_from_disk(cache, spec):
+    # A hit never calls the template, so a failing one shows the report came from the cache
+    def unused():
+        raise AssertionError('report was rendered again')
+    report, params, inputs, _, theme = spec
+    return cache.get(report, params, inputs, unused, theme).read()
+
+
+def test_stock_report_is_rebuilt_after_a_stock_edit(chemical_app, tmp_path):
+    cache = ReportCache(str(tmp_path))
+    chemical = {'id': 7300, 'name': 'Cached Acid', 'stock': 4.0, 'rate': 10.0, 'original_unit': 'kg'}
+    try:
+        chemical_app.add_chemical(chemical)
+        first = cache.get(*chemical_app.stock_report()).read()
+        assert cached_from_disk(cache, chemical_app.stock_report()) == first
+
+        chemical['stock'] = 1.0
+        spec = chemical_app.stock_report()
+        assert not os.path.exists(cache.locate(*spec[:3])[1])
+        cache.get(*spec)
+        # The superseded version was dropped; the new one is served from now on
+        assert os.listdir(str(tmp_path)) == [os.path.basename(cache.locate(*spec[:3])[1])]
+        cached_from_disk(cache, chemical_app.stock_report())
+    finally:
+        chemical_app.discard_unsaved_changes()
+
+
+def test_vendor_ledger_report_follows_saved_transactions(chemical_app, tmp_path):
+    cache = ReportCache(str(tmp_path))
+    before = chemical_app.vendor_ledger_report(vendor_name='Cached Vendor')
+    cache.get(*before)
+
+    transaction = {'id': chemical_app.get_next_vendor_id(), 'date': '2024-03-10', 'vendor_name': 'Cached Vendor',
+                   'vendor_type': 'chemical', 'item_name': 'Cached Acid', 'quantity': 2.0, 'rate': 5.0,
+                   'total_amount': 10.0, 'notes': ''}
+    chemical_app.add_vendor_transaction(transaction)
+    chemical_app.record_change('upsert', 'vendor_ledger', transaction['id'], transaction)
+    chemical_app.save_data()
+
+    after = chemical_app.vendor_ledger_report(vendor_name='Cached Vendor')
+    assert cache.locate(*after[:3]) != cache.locate(*before[:3])
+    assert after[2]['transactions'] == [transaction]
+    assert st.session_state.pending_changes == []
+
+
+def test_branding_is_prepared_once_per_file_version(tmp_path, monkeypatch):
+    logo = str(tmp_path / 'logo.png')
+    monkeypatch.setattr(report_engine, 'LOGO_FILE', logo)
+    assets = report_engine.BrandingAssets()
+    assert assets.watermark() is None
+
+    Image.new('RGBA', (400, 200), (0, 0, 255, 255)).save(logo)
+    image, width, height = assets.watermark()
+    assert (width, height) == (report_engine.WATERMARK_WIDTH, report_engine.WATERMARK_WIDTH / 2)
+    assert assets.watermark()[0] is image
+    # Downsampled to its drawn size and faded onto white, ready to embed as a JPEG
+    with Image.open(BytesIO(image)) as prepared:
+        assert prepared.format == 'JPEG'
+        assert prepared.width == round(width * report_engine.BRANDING_DPI / 72)
+        assert min(prepared.getpixel((prepared.width // 2, prepared.height // 2))) > 240
+
+    Image.new('RGBA', (300, 300), (255, 0, 0, 255)).save(logo)
+    assert assets.watermark()[2] == report_engine.WATERMARK_WIDTH
@@ -0,0 +1,76 @@
+import json
+
+
+def chemical(number, stock=1.0):
+    return {'id': number, 'name': f'Storage Acid {number}', 'stock': stock, 'rate': 2.0, 'original_unit': 'kg'}
+
+
+def upsert(record):
+    return {'op': 'upsert', 'collection': 'chemicals', 'key': record['id'], 'value': record}
+
+
+def test_journal_replays_saves_and_drops_a_torn_tail(chemical_app, tmp_path):
+    snapshot, journal = str(tmp_path / 'data.json'), str(tmp_path / 'data.journal')
+    storage = chemical_app.JournalStorage(snapshot, journal)
+    storage.save(None, [upsert(chemical(1)), upsert(chemical(2))])
+    storage.save(None, [upsert(chemical(1, stock=4.0)),
+                        {'op': 'delete', 'collection': 'chemicals', 'key': 2, 'value': None}])
+    with open(journal, 'a') as f:
+        f.write('{"op": "upsert", "collection": "chem')
+
+    reloaded = chemical_app.JournalStorage(snapshot, journal)
+    assert reloaded.load()['chemicals'] == [chemical(1, stock=4.0)]
+    assert reloaded.seq == 4
+    with open(journal) as f:
+        assert len(f.readlines()) == 4
+
+
+def test_journal_compacts_into_the_snapshot(chemical_app, tmp_path):
+    snapshot, journal = str(tmp_path / 'data.json'), str(tmp_path / 'data.journal')
+    storage = chemical_app.JournalStorage(snapshot, journal, compact_threshold=3)
+    data = chemical_app.empty_data()
+    for number in range(1, 4):
+        data['chemicals'].append(chemical(number))
+        storage.save(data, [upsert(chemical(number))])
+
+    with open(snapshot) as f:
+        assert json.load(f)['journal_seq'] == 3
+    with open(journal) as f:
+        assert f.read() == ''
+    assert chemical_app.JournalStorage(snapshot, journal).load()['chemicals'] == data['chemicals']
+
+
+def test_sqlite_applies_changes_row_by_row(chemical_app, tmp_path):
+    path = str(tmp_path / 'data.db')
+    storage = chemical_app.SqliteStorage(path)
+    product = {'name': 'Storage Soap', 'description': 'd', 'web_link': '', 'category': 'Liquid',
+               'composition': [{'name': 'Storage Acid 1', 'amount': 0.5, 'unit': 'kg'}], 'image_uploaded': False}
+    settings = dict(chemical_app.DEFAULT_SETTINGS, low_stock_threshold=2.5)
+    storage.save(None, [
+        upsert({**chemical(1), 'supplier': 'Kept in extra'}),
+        upsert(chemical(2)),
+        {'op': 'delete', 'collection': 'chemicals', 'key': 2, 'value': None},
+        {'op': 'upsert', 'collection': 'product_details', 'key': 'Storage Soap', 'value': product},
+        {'op': 'replace', 'collection': 'settings', 'key': None, 'value': settings},
+    ])
+    storage.conn.close()
+
+    reloaded = chemical_app.SqliteStorage(path)
+    data = reloaded.load()
+    assert data['chemicals'] == [{**chemical(1), 'supplier': 'Kept in extra'}]
+    assert data['product_details'] == {'Storage Soap': product}
+    assert data['settings'] == settings
+    assert reloaded.seq == 5
+    reloaded.conn.close()
+
+
+def test_sqlite_migrates_json_data_once(chemical_app, tmp_path):
+    snapshot, journal = str(tmp_path / 'data.json'), str(tmp_path / 'data.journal')
+    chemical_app.JournalStorage(snapshot, journal).save(None, [upsert(chemical(1))])
+    storage = chemical_app.SqliteStorage(str(tmp_path / 'data.db'))
+
+    assert chemical_app.migrate_json_to_sqlite(storage, snapshot, journal)
+    storage.save(None, [upsert(chemical(1, stock=3.0))])
+    assert not chemical_app.migrate_json_to_sqlite(storage, snapshot, journal)
+    assert storage.load()['chemicals'] == [chemical(1, stock=3.0)]
+    storage.conn.close()
@@ -0,0 +1,99 @@
+import io
+import threading
+
+import streamlit as st
+
+
+def locked_for_others(lock):
+    result = []
+
+    def probe():
+        acquired = lock.acquire(blocking=False)
+        if acquired:
+            lock.release()
+        result.append(not acquired)
+
+    thread = threading.Thread(target=probe)
+    thread.start()
+    thread.join()
+    return result[0]
+
+
+class WatchedList(list):
+    """A collection that notes whether the store was locked for other sessions on each change"""
+
+    def __init__(self, records, lock):
+        super().__init__(records)
+        self.lock = lock
+        self.locked = []
+
+    def append(self, record):
+        self.locked.append(locked_for_others(self.lock))
+        super().append(record)
+
+    def remove(self, record):
+        self.locked.append(locked_for_others(self.lock))
+        super().remove(record)
+
+
+def test_vendor_edits_hold_the_store_lock(chemical_app):
+    store = chemical_app.get_data_store()
+    payments = WatchedList(st.session_state.vendor_payments, store.lock)
+    st.session_state.vendor_payments = payments
+    try:
+        payment = {'id': 7100, 'date': '2024-02-04', 'vendor_name': 'Locked Vendor', 'amount': 30.0,
+                   'method': 'Cash', 'notes': ''}
+        chemical_app.add_vendor_payment(payment)
+        assert chemical_app.get_vendor_aggregates().summary('Locked Vendor')['payments'] == 30.0
+        chemical_app.remove_vendor_payment(payment)
+        assert payments.locked == [True, True]
+    finally:
+        chemical_app.load_data()
+
+
+def test_merge_import_holds_the_store_lock(chemical_app, monkeypatch):
+    store = chemical_app.get_data_store()
+    locked = []
+    merge = chemical_app.ImportMerger.merge
+    monkeypatch.setattr(chemical_app.ImportMerger, 'merge',
+                        lambda self, key, record: locked.append(locked_for_others(store.lock)) or merge(self, key, record))
+
+    chemical_app.merge_import_data({'production_history': [
+        {'date': '2024-02-05', 'product': 'Locked Soap', 'batch_size': 5, 'status': 'Completed', 'type': 'production'}
+    ]})
+
+    assert locked == [True]
+
+
+def test_store_rereads_disk_only_after_an_outside_write(chemical_app, tmp_path):
+    paths = str(tmp_path / 'data.json'), str(tmp_path / 'data.journal')
+    store = chemical_app.DataStore(chemical_app.JournalStorage(*paths))
+    data = store.get()
+    assert store.get() is data
+
+    # Our own save is adopted without a reload
+    record = {'id': 1, 'name': 'Store Acid', 'stock': 1.0, 'rate': 1.0, 'original_unit': 'kg'}
+    data['chemicals'].append(record)
+    store.storage.save(data, [{'op': 'upsert', 'collection': 'chemicals', 'key': 1, 'value': record}])
+    store.commit(data)
+    assert store.get() is data
+
+    # Another process writing the files is picked up on the next get()
+    chemical_app.JournalStorage(*paths).save(None, [{'op': 'delete', 'collection': 'chemicals', 'key': 1, 'value': None}])
+    reloaded = store.get()
+    assert reloaded is not data and reloaded['chemicals'] == []
+
+
+def test_parquet_merge_holds_the_store_lock(chemical_app, monkeypatch):
+    store = chemical_app.get_data_store()
+    locked = []
+    merge = chemical_app.ImportMerger.merge
+    monkeypatch.setattr(chemical_app.ImportMerger, 'merge',
+                        lambda self, key, record: locked.append(locked_for_others(store.lock)) or merge(self, key, record))
+    source = chemical_app.export_parquet('vendor_payments', [
+        {'id': 1, 'date': '2024-02-06', 'vendor_name': 'Locked Parquet', 'amount': 5.0, 'method': 'Cash', 'notes': ''}
+    ])
+
+    chemical_app.merge_parquet(io.BytesIO(source), 'vendor_payments', dry_run=True)
+
+    assert locked == [True]
@@ -0,0 +1,73 @@
+import pandas as pd
+
+
+def merge(app, kind, rows):
+    chunk = pd.DataFrame(rows, dtype=str)
+    return app.bulk_import_chunks(kind, [chunk], merge=True)
+
+
+def test_partial_employee_merge_keeps_missing_columns(expense_app):
+    ledger = expense_app.EmployeeLedger()
+    ledger.add_employee('Partial Merge', 10, phone='0300', email='p@x.com', department='Sales',
+                        position='Rep', join_date='2023-05-01')
+
+    result = merge(expense_app, 'employees', {'name': ['Partial Merge', 'New Hire'], 'initial_balance': ['50', '0']})
+
+    assert result['updated'] == 1 and result['imported'] == 1
+    employee = next(e for e in ledger.get_employees() if e['name'] == 'Partial Merge')
+    assert employee['initial_balance'] == 50
+    assert (employee['phone'], employee['email'], employee['department'], employee['position']) == \
+        ('0300', 'p@x.com', 'Sales', 'Rep')
+    assert employee['join_date'] == '2023-05-01'
+
+
+def test_partial_expense_merge_keeps_status_and_category(expense_app):
+    tracker = expense_app.ExpenseTracker()
+    tracker.add_expense('company', 'Partial rent', 100, category='Office', date='2024-03-01', status='Paid')
+
+    result = merge(expense_app, 'expenses', {
+        'type': ['company', 'company'],
+        'description': ['Partial rent', 'Partial new'],
+        'amount': ['120', '5'],
+        'date': ['2024-03-01', '2024-03-02'],
+    })
+
+    assert result['updated'] == 1 and result['imported'] == 1
+    expenses = {e['description']: e for e in tracker.get_expenses(search_query='Partial')}
+    assert expenses['Partial rent']['amount'] == 120
+    assert (expenses['Partial rent']['status'], expenses['Partial rent']['category']) == ('Paid', 'Office')
+    # Defaults still fill the columns of inserted rows
+    assert expenses['Partial new']['status'] == 'Pending'
+
+
+def test_blank_cells_leave_merged_rows_alone(expense_app):
+    tracker = expense_app.ExpenseTracker()
+    tracker.add_expense('company', 'Blank rent', 100, category='Office', date='2024-03-05', status='Paid')
+    ledger = expense_app.EmployeeLedger()
+    ledger.add_employee('Blank Merge', 10, phone='0311', department='Ops', join_date='2023-06-01')
+
+    expense_result = merge(expense_app, 'expenses', {
+        'type': ['company', 'company'],
+        'description': ['Blank rent', 'Blank new'],
+        'amount': ['130', '5'],
+        'category': ['', ''],
+        'date': ['2024-03-05', '2024-03-06'],
+        'status': ['', ' '],
+    })
+    employee_result = merge(expense_app, 'employees', {
+        'name': ['Blank Merge'], 'initial_balance': [''], 'phone': ['0322'], 'department': [''], 'join_date': [''],
+    })
+
+    assert expense_result['updated'] == 1 and expense_result['imported'] == 1
+    assert [row['action'] for row in expense_result['preview']] == ['added', 'updated']
+    assert set(expense_result['preview'][1]) == {'row', 'action', 'type', 'date', 'description', 'employee_name', 'amount'}
+    expenses = {e['description']: e for e in tracker.get_expenses(search_query='Blank')}
+    assert expenses['Blank rent']['amount'] == 130
+    assert (expenses['Blank rent']['status'], expenses['Blank rent']['category']) == ('Paid', 'Office')
+    # Inserted rows still take the defaults
+    assert (expenses['Blank new']['status'], expenses['Blank new']['category']) == ('Pending', '')
+
+    assert employee_result['updated'] == 1
+    employee = next(e for e in ledger.get_employees() if e['name'] == 'Blank Merge')
+    assert (employee['initial_balance'], employee['phone'], employee['department'], employee['join_date']) == \
+        (10, '0322', 'Ops', '2023-06-01')
@@ -0,0 +1,36 @@
+def test_report_builder_error_reaches_job(expense_app):
+    pdf_generator = expense_app.PDFGenerator()
+
+    job = expense_app.submit_report(
+        'employee_ledger', {'employee_id': 'broken'},
+        lambda: pdf_generator.employee_ledger_report('Broken Summary', [], {}))
+
+    assert job.finished.wait(60)
+    assert job.error == "'total_expenses'"
+
+
+def test_report_renders_in_worker(expense_app):
+    pdf_generator = expense_app.PDFGenerator()
+    summary = {'total_expenses': 100.0, 'total_payments': 40.0, 'balance': 60.0}
+    transactions = [{'date': '2024-03-01', 'type': 'expense', 'description': 'Fuel', 'amount': 100.0},
+                    {'date': '2024-03-02', 'type': 'payment', 'description': 'Advance', 'amount': 40.0}]
+
+    job = expense_app.submit_report(
+        'employee_ledger', {'employee_id': 'worker'},
+        lambda: pdf_generator.employee_ledger_report('Worker Test', transactions, summary))
+
+    assert job.finished.wait(120)
+    assert job.error is None
+    assert job.read().startswith(b'%PDF')
+
+
+def test_report_dated_by_last_commit(expense_app):
+    ledger = expense_app.EmployeeLedger()
+    ledger.add_employee('As Of Check', 0)
+    version = expense_app.database_version()
+
+    report = expense_app.PDFGenerator().employee_list_report(ledger.get_employees(), ledger)
+
+    as_of = expense_app.database_as_of().strftime('%Y-%m-%d %H:%M')
+    assert f'Data as of: {as_of}' in [block.text for block in report.blocks if hasattr(block, 'text')]
+    assert expense_app.database_version() == version
@@ -0,0 +1,20 @@
+import re
+import sqlite3
+
+
+def test_hot_queries_use_indexes_on_fresh_database(expense_app, tmp_path):
+    path = str(tmp_path / 'plans.db')
+
+    # Opening a fresh database applies every migration before the plans are checked
+    assert expense_app.check_query_plans(path) == {}
+
+
+def test_hot_query_plans_never_scan_tables(expense_app, tmp_path):
+    conn = sqlite3.connect(str(tmp_path / 'scan.db'))
+    expense_app.migrate_database(conn)
+
+    for name, (query, params) in expense_app.HOT_QUERIES.items():
+        steps = [row[3] for row in conn.execute(f'EXPLAIN QUERY PLAN {query}', params)]
+        scans = [step for step in steps if re.match(r'SCAN \w+$', step)]
+        assert not scans, f'{name}: {steps}'
+